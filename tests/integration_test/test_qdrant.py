@@ -1,26 +1,22 @@
+import asyncio
 import uuid
 from typing import Optional
 
 import pytest
 
-from vectordbs.types import (
-    DocumentChunk,
-    DocumentMetadataFilter,
-    QueryWithEmbedding,
-    DocumentMetadata,
-)
+from vectordbs.types import VectorStoreData, VectorStoreQuery
 from vectordbs.providers.qdrant_datastore import QdrantDataStore, QdrantOptions
 
-def create_document_chunk(id: Optional[str] = None) -> DocumentChunk:
-    return DocumentChunk(
+def create_data(id: Optional[str] = None) -> VectorStoreData:
+    return VectorStoreData(
         id=id or str(uuid.uuid4()),
-        text="sample text",
-        metadata=DocumentMetadata(
-            document_id="1",
-            source="source",
-            source_id="source_id",
-            author="author",
-        ),
+        data={
+            "text": "sample text",
+            "document_id": "1",
+            "source": "source",
+            "source_id": "source_id",
+            "author": "author",
+        },
         embedding=[0.1] * 1536,
     )
 
@@ -29,47 +25,37 @@ def qdrant_datastore():
     options = QdrantOptions()
     datastore = QdrantDataStore(options, recreate_collection=True)
     yield datastore
-    datastore.delete(filter=None)
+    asyncio.run(datastore.close())
 
 
-def test_upsert(qdrant_datastore):
-    document_chunk = create_document_chunk()
-    result = qdrant_datastore.upsert({document_chunk.id: [document_chunk]})
+def test_add(qdrant_datastore):
+    data = create_data()
+    result = asyncio.run(qdrant_datastore.add([data]))
     assert len(result) == 1
-    assert result[0] == document_chunk.id
+    assert result[0] == data.id
 
 
 def test_query(qdrant_datastore):
-    document_chunk = create_document_chunk()
-    qdrant_datastore.upsert({document_chunk.id: [document_chunk]})
+    data = create_data()
+    asyncio.run(qdrant_datastore.add([data]))
 
-    query = QueryWithEmbedding(
-        query="test query",
-        embedding=[0.1] * 1536,
-        filter=DocumentMetadataFilter(document_id=document_chunk.metadata.document_id),
-        top_k=5,
-    )
+    query = VectorStoreQuery(query_embedding=[0.1] * 1536, similarity_top_k=5)
 
-    results = qdrant_datastore.query([query])
+    results = asyncio.run(qdrant_datastore.query_batch([query]))
     assert len(results) == 1
-    assert len(results[0].results) >= 1
-    assert results[0].results[0].id == document_chunk.id
+    assert len(results[0].ids) >= 1
+    assert results[0].ids[0] == data.id
 
 
 def test_delete(qdrant_datastore):
-    document_chunk = create_document_chunk()
-    qdrant_datastore.upsert({document_chunk.id: [document_chunk]})
+    data = create_data()
+    asyncio.run(qdrant_datastore.add([data]))
 
-    deleted = qdrant_datastore.delete(ids=[document_chunk.id])
+    deleted = asyncio.run(qdrant_datastore.delete(ids=[data.data["document_id"]]))
     assert deleted
 
-    query = QueryWithEmbedding(
-        query="test query",
-        embedding=[0.1] * 1536,
-        filter=DocumentMetadataFilter(document_id=document_chunk.metadata.document_id),
-        top_k=5,
-    )
+    query = VectorStoreQuery(query_embedding=[0.1] * 1536, similarity_top_k=5)
 
-    results = qdrant_datastore.query([query])
+    results = asyncio.run(qdrant_datastore.query_batch([query]))
     assert len(results) == 1
-    assert len(results[0].results) == 0
+    assert len(results[0].ids) == 0
@@ -0,0 +1,62 @@
+import json
+import os
+import tempfile
+import unittest
+from importlib import import_module
+
+from vectordbs import bench
+from vectordbs.__main__ import main
+
+
+class TestBench(unittest.TestCase):
+    def setUp(self):
+        self.dataset = bench.generate_dataset(500, 16, 20)
+
+    def test_ground_truth_is_exact(self):
+        truth = self.dataset.ground_truth(5)
+        assert truth.shape == (20, 5)
+
+        store = bench.create_store("memory", self.dataset, tempfile.gettempdir())
+        run = bench.bench_ingest("memory", store, self.dataset.datas(), 64, 1)
+        assert run.records == 500 and run.failed == 0
+        run = bench.bench_queries("memory", store, self.dataset, 5, 2, truth)
+        assert run.recall == 1.0
+        assert run.queries == 20
+        assert run.latency_ms["p50"] <= run.latency_ms["p99"] <= run.latency_ms["max"]
+
+    def test_run_benchmark_sweeps(self):
+        report = bench.run_benchmark(
+            ["memory", "mmap"], self.dataset, batch_sizes=[50, 100], concurrencies=[1, 4], top_ks=[1, 10]
+        )
+        # Both stores cap ingest concurrency at 1, so only the batch sizes are swept
+        assert [(run["provider"], run["batch_size"], run["concurrency"]) for run in report["ingest"]] == [
+            ("memory", 50, 1),
+            ("memory", 100, 1),
+            ("mmap", 50, 1),
+            ("mmap", 100, 1),
+        ]
+        assert len(report["query"]) == 2 * 2 * 2
+        assert all(run["recall"] == 1.0 for run in report["query"])
+        json.dumps(report)
+
+    def test_fake_providers(self):
+        for provider in bench.FAKE_PROVIDERS:
+            module = provider.replace("fake-", "") + "_datastore"
+            with self.subTest(provider=provider):
+                try:
+                    import_module(f"vectordbs.providers.{module}")
+                except ImportError:
+                    self.skipTest(f"{module} needs its client package")
+                report = bench.run_benchmark([provider], self.dataset, batch_sizes=[100], top_ks=[5])
+                assert report["ingest"][0]["records"] == 500
+                assert report["query"][0]["recall"] == 1.0
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "bench.json")
+            main(["bench", "--provider", "memory", "--count", "200", "--dimension", "8",
+                  "--queries", "5", "--top-k", "3", "--output", output, "--quiet"])
+            with open(output) as f:
+                report = json.load(f)
+        assert report["dataset"]["count"] == 200
+        assert report["query"][0]["top_k"] == 3
@@ -0,0 +1,95 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from vectordbs.buffer import BufferedVectorStore
+from vectordbs.providers.memory_datastore import MemoryDataStore, MemoryOptions
+from vectordbs.types import VectorStoreData, VectorStoreQuery
+
+
+class RecordingStore(MemoryDataStore):
+    def __init__(self):
+        super().__init__(MemoryOptions(dimension=2))
+        self.batches = []
+        self.fail = False
+
+    def add(self, datas):
+        if self.fail:
+            raise RuntimeError("unavailable")
+        self.batches.append(len(datas))
+        return super().add(datas)
+
+
+def record(i: int) -> VectorStoreData:
+    return VectorStoreData(id=str(i), data={"i": i}, embedding=[float(i), 1.0])
+
+
+class TestBufferedVectorStore(unittest.TestCase):
+    def setUp(self):
+        self.backend = RecordingStore()
+        self.store = BufferedVectorStore(self.backend, max_batch_size=5, max_delay=None)
+
+    def test_coalesces_by_size(self):
+        for i in range(12):
+            self.store.add([record(i)])
+        assert self.backend.batches == [5, 5]
+        assert len(self.store) == 2
+        with mock.patch.object(self.backend, "close") as close:
+            self.store.close()
+        close.assert_called_once_with()
+        assert self.backend.batches == [5, 5, 2]
+        assert self.store.stream_concurrency == self.backend.stream_concurrency == 1
+        with self.assertRaises(ValueError):
+            self.store.add([record(0)])
+
+    def test_flushes_on_timer(self):
+        store = BufferedVectorStore(self.backend, max_batch_size=100, max_delay=0.01)
+        store.add([record(1)])
+        store.add([record(2)])
+        time.sleep(0.1)
+        assert self.backend.batches == [2]
+
+    def test_read_your_writes_and_delete(self):
+        self.store.add([record(1), record(2)])
+        result = self.store.query(VectorStoreQuery(query_embedding=[1.0, 1.0], similarity_top_k=5))
+        assert set(result.ids) == {"1", "2"}
+
+        self.store.add([record(3)])
+        self.store.delete(["3", "1"])
+        assert len(self.store) == 0
+        result = self.store.query(VectorStoreQuery(query_embedding=[1.0, 1.0], similarity_top_k=5))
+        assert result.ids == ["2"]
+
+    def test_single_threaded_store_reads_under_the_lock(self):
+        events = []
+        query = self.backend.query
+
+        def slow_query(q):
+            events.append("query")
+            time.sleep(0.05)
+            events.append("query done")
+            return query(q)
+
+        self.backend.query = slow_query
+        self.store.add([record(1)])
+        reader = threading.Thread(
+            target=self.store.query, args=(VectorStoreQuery(query_embedding=[1.0, 1.0]),)
+        )
+        reader.start()
+        time.sleep(0.01)
+        self.store.add([record(2)])
+        self.store.flush()
+        events.append("flushed")
+        reader.join()
+        assert events == ["query", "query done", "flushed"]
+
+    def test_failed_flush_keeps_records(self):
+        self.backend.fail = True
+        with self.assertRaises(RuntimeError):
+            self.store.add([record(i) for i in range(5)])
+        assert len(self.store) == 5
+        self.backend.fail = False
+        with self.store:
+            pass
+        assert len(self.backend) == 5
@@ -0,0 +1,173 @@
+import dataclasses
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+
+from vectordbs.cache import CachedVectorStore, SemanticCachedVectorStore
+from vectordbs.deadline import mark_partial
+from vectordbs.providers.memory_datastore import MemoryDataStore, MemoryOptions
+from vectordbs.types import VectorStoreData, VectorStoreQuery
+
+
+def random_datas(count: int, dimension: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return [
+        VectorStoreData(id=str(i), data={"i": i}, embedding=embedding.tolist())
+        for i, embedding in enumerate(rng.standard_normal((count, dimension)))
+    ]
+
+
+class CountingStore(MemoryDataStore):
+    def __init__(self, options):
+        super().__init__(options)
+        self.queries = 0
+
+    def query(self, query):
+        self.queries += 1
+        return super().query(query)
+
+
+class TestCachedVectorStore(unittest.TestCase):
+    def setUp(self):
+        self.datas = random_datas(20, 4)
+        self.backend = CountingStore(MemoryOptions(dimension=4))
+        self.backend.add(self.datas)
+        self.store = CachedVectorStore(self.backend, max_entries=3)
+
+    def query(self, i: int, top_k: int = 2):
+        return self.store.query(
+            VectorStoreQuery(query_embedding=list(self.datas[i].embedding), similarity_top_k=top_k)
+        )
+
+    def test_hit_and_key(self):
+        first = self.query(0)
+        assert self.query(0) is first
+        self.query(0, top_k=3)
+        assert (self.store.hits, self.store.misses) == (1, 2)
+        assert self.backend.queries == 2
+        assert self.store.stream_concurrency == self.backend.stream_concurrency == 1
+        assert SemanticCachedVectorStore(self.backend).stream_concurrency == 1
+
+    def test_lru_eviction(self):
+        for i in range(4):
+            self.query(i)
+        assert len(self.store) == 3
+        self.query(0)
+        assert self.backend.queries == 5
+
+    def test_byte_cap(self):
+        store = CachedVectorStore(self.backend, max_bytes=1)
+        store.query(VectorStoreQuery(query_embedding=self.datas[0].embedding))
+        assert len(store) == 0 and store.size_bytes == 0
+
+    def test_close_delegates(self):
+        self.query(0)
+        for store in (self.store, SemanticCachedVectorStore(self.backend)):
+            with mock.patch.object(self.backend, "close") as close:
+                store.close()
+            close.assert_called_once_with()
+            assert len(store) == 0
+
+    def test_ttl(self):
+        self.store.ttl = 0.01
+        self.query(0)
+        time.sleep(0.02)
+        self.query(0)
+        assert self.backend.queries == 2
+
+    def test_invalidation(self):
+        self.query(0)
+        self.query(5)
+        self.store.delete(["0"])
+        assert len(self.store) == 1
+        assert "0" not in self.query(0).ids
+
+        self.store.add([self.datas[0]])
+        assert len(self.store) == 0
+        assert self.query(0).ids[0] == "0"
+
+    def test_query_batch(self):
+        self.query(0)
+        queries = [
+            VectorStoreQuery(query_embedding=list(self.datas[i].embedding), similarity_top_k=2)
+            for i in (0, 1, 1)
+        ]
+        results = self.store.query_batch(queries)
+        assert results[0].ids[0] == "0" and results[1].ids[0] == "1"
+        assert results[1] is results[2]
+        assert (self.store.hits, self.store.misses) == (2, 2)
+
+    def test_latency_budget(self):
+        self.query(0)
+        budget = VectorStoreQuery(query_embedding=list(self.datas[0].embedding), similarity_top_k=2, latency_budget=5)
+        assert self.store.query(budget).ids[0] == "0"
+        assert self.backend.queries == 1
+
+        self.backend.query = lambda query: dataclasses.replace(CountingStore.query(self.backend, query), partial=True)
+        self.query(1)
+        self.query(1)
+        assert self.backend.queries == 3
+
+        # Result models without a partial field, as the remote providers return them
+        calls = []
+        self.backend.query = lambda query: calls.append(query) or mark_partial(SimpleNamespace(ids=[]))
+        self.query(2)
+        self.query(2)
+        assert len(calls) == 2
+        self.backend.query = lambda query: calls.append(query) or SimpleNamespace(ids=[])
+        self.query(3)
+        self.query(3)
+        assert len(calls) == 3
+
+
+class TestSemanticCachedVectorStore(unittest.TestCase):
+    def setUp(self):
+        self.datas = random_datas(20, 4)
+        self.backend = CountingStore(MemoryOptions(dimension=4))
+        self.backend.add(self.datas)
+        self.store = SemanticCachedVectorStore(self.backend, threshold=0.99, max_entries=2)
+
+    def test_near_duplicate_hits(self):
+        embedding = np.array(self.datas[0].embedding)
+        first = self.store.query(VectorStoreQuery(query_embedding=embedding.tolist()))
+        paraphrase = (embedding * 1.5 + 0.001).tolist()
+        assert self.store.query(VectorStoreQuery(query_embedding=paraphrase)) is first
+        # Different parameters never share an entry
+        self.store.query(VectorStoreQuery(query_embedding=paraphrase, similarity_top_k=3))
+        assert (self.store.hits, self.store.misses) == (1, 2)
+
+    def test_far_query_misses_and_lru(self):
+        for i in range(3):
+            self.store.query(VectorStoreQuery(query_embedding=self.datas[i].embedding))
+        assert len(self.store) == 2
+        assert self.store.misses == 3
+        self.store.query(VectorStoreQuery(query_embedding=self.datas[0].embedding))
+        assert self.store.misses == 4
+
+    def test_admission_and_invalidation(self):
+        store = SemanticCachedVectorStore(self.backend, admission=lambda query, result: False)
+        store.query(VectorStoreQuery(query_embedding=self.datas[0].embedding))
+        assert len(store) == 0
+
+        self.store.query(VectorStoreQuery(query_embedding=self.datas[0].embedding))
+        self.store.delete(["0"])
+        assert len(self.store) == 0
+
+    def test_eviction_and_clear_leave_no_residue(self):
+        for top_k in range(1, 10):
+            self.store.query(VectorStoreQuery(query_embedding=self.datas[top_k].embedding, similarity_top_k=top_k))
+        # Only the parameters of the two live rows stay interned
+        assert len(self.store) == 2 and len(self.store._param_ids) == 2
+        first, second = self.store._results
+        self.store.delete(sorted(set(first.ids) - set(second.ids))[:1])
+        assert len(self.store._param_ids) == len(self.store) == 1
+
+        self.store.clear()
+        assert len(self.store) == 0 and not self.store._param_ids
+        assert not self.store._last_used.any()
+        result = self.store.query(VectorStoreQuery(query_embedding=self.datas[0].embedding))
+        assert self.store.query(VectorStoreQuery(query_embedding=self.datas[0].embedding)) is result
+        assert self.store.hits == 1
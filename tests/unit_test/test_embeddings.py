@@ -0,0 +1,65 @@
+import unittest
+
+import numpy as np
+
+from vectordbs.embeddings import as_array, as_bytes, as_list, as_matrix, embedding_nbytes, from_bytes
+from vectordbs.ingest import record_bytes
+from vectordbs.providers.memory_datastore import MemoryDataStore, MemoryOptions
+from vectordbs.types import VectorStoreData, VectorStoreQuery
+
+
+class TestEmbeddings(unittest.TestCase):
+    def setUp(self):
+        self.vector = np.arange(8, dtype=np.float32)
+
+    def test_float32_array_is_not_copied(self):
+        assert np.shares_memory(as_array(self.vector), self.vector)
+
+    def test_buffers_are_viewed(self):
+        view = as_array(memoryview(self.vector))
+        assert np.shares_memory(view, self.vector)
+        raw = bytearray(self.vector.tobytes())
+        assert np.shares_memory(as_array(raw), np.frombuffer(raw, dtype=np.uint8))
+        np.testing.assert_array_equal(as_array(bytes(raw)), self.vector)
+
+    def test_buffers_are_float32_whatever_the_target(self):
+        raw = self.vector.tobytes()
+        for buffer in (raw, bytearray(raw), memoryview(raw)):
+            converted = as_array(buffer, np.float64)
+            assert converted.dtype == np.float64
+            np.testing.assert_array_equal(converted, self.vector)
+        assert as_bytes(raw, np.float16) == self.vector.astype("<f2").tobytes()
+        # Blobs of a known element type, as Redis HASH fields are stored
+        np.testing.assert_array_equal(from_bytes(as_bytes(raw, np.float16), np.float16), self.vector)
+
+    def test_conversions(self):
+        values = self.vector.tolist()
+        np.testing.assert_array_equal(as_array(values), self.vector)
+        assert as_list(values) is values
+        assert as_list(self.vector) == values
+        assert as_bytes(values, np.float64) == self.vector.astype("<f8").tobytes()
+        assert as_matrix([values, self.vector, memoryview(self.vector)]).shape == (3, 8)
+        with self.assertRaises(ValueError):
+            as_matrix([values, values[:4]])
+
+    def test_nbytes(self):
+        assert embedding_nbytes(self.vector.tolist()) == 32
+        assert embedding_nbytes(self.vector) == 32
+        assert embedding_nbytes(self.vector.tobytes()) == 32
+        assert embedding_nbytes(memoryview(self.vector.astype(np.float64))) == 32
+        data = VectorStoreData(id="a", data={}, embedding=self.vector.tobytes())
+        assert record_bytes(data) == 32 + 1 + 2
+
+    def test_store_accepts_any_form(self):
+        store = MemoryDataStore(MemoryOptions(dimension=8))
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((3, 8)).astype(np.float32)
+        store.add([
+            VectorStoreData(id="list", data={}, embedding=vectors[0].tolist()),
+            VectorStoreData(id="array", data={}, embedding=vectors[1]),
+            VectorStoreData(id="buffer", data={}, embedding=memoryview(vectors[2])),
+        ])
+        for id, vector in zip(["list", "array", "buffer"], vectors):
+            result = store.query(VectorStoreQuery(query_embedding=vector.tobytes(), similarity_top_k=1))
+            assert result.ids == [id]
+
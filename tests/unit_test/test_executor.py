@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from vectordbs.executor import BlockingExecutor, ThreadedVectorStore
+from vectordbs.providers.memory_datastore import MemoryDataStore, MemoryOptions
+from vectordbs.types import VectorStoreData, VectorStoreQuery
+
+
+class SlowStore(MemoryDataStore):
+    # Queries only read, the test calls add before any of them
+    stream_concurrency = 4
+
+    def __init__(self):
+        super().__init__(MemoryOptions(dimension=2))
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def query(self, query):
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(0.05)
+        with self._lock:
+            self.in_flight -= 1
+        return super().query(query)
+
+
+class TestThreadedVectorStore(unittest.TestCase):
+    def test_queries_run_concurrently_within_limit(self):
+        backend = SlowStore()
+        store = ThreadedVectorStore(backend, BlockingExecutor(max_workers=8, max_in_flight=4))
+
+        async def run():
+            await store.add([VectorStoreData(id="a", data={}, embedding=[1.0, 0.0])])
+            return await asyncio.gather(
+                *[store.query(VectorStoreQuery(query_embedding=[1.0, 0.0])) for _ in range(8)]
+            )
+
+        start = time.monotonic()
+        results = asyncio.run(run())
+        elapsed = time.monotonic() - start
+
+        assert all(result.ids == ["a"] for result in results)
+        assert backend.peak == 4
+        # Two waves of four, far below the 0.4s a serial loop would take
+        assert elapsed < 0.3
+
+    def test_single_threaded_store_is_serialized(self):
+        backend = SlowStore()
+        backend.stream_concurrency = 1
+        store = ThreadedVectorStore(backend, BlockingExecutor(max_workers=8, max_in_flight=4))
+
+        async def run():
+            await asyncio.gather(*[store.query(VectorStoreQuery(query_embedding=[1.0, 0.0])) for _ in range(3)])
+
+        asyncio.run(run())
+        assert backend.peak == 1
+
+    def test_executor_survives_new_event_loops(self):
+        executor = BlockingExecutor(max_workers=1)
+        assert asyncio.run(executor.run(sum, [1, 2])) == 3
+        assert asyncio.run(executor.run(sum, [3, 4])) == 7
@@ -1,7 +1,89 @@
+import subprocess
+import sys
+import threading
+import time
 import unittest
+from importlib.metadata import EntryPoint
+from unittest import mock
+
 from vectordbs import factory
 
+# Generous ceiling for CI, a cold import currently takes about 35 ms
+IMPORT_BUDGET_US = 150_000
+HEAVY_MODULES = ("numpy", "pydantic", "pymilvus", "weaviate", "qdrant_client", "redis", "pinecone", "chromadb")
+
+
 class TestFactory(unittest.TestCase):
     def test_factory(self):
         pinecone = factory.get_datastore("pinecone")
-        assert pinecone
\ No newline at end of file
+        assert pinecone
+
+
+class TestRegistry(unittest.TestCase):
+    def tearDown(self):
+        factory._PROVIDERS.pop("plugin", None)
+        factory.close_datastores()
+
+    def test_import_is_lazy_and_within_budget(self):
+        code = "import sys, vectordbs.factory; print(','.join(m for m in %r if m in sys.modules))" % (
+            HEAVY_MODULES,
+        )
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True
+        )
+        assert result.stdout.strip() == ""
+
+        cumulative = [
+            int(line.split("|")[1])
+            for line in result.stderr.splitlines()
+            if line.rstrip().endswith("| vectordbs.factory")
+        ]
+        assert cumulative and cumulative[0] < IMPORT_BUDGET_US, cumulative
+
+    def test_register_datastore(self):
+        factory.register_datastore("plugin", "vectordbs.providers.memory_datastore:MemoryDataStore")
+        assert "plugin" in factory.available_datastores()
+        store = factory.get_datastore("plugin")
+        assert type(store).__name__ == "MemoryDataStore"
+
+        with self.assertRaises(ValueError):
+            factory.get_datastore("missing")
+
+    def test_factory_reuses_store(self):
+        factory.close_datastores()
+        store = factory.get_datastore("memory")
+        assert factory.get_datastore("memory") is store
+        assert factory.get_datastore("memory", reuse=False) is not store
+        factory.close_datastores()
+        assert factory.get_datastore("memory") is not store
+
+    def test_slow_store_only_blocks_its_own_name(self):
+        built = []
+
+        def slow():
+            built.append(threading.current_thread().name)
+            time.sleep(0.2)
+            return object()
+
+        factory.register_datastore("plugin", slow)
+        stores = []
+        threads = [threading.Thread(target=lambda: stores.append(factory.get_datastore("plugin"))) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        start = time.monotonic()
+        factory.get_datastore("memory")
+        assert time.monotonic() - start < 0.1
+        for thread in threads:
+            thread.join()
+        assert len(built) == 1 and stores[0] is stores[1]
+
+    def test_entry_points(self):
+        entry_point = EntryPoint(
+            "plugin", "vectordbs.providers.memory_datastore:MemoryDataStore", factory.ENTRY_POINT_GROUP
+        )
+        with mock.patch("importlib.metadata.entry_points", return_value=[entry_point]), mock.patch.object(
+            factory, "_ENTRY_POINTS_LOADED", False
+        ):
+            store = factory.get_datastore("plugin", reuse=False)
+        assert type(store).__name__ == "MemoryDataStore"
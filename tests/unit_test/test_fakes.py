@@ -0,0 +1,248 @@
+import asyncio
+import time
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from vectordbs.fakes import (
+    FakeMilvus,
+    FakeMilvusException,
+    FakePinecone,
+    FakeQdrantClient,
+    FakeRedis,
+    LatencyModel,
+    RateLimitExceeded,
+)
+
+
+def vectors(count: int, dimension: int = 4, seed: int = 0):
+    return np.random.default_rng(seed).standard_normal((count, dimension)).astype(np.float32)
+
+
+class TestLatencyModel(unittest.TestCase):
+    def test_latency_and_items(self):
+        latency = LatencyModel(latency=0.01, per_item=0.001)
+        assert latency.delay(10) == 0.02
+        start = time.perf_counter()
+        latency.sleep()
+        assert time.perf_counter() - start >= 0.01
+        assert latency.requests == 2
+
+    def test_jitter_is_a_tail(self):
+        latency = LatencyModel(latency=0.01, jitter=0.005, seed=0)
+        delays = [latency.delay() for _ in range(1000)]
+        assert min(delays) >= 0.01
+        # Exponential tail, p99 is about 6.6 times the median extra delay
+        assert np.percentile(delays, 99) - 0.01 > 4 * (np.percentile(delays, 50) - 0.01)
+
+    def test_rate_limit(self):
+        latency = LatencyModel(rate_limit=100, burst=2)
+        assert [latency.delay() > 0 for _ in range(3)] == [False, False, True]
+        assert latency.throttled == 1
+
+        strict = LatencyModel(rate_limit=1, throttle=False)
+        strict.delay()
+        with self.assertRaises(RateLimitExceeded):
+            strict.delay()
+
+
+class TestFakeQdrant(unittest.TestCase):
+    def test_upsert_search_delete(self):
+        client = FakeQdrantClient()
+        client.recreate_collection("c", vectors_config=SimpleNamespace(size=4, distance="Cosine"))
+        data = vectors(20)
+        client.upsert(
+            "c",
+            points=[
+                SimpleNamespace(id=i, vector=v.tolist(), payload={"metadata": {"document_id": str(i % 2)}})
+                for i, v in enumerate(data)
+            ],
+        )
+        assert client.get_collection("c").config.params.vectors.size == 4
+
+        only_odd = SimpleNamespace(
+            must=[SimpleNamespace(key="metadata.document_id", match=SimpleNamespace(value="1"))]
+        )
+        results = client.search_batch(
+            "c",
+            requests=[
+                SimpleNamespace(vector=data[3].tolist(), filter=None, limit=3, with_payload=True, with_vector=False),
+                SimpleNamespace(vector=data[4].tolist(), filter=only_odd, limit=3, with_payload=True, with_vector=False),
+            ],
+        )
+        assert results[0][0].id == 3 and abs(results[0][0].score - 1) < 1e-5
+        assert all(point.id % 2 == 1 for point in results[1])
+
+        client.delete("c", points_selector=only_odd)
+        assert client.get_collection("c").points_count == 10
+        with self.assertRaises(Exception):
+            client.get_collection("missing")
+
+
+class TestFakeRedis(unittest.TestCase):
+    def test_pipeline_and_knn(self):
+        async def run():
+            client = FakeRedis(LatencyModel(latency=0.001))
+            fields = [
+                SimpleNamespace(name="$.document_id", as_name="document_id", args=["TAG"]),
+                SimpleNamespace(
+                    name="$.embedding",
+                    as_name="embedding",
+                    args=["VECTOR", "FLAT", 6, "TYPE", "FLOAT64", "DIM", 4, "DISTANCE_METRIC", "COSINE"],
+                ),
+            ]
+            definition = SimpleNamespace(args=["ON", "JSON", "PREFIX", 1, "doc"])
+            with self.assertRaises(Exception):
+                await client.ft("index").info()
+            await client.ft("index").create_index(fields=fields, definition=definition)
+
+            data = vectors(10)
+            async with client.pipeline(transaction=False) as pipe:
+                for i, v in enumerate(data):
+                    await pipe.json().set(f"doc:{i % 3}:chunk:{i}", "$", {"document_id": str(i % 3), "embedding": v.tolist()})
+                await pipe.execute()
+            # One round trip for the whole pipeline
+            assert client.latency.requests == 3
+
+            query = SimpleNamespace(
+                query_string=lambda: "(@document_id:{1})=>[KNN 2 @embedding $embedding AS score]", _offset=0, _num=2
+            )
+            response = await client.ft("index").search(query, {"embedding": data[4].astype(np.float64).tobytes()})
+            assert [doc.id for doc in response.docs][0] == "doc:1:chunk:4"
+            assert float(response.docs[0].score) < 1e-5
+            assert all(doc.id.startswith("doc:1:") for doc in response.docs)
+
+            # RETURN with JSONPath aliases, only the requested fields come back
+            query._return_fields = ["$.document_id", "AS", "document_id", "$.missing", "AS", "missing", "score"]
+            response = await client.ft("index").search(query, {"embedding": data[4].astype(np.float64).tobytes()})
+            assert response.docs[0].document_id == "1"
+            assert not hasattr(response.docs[0], "missing")
+            assert not hasattr(response.docs[0], "json")
+
+            # Key lookup as the provider deletes: tag filter, no content, first page only
+            query = SimpleNamespace(query_string=lambda: "@document_id:{0|2}", _offset=0, _num=5, _no_content=True)
+            response = await client.ft("index").search(query)
+            assert response.total == 7 and len(response.docs) == 5
+            assert not hasattr(response.docs[0], "json")
+            await client.unlink(*[doc.id for doc in response.docs])
+            assert (await client.ft("index").search(query)).total == 2
+
+            keys = [key async for key in client.scan_iter("doc:1:*")]
+            assert len(keys) == 3
+            assert await client.delete(*keys) == 3
+            await client.ft("index").dropindex(True)
+            assert client.data == {}
+
+        asyncio.run(run())
+
+
+    def test_hash_index_and_alias(self):
+        async def run():
+            client = FakeRedis()
+            fields = [
+                SimpleNamespace(name="document_id", as_name="document_id", args=["TAG"]),
+                SimpleNamespace(
+                    name="embedding",
+                    as_name="embedding",
+                    args=["VECTOR", "FLAT", 6, "TYPE", "FLOAT16", "DIM", 4, "DISTANCE_METRIC", "COSINE"],
+                ),
+            ]
+            definition = SimpleNamespace(args=["ON", "HASH", "PREFIX", 1, "doc"])
+            await client.ft("index-hash").create_index(fields=fields, definition=definition)
+            await client.ft("index-hash").aliasadd("index")
+            assert (await client.ft("index").info())["index_name"] == "index-hash"
+
+            data = vectors(6)
+            async with client.pipeline(transaction=True) as pipe:
+                for i, v in enumerate(data):
+                    mapping = {"document_id": str(i % 2), "text": f"t{i}", "embedding": v.astype(np.float16).tobytes()}
+                    await pipe.hset(f"doc:{i}", mapping=mapping)
+                await pipe.json().set("doc:json", "$", {"document_id": "0"})
+                await pipe.execute()
+            assert await client.type("doc:0") == b"hash"
+            assert await client.type("doc:json") == b"ReJSON-RL"
+            assert (await client.hgetall("doc:1"))[b"text"] == b"t1"
+
+            query = SimpleNamespace(
+                query_string=lambda: "(@document_id:{0})=>[KNN 2 @embedding $embedding AS score]",
+                _offset=0,
+                _num=2,
+                _return_fields=["text", "score"],
+            )
+            response = await client.ft("index").search(query, {"embedding": data[2].astype(np.float16).tobytes()})
+            # The JSON key is not covered by a HASH index
+            assert response.total == 2
+            assert response.docs[0].id == "doc:2"
+            assert response.docs[0].text == "t2"
+            assert not hasattr(response.docs[0], "embedding")
+
+            await client.ft("index").dropindex(False)
+            assert client.aliases == {} and len(client.data) == 7
+
+        asyncio.run(run())
+
+
+class TestFakeMilvus(unittest.TestCase):
+    def test_collection(self):
+        milvus = FakeMilvus()
+        milvus.connections.connect(alias="a", host="localhost", port=19530)
+        assert milvus.connections.has_connection("a")
+
+        schema = SimpleNamespace(
+            fields=[
+                SimpleNamespace(name="pk", is_primary=True, auto_id=True, dtype="INT64"),
+                SimpleNamespace(name="embedding", dtype="DataType.FLOAT_VECTOR"),
+                SimpleNamespace(name="document_id", dtype="VARCHAR"),
+            ]
+        )
+        col = milvus.Collection("c", schema=schema)
+        assert milvus.utility.has_collection("c")
+        col.create_index("embedding", index_params={"metric_type": "IP", "index_type": "HNSW"})
+        col.load()
+
+        data = vectors(10)
+        result = col.insert([data.tolist(), [str(i % 2) for i in range(10)]])
+        assert result.primary_keys == list(range(1, 11))
+        result = col.insert([{"embedding": data[0].tolist(), "document_id": "x"}])
+        assert col.num_entities == 11
+
+        hits = col.search(
+            data=[data[5].tolist()], anns_field="embedding", param={}, limit=3,
+            expr='document_id in ["1"]', output_fields=["document_id"],
+        )[0]
+        assert hits[0].id == 6
+        assert all(hit.entity.get("document_id") == "1" for hit in hits)
+
+        rows = col.query('document_id == "0"')
+        assert len(rows) == 5 and "pk" in rows[0]
+        assert col.delete(f"pk in [{','.join(str(row['pk']) for row in rows)}]").delete_count == 5
+
+        iterator = col.query_iterator(batch_size=4, expr='document_id != "x"', output_fields=["document_id"])
+        pages = []
+        while page := iterator.next():
+            pages.append([row["pk"] for row in page])
+        assert pages == [[2, 4, 6, 8], [10]]
+
+        milvus.delete_by_expression = False
+        with self.assertRaises(FakeMilvusException):
+            col.delete('document_id == "x"')
+        assert col.delete("pk in [2, 4]").delete_count == 2
+
+
+class TestFakePinecone(unittest.TestCase):
+    def test_index(self):
+        pinecone = FakePinecone(LatencyModel(per_item=0.0001))
+        pinecone.init(api_key="key", environment="env")
+        index = pinecone.Index("index", pool_threads=4)
+        data = vectors(10)
+        index.upsert(vectors=[(str(i), v.tolist(), {"n": i}) for i, v in enumerate(data)])
+        assert pinecone.Index("index").describe_index_stats().total_vector_count == 10
+
+        response = index.query(vector=data[2].tolist(), top_k=2, filter={"n": {"$gte": 2}}, include_metadata=True)
+        assert response.matches[0].id == "2" and response.matches[0].metadata == {"n": 2}
+        assert all(match.metadata["n"] >= 2 for match in response.matches)
+
+        index.delete(filter={"n": {"$in": [0, 1]}})
+        index.delete(ids=["2"])
+        assert index.describe_index_stats().total_vector_count == 7
@@ -0,0 +1,88 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from vectordbs.providers import hnsw_datastore
+from vectordbs.providers.hnsw_datastore import HnswDataStore, HnswOptions
+from vectordbs.providers.memory_datastore import MemoryDataStore, MemoryOptions
+from vectordbs.types import VectorStoreData, VectorStoreQuery
+
+
+class TestHnswDataStore(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.embeddings = rng.standard_normal((500, 16)).astype(np.float32)
+        self.datas = [
+            VectorStoreData(id=str(i), data={"i": i}, embedding=embedding.tolist())
+            for i, embedding in enumerate(self.embeddings)
+        ]
+        self.store = HnswDataStore(
+            HnswOptions(dimension=16, m=8, ef_construction=64, ef_search=64, initial_capacity=16, seed=0)
+        )
+        self.store.add(self.datas)
+        self.exact = MemoryDataStore(MemoryOptions(dimension=16))
+        self.exact.add(self.datas)
+
+    def test_recall(self):
+        hits = 0
+        for data in self.datas[:50]:
+            query = VectorStoreQuery(query_embedding=data.embedding, similarity_top_k=10)
+            hits += len(set(self.store.query(query).ids) & set(self.exact.query(query).ids))
+        assert hits / 500 >= 0.9
+
+    def test_query_order_and_self_match(self):
+        result = self.store.query(VectorStoreQuery(query_embedding=self.datas[42].embedding, similarity_top_k=5))
+        assert result.ids[0] == "42"
+        assert result.data[0] == {"i": 42}
+        assert result.similarities == sorted(result.similarities, reverse=True)
+
+    def test_delete_tombstones(self):
+        self.store.delete(["42"])
+        assert len(self.store) == 499
+        result = self.store.query(VectorStoreQuery(query_embedding=self.datas[42].embedding, similarity_top_k=10))
+        assert "42" not in result.ids
+        assert len(result.ids) == 10
+
+        # Re-adding brings it back
+        self.store.add([self.datas[42]])
+        result = self.store.query(VectorStoreQuery(query_embedding=self.datas[42].embedding))
+        assert result.ids == ["42"]
+
+    def test_query_ids(self):
+        result = self.store.query(
+            VectorStoreQuery(query_embedding=self.datas[3].embedding, similarity_top_k=5, ids=["3", "7"])
+        )
+        assert result.ids[0] == "3"
+        assert set(result.ids) <= {"3", "7"}
+
+    def test_ef_override_and_budget(self):
+        embedding = self.datas[8].embedding
+        narrow = self.store.query(VectorStoreQuery(query_embedding=embedding, similarity_top_k=10, ef=10))
+        exact = self.exact.query(VectorStoreQuery(query_embedding=embedding, similarity_top_k=10))
+        wide = self.store.query(VectorStoreQuery(query_embedding=embedding, similarity_top_k=10, ef=400))
+        assert wide.ids == exact.ids and not wide.partial
+        assert len(narrow.ids) == 10
+
+        spent = self.store.query(VectorStoreQuery(query_embedding=embedding, similarity_top_k=10, latency_budget=0))
+        assert spent.partial and 0 < len(spent.ids) <= 10
+
+    def test_budget_running_out_after_search_is_not_partial(self):
+        # The deadline expires as soon as the level 0 beam search returns
+        searched = []
+        deadline = mock.Mock(expired=lambda: bool(searched))
+        search_layer = self.store._search_layer
+
+        def search_then_expire(vector, entry_points, ef, level, *args):
+            result = search_layer(vector, entry_points, ef, level, *args)
+            if level == 0:
+                searched.append(level)
+            return result
+
+        embedding = self.datas[8].embedding
+        with mock.patch.object(hnsw_datastore.Deadline, "of", return_value=deadline), mock.patch.object(
+            self.store, "_search_layer", search_then_expire
+        ):
+            result = self.store.query(VectorStoreQuery(query_embedding=embedding, similarity_top_k=10))
+        assert searched and not result.partial
+        assert len(result.ids) == 10
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from vectordbs.ingest import aadd_stream, add_stream, aiter_batches, iter_batches, record_bytes
+from vectordbs.providers.memory_datastore import MemoryDataStore, MemoryOptions
+from vectordbs.types import VectorStoreData
+
+
+def records(count: int):
+    for i in range(count):
+        yield VectorStoreData(id=str(i), data={"i": i}, embedding=[float(i), 1.0])
+
+
+class TestIngest(unittest.TestCase):
+    def test_iter_batches_bounds(self):
+        batches = list(iter_batches(records(25), batch_size=10))
+        assert [len(batch) for batch in batches] == [10, 10, 5]
+
+        size = record_bytes(next(records(1)))
+        batches = list(iter_batches(records(10), batch_size=100, max_batch_bytes=3 * size))
+        assert all(len(batch) <= 3 for batch in batches)
+        assert sum(len(batch) for batch in batches) == 10
+
+        sizes = [5, 5, 20, 5, 5, 5]
+        batches = list(iter_batches(range(len(sizes)), batch_size=100, max_batch_bytes=10, nbytes=sizes.__getitem__))
+        assert batches == [[0, 1], [2], [3, 4], [5]]
+
+    def test_aiter_batches_matches_iter_batches(self):
+        sizes = [5, 5, 20, 5, 5, 5]
+
+        async def stream():
+            for i in range(len(sizes)):
+                yield i
+
+        async def collect(datas):
+            return [batch async for batch in aiter_batches(datas, 100, 10, sizes.__getitem__)]
+
+        expected = list(iter_batches(range(len(sizes)), 100, 10, sizes.__getitem__))
+        assert asyncio.run(collect(stream())) == expected
+        assert asyncio.run(collect(range(len(sizes)))) == expected
+
+    def test_add_stream_into_store(self):
+        store = MemoryDataStore(MemoryOptions(dimension=2))
+        reports = []
+        report = store.add_stream(records(250), batch_size=100, progress=lambda r: reports.append(r.added))
+        assert report.added == 250 and report.batches == 3 and not report.failures
+        assert len(store) == 250
+        assert sorted(reports) == [100, 200, 250]
+
+    def test_backpressure_and_failures(self):
+        pulled = []
+        lock = threading.Lock()
+        in_flight = [0, 0]
+        finished = [0]
+
+        def stream():
+            for data in records(40):
+                pulled.append(data.id)
+                yield data
+
+        def add(batch):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight[1], in_flight[0])
+                # Records held in memory: the batches in flight, the one being built and one lookahead
+                assert len(pulled) - finished[0] <= 3 * 5 + 1
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+                finished[0] += len(batch)
+            if batch[0].id == "10":
+                raise RuntimeError("boom")
+            return [data.id for data in batch]
+
+        report = add_stream(add, stream(), batch_size=5, max_in_flight=2)
+        assert report.batches == 8
+        assert report.added == 35
+        assert report.failed == 5
+        assert report.failures[0].batch == 2
+        assert report.failures[0].ids == [str(i) for i in range(10, 15)]
+        assert in_flight[1] == 2
+
+    def test_async_add_stream(self):
+        added = []
+
+        class AsyncStore:
+            async def add(self, batch):
+                await asyncio.sleep(0)
+                added.extend(data.id for data in batch)
+                return [data.id for data in batch]
+
+        async def stream():
+            for data in records(12):
+                yield data
+
+        report = asyncio.run(aadd_stream(AsyncStore().add, stream(), batch_size=5, max_in_flight=2))
+        assert report.added == 12 and report.batches == 3
+        assert sorted(added, key=int) == [str(i) for i in range(12)]
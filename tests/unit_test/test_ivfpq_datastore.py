@@ -0,0 +1,79 @@
+import unittest
+
+import numpy as np
+
+from vectordbs.providers.ivfpq_datastore import IvfPqDataStore, IvfPqOptions
+from vectordbs.providers.memory_datastore import MemoryDataStore, MemoryOptions
+from vectordbs.types import VectorStoreData, VectorStoreQuery
+
+
+class TestIvfPqDataStore(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        centers = rng.standard_normal((20, 32))
+        self.embeddings = (
+            centers[rng.integers(0, 20, 1000)] + 0.3 * rng.standard_normal((1000, 32))
+        ).astype(np.float32)
+        self.datas = [
+            VectorStoreData(id=str(i), data={"i": i}, embedding=embedding.tolist())
+            for i, embedding in enumerate(self.embeddings)
+        ]
+        self.store = IvfPqDataStore(
+            IvfPqOptions(dimension=32, nlist=16, m=16, nprobe=16, training_size=500, seed=0)
+        )
+
+    def test_untrained_is_exact(self):
+        self.store.add(self.datas[:100])
+        assert not self.store.is_trained
+        result = self.store.query(VectorStoreQuery(query_embedding=self.datas[5].embedding, similarity_top_k=3))
+        assert result.ids[0] == "5"
+
+    def test_trains_and_compresses(self):
+        self.store.add(self.datas)
+        assert self.store.is_trained
+        assert len(self.store) == 1000
+        assert self.store._codes.dtype == np.uint8
+        assert self.store._codes.shape[1] == 16
+
+        exact = MemoryDataStore(MemoryOptions(dimension=32))
+        exact.add(self.datas)
+        hits = 0
+        for data in self.datas[:50]:
+            query = VectorStoreQuery(query_embedding=data.embedding, similarity_top_k=10)
+            hits += len(set(self.store.query(query).ids) & set(exact.query(query).ids))
+        assert hits / 500 >= 0.5
+
+    def test_delete(self):
+        self.store.add(self.datas)
+        self.store.delete([str(i) for i in range(0, 1000, 2)])
+        assert len(self.store) == 500
+        result = self.store.query(VectorStoreQuery(query_embedding=self.datas[10].embedding, similarity_top_k=20))
+        assert len(result.ids) == 20
+        assert all(int(id) % 2 == 1 for id in result.ids)
+
+    def test_duplicate_ids_in_a_batch(self):
+        self.store.add(self.datas)
+        moved = VectorStoreData(id="7", data={"i": "last"}, embedding=self.datas[900].embedding)
+        self.store.add([self.datas[7], moved])
+        assert len(self.store) == 1000
+        result = self.store.query(VectorStoreQuery(query_embedding=self.datas[900].embedding, similarity_top_k=2))
+        assert set(result.ids) == {"7", "900"}
+        assert {"i": "last"} in result.data
+        self.store.delete(["7"])
+        assert len(self.store) == 999 and "7" not in self.store._rows
+
+    def test_nprobe_override_and_budget(self):
+        self.store.add(self.datas)
+        query = VectorStoreQuery(query_embedding=self.datas[10].embedding, similarity_top_k=5)
+        one = self.store.query(VectorStoreQuery(query_embedding=query.query_embedding, similarity_top_k=5, nprobe=1))
+        assert one.ids[0] == "10" and not one.partial
+
+        spent = self.store.query(
+            VectorStoreQuery(query_embedding=query.query_embedding, similarity_top_k=5, latency_budget=0)
+        )
+        # Only the closest list is scanned once the budget is gone
+        assert spent.partial and spent.ids == one.ids
+
+    def test_dimension_must_split(self):
+        with self.assertRaises(ValueError):
+            IvfPqDataStore(IvfPqOptions(dimension=30, m=16))
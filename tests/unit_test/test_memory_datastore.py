@@ -0,0 +1,119 @@
+import unittest
+
+import numpy as np
+
+from vectordbs import factory
+from vectordbs.providers.memory_datastore import MemoryDataStore, MemoryOptions
+from vectordbs.types import ColumnarQueryResult, VectorBatch, VectorStoreData, VectorStoreQuery, VectorStoreQueryMode
+
+
+def random_datas(count: int, dimension: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((count, dimension)).astype(np.float32)
+    return [
+        VectorStoreData(id=str(i), data={"i": i}, embedding=embedding.tolist())
+        for i, embedding in enumerate(embeddings)
+    ]
+
+
+class TestMemoryDataStore(unittest.TestCase):
+    def setUp(self):
+        self.store = MemoryDataStore(MemoryOptions(dimension=8, initial_capacity=2))
+        self.datas = random_datas(50, 8)
+        self.store.add(self.datas)
+
+    def test_factory(self):
+        assert isinstance(factory.get_datastore("memory"), MemoryDataStore)
+
+    def test_query_is_exact(self):
+        query = self.datas[7].embedding
+        result = self.store.query(VectorStoreQuery(query_embedding=query, similarity_top_k=5))
+        assert result.ids[0] == "7"
+        assert len(result.ids) == 5
+        assert result.similarities == sorted(result.similarities, reverse=True)
+        assert result.data[0] == {"i": 7}
+
+        matrix = np.array([data.embedding for data in self.datas], dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        expected = np.argsort(-(matrix @ matrix[7]))[:5]
+        assert result.ids == [str(i) for i in expected]
+
+    def test_upsert_and_delete(self):
+        self.store.add([VectorStoreData(id="3", data={"i": "new"}, embedding=self.datas[3].embedding)])
+        assert len(self.store) == 50
+
+        self.store.delete(["3", "0", "missing"])
+        assert len(self.store) == 48
+        result = self.store.query(
+            VectorStoreQuery(query_embedding=self.datas[3].embedding, similarity_top_k=50)
+        )
+        assert "3" not in result.ids and "0" not in result.ids
+        assert len(result.ids) == 48
+
+        # The row moved into the freed slot is still found
+        result = self.store.query(VectorStoreQuery(query_embedding=self.datas[49].embedding))
+        assert result.ids == ["49"]
+
+    def test_query_ids(self):
+        result = self.store.query(
+            VectorStoreQuery(query_embedding=self.datas[1].embedding, similarity_top_k=3, ids=["1", "2"])
+        )
+        assert result.ids[0] == "1"
+        assert set(result.ids) == {"1", "2"}
+
+    def test_unsupported_mode(self):
+        with self.assertRaises(ValueError):
+            self.store.query(
+                VectorStoreQuery(query_embedding=self.datas[0].embedding, mode=VectorStoreQueryMode.SPARSE)
+            )
+
+    def test_query_batch_matches_query(self):
+        for distance in ("Cosine", "Dot", "Euclid"):
+            store = MemoryDataStore(MemoryOptions(dimension=8, distance=distance))
+            store.add(self.datas)
+            queries = [
+                VectorStoreQuery(query_embedding=self.datas[i].embedding, similarity_top_k=i + 1)
+                for i in range(5)
+            ]
+            queries.append(VectorStoreQuery(query_embedding=self.datas[9].embedding, ids=["9", "10"]))
+            batched = store.query_batch(queries)
+            for query, result in zip(queries, batched):
+                expected = store.query(query)
+                assert result.ids == expected.ids
+                np.testing.assert_allclose(result.similarities, expected.similarities, rtol=1e-4, atol=1e-4)
+
+    def test_add_vector_batch(self):
+        batch = VectorBatch.from_datas(self.datas)
+        assert batch.embeddings.shape == (50, 8)
+        assert batch.columns["i"][:3] == [0, 1, 2]
+
+        store = MemoryDataStore(MemoryOptions(dimension=8))
+        assert store.add(batch) == [data.id for data in self.datas]
+        query = VectorStoreQuery(query_embedding=self.datas[3].embedding, similarity_top_k=4)
+        assert store.query(query) == self.store.query(query)
+
+    def test_vector_batch_round_trip(self):
+        datas = [
+            VectorStoreData(id="a", data={"x": 1}, embedding=[1.0, 0.0]),
+            VectorStoreData(id="b", data={"y": "z"}, embedding=[0.0, 1.0]),
+        ]
+        rows = VectorBatch.from_datas(datas).rows()
+        assert [(row.id, row.data) for row in rows] == [("a", {"x": 1}), ("b", {"y": "z"})]
+        np.testing.assert_array_equal(rows[1].embedding, [0.0, 1.0])
+
+    def test_vector_batch_validates_shape(self):
+        store = MemoryDataStore(MemoryOptions(dimension=8))
+        with self.assertRaises(ValueError):
+            store.add(VectorBatch(ids=["a", "b"], embeddings=np.zeros((3, 8), dtype=np.float32)))
+        with self.assertRaises(ValueError):
+            store.add(VectorBatch(ids=["a"], embeddings=np.zeros((1, 4), dtype=np.float32)))
+
+    def test_query_columnar(self):
+        query = VectorStoreQuery(query_embedding=self.datas[5].embedding, similarity_top_k=3)
+        result = self.store.query_columnar(query)
+        assert isinstance(result, ColumnarQueryResult)
+        assert isinstance(result.similarities, np.ndarray)
+        assert result == self.store.query(query)
+        id, similarity, data = result.rows()[0]
+        assert id == "5" and data == {"i": 5}
+        assert similarity == result.similarities[0]
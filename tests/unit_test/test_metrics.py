@@ -0,0 +1,99 @@
+import unittest
+from types import SimpleNamespace
+
+from vectordbs import metrics
+from vectordbs.providers.memory_datastore import MemoryDataStore, MemoryOptions
+from vectordbs.types import VectorStoreData, VectorStoreQuery
+
+
+class RecordingMeter:
+    def __init__(self):
+        self.records = []
+
+    def _instrument(self, name, **kwargs):
+        record = lambda value, attributes: self.records.append((name, value, attributes))  # noqa: E731
+        return SimpleNamespace(record=record, add=record)
+
+    create_histogram = create_counter = _instrument
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.recorder = metrics.add_hook(metrics.MetricsRecorder())
+
+    def tearDown(self):
+        metrics.remove_hook(self.recorder)
+
+    def test_disabled_is_noop(self):
+        metrics.remove_hook(self.recorder)
+        assert not metrics.enabled()
+        op = metrics.operation("store", "query")
+        assert op is metrics._NOOP and not op
+        with op, op.phase("network"):
+            op.bytes_sent = 10
+
+    def test_phases_and_errors(self):
+        with metrics.operation("store", "add", batch_size=3) as op:
+            with op.phase("serialize"):
+                pass
+            for _ in range(2):
+                with op.phase("network"):
+                    pass
+            op.bytes_sent += 48
+
+        with self.assertRaises(RuntimeError):
+            with metrics.operation("store", "add", batch_size=1) as op, op.phase("network"):
+                raise RuntimeError("down")
+
+        report = self.recorder.snapshot()["store.add"]
+        assert report["latency"]["total"]["count"] == 2
+        assert report["latency"]["network"]["count"] == 2
+        assert report["latency"]["serialize"]["count"] == 1
+        assert report["batch_size"]["sum"] == 4
+        assert report["bytes_sent"] == 48
+        assert report["errors"] == 1
+
+    def test_broken_hook_does_not_fail(self):
+        class Broken(metrics.MetricsHook):
+            def on_operation(self, event):
+                raise ValueError("exporter down")
+
+        broken = metrics.add_hook(Broken())
+        try:
+            with self.assertLogs(level="ERROR"):
+                with metrics.operation("store", "query"):
+                    pass
+        finally:
+            metrics.remove_hook(broken)
+        assert self.recorder.snapshot()["store.query"]["latency"]["total"]["count"] == 1
+
+    def test_instrumented_store(self):
+        store = metrics.InstrumentedVectorStore(MemoryDataStore(MemoryOptions(dimension=2)), name="memory")
+        store.add([VectorStoreData(id=str(i), data={}, embedding=[float(i), 1.0]) for i in range(5)])
+        store.query_batch([VectorStoreQuery(query_embedding=[1.0, 0.0])] * 3)
+        store.delete(["1"])
+
+        report = self.recorder.snapshot()
+        assert report["memory.add"]["batch_size"]["sum"] == 5
+        assert report["memory.query_batch"]["batch_size"]["sum"] == 3
+        assert report["memory.delete"]["latency"]["total"]["count"] == 1
+
+    def test_histogram_quantile(self):
+        histogram = metrics.Histogram([1, 2, 5])
+        for value in [0.5, 1.5, 1.5, 3, 10]:
+            histogram.observe(value)
+        assert histogram.quantile(0.5) == 2
+        assert histogram.quantile(0.99) == float("inf")
+
+    def test_opentelemetry_hook(self):
+        meter = RecordingMeter()
+        hook = metrics.add_hook(metrics.OpenTelemetryHook(meter))
+        try:
+            with metrics.operation("store", "query", batch_size=2, bytes_sent=16) as op, op.phase("parse"):
+                pass
+        finally:
+            metrics.remove_hook(hook)
+        names = [(name, attributes.get("phase")) for name, _, attributes in meter.records]
+        assert ("vectordbs.operation.duration", "total") in names
+        assert ("vectordbs.operation.duration", "parse") in names
+        assert ("vectordbs.operation.bytes_sent", None) in names
@@ -0,0 +1,97 @@
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from vectordbs.providers.memory_datastore import MemoryDataStore, MemoryOptions
+from vectordbs.providers.mmap_datastore import MmapDataStore, MmapOptions
+from vectordbs.types import VectorBatch, VectorStoreData, VectorStoreQuery
+
+
+class TestMmapDataStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.options = MmapOptions(path=self.tmpdir.name, dimension=8, segment_size=16)
+        rng = np.random.default_rng(0)
+        self.datas = [
+            VectorStoreData(id=str(i), data={"i": i}, embedding=embedding.tolist())
+            for i, embedding in enumerate(rng.standard_normal((50, 8)).astype(np.float32))
+        ]
+        self.store = MmapDataStore(self.options)
+        self.store.add(self.datas[:30])
+        self.store.add(self.datas[30:])
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_query_matches_exact(self):
+        exact = MemoryDataStore(MemoryOptions(dimension=8))
+        exact.add(self.datas)
+        query = VectorStoreQuery(query_embedding=self.datas[20].embedding, similarity_top_k=7)
+        result = self.store.query(query)
+        assert result.ids == exact.query(query).ids
+        assert result.data[0] == {"i": 20}
+
+    def test_reopen_and_delete(self):
+        self.store.delete(["20", "missing"])
+        self.store.add([VectorStoreData(id="21", data={"i": "new"}, embedding=self.datas[21].embedding)])
+
+        reopened = MmapDataStore(self.options)
+        assert len(reopened) == 49
+        result = reopened.query(VectorStoreQuery(query_embedding=self.datas[20].embedding, similarity_top_k=50))
+        assert "20" not in result.ids
+        assert len(result.ids) == 49
+        assert result.ids.count("21") == 1
+
+        result = reopened.query(VectorStoreQuery(query_embedding=self.datas[21].embedding))
+        assert result.data == [{"i": "new"}]
+
+    def test_duplicate_ids_in_a_batch(self):
+        moved = VectorStoreData(id="5", data={"i": "last"}, embedding=self.datas[45].embedding)
+        self.store.add([self.datas[5], moved, self.datas[6]])
+        for store in (self.store, MmapDataStore(self.options)):
+            assert len(store) == 50
+            result = store.query(VectorStoreQuery(query_embedding=self.datas[5].embedding, similarity_top_k=50))
+            assert result.ids.count("5") == 1
+            result = store.query(VectorStoreQuery(query_embedding=self.datas[45].embedding, similarity_top_k=2))
+            assert set(result.ids) == {"5", "45"} and {"i": "last"} in result.data
+
+    def test_tombstones_stay_in_memory(self):
+        reopened = MmapDataStore(self.options)
+        with mock.patch("numpy.fromfile", side_effect=AssertionError("bitmap re-read")):
+            reopened.delete(["1", "2"])
+            assert len(reopened) == 48
+            result = reopened.query(VectorStoreQuery(query_embedding=self.datas[1].embedding, similarity_top_k=50))
+            assert "1" not in result.ids and len(result.ids) == 48
+        assert len(MmapDataStore(self.options)) == 48
+
+    def test_query_ids(self):
+        result = self.store.query(
+            VectorStoreQuery(query_embedding=self.datas[3].embedding, similarity_top_k=5, ids=["3", "40"])
+        )
+        assert set(result.ids) == {"3", "40"}
+        assert result.ids[0] == "3"
+
+    def test_latency_budget(self):
+        query = VectorStoreQuery(query_embedding=self.datas[40].embedding, similarity_top_k=3, latency_budget=0)
+        result = self.store.query(query)
+        # Only the first segment is scanned once the budget is gone
+        assert result.partial and set(result.ids) <= {str(i) for i in range(16)}
+        assert all(result.partial for result in self.store.query_batch([query, query]))
+        assert not self.store.query(VectorStoreQuery(query_embedding=self.datas[40].embedding)).partial
+
+    def test_query_batch_matches_query(self):
+        queries = [
+            VectorStoreQuery(query_embedding=self.datas[i].embedding, similarity_top_k=i + 1)
+            for i in range(0, 40, 8)
+        ]
+        for query, result in zip(queries, self.store.query_batch(queries)):
+            assert result.ids == self.store.query(query).ids
+
+    def test_add_vector_batch(self):
+        store = MmapDataStore(MmapOptions(path=self.tmpdir.name + "/batch", dimension=8, segment_size=16))
+        store.add(VectorBatch.from_datas(self.datas))
+        query = VectorStoreQuery(query_embedding=self.datas[12].embedding, similarity_top_k=5)
+        assert store.query(query) == self.store.query(query)
+        assert store.query_columnar(query).rows()[0][2] == {"i": 12}
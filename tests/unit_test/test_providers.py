@@ -0,0 +1,358 @@
+import ast
+import asyncio
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from vectordbs import tuning
+from vectordbs.fakes import FakeMilvus, FakePinecone, FakeQdrantClient, FakeRedis, LatencyModel
+from vectordbs.types import VectorStoreData, VectorStoreQuery
+
+PROVIDERS = os.path.join(os.path.dirname(__file__), "..", "..", "vectordbs", "providers")
+# Methods the store base classes provide, the vectordbs ABCs and the retrieval plugin's DataStore
+BASE_CLASSES = {"VectorStore", "AsyncVectorStore", "DataStore"}
+BASE_METHODS = {
+    "add", "add_stream", "close", "delete", "query", "query_batch", "query_columnar", "upsert", "delete_all",
+}
+
+try:
+    from vectordbs.providers import qdrant_datastore
+except ImportError:
+    qdrant_datastore = None
+
+try:
+    from vectordbs.providers import milvus_datastore
+except ImportError:
+    milvus_datastore = None
+
+try:
+    from vectordbs.providers import pinecone_datastore
+except ImportError:
+    pinecone_datastore = None
+
+try:
+    from vectordbs.providers import redis_datastore
+except ImportError:
+    redis_datastore = None
+
+
+def _datas(count: int = 20, dimension: int = 8):
+    embeddings = np.random.default_rng(0).standard_normal((count, dimension)).astype(np.float32)
+    # Unit length, so every store ranks a stored vector first for itself whatever its metric
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return [
+        VectorStoreData(id=str(i), data={"document_id": str(i % 2), "text": f"text {i}"}, embedding=embeddings[i])
+        for i in range(count)
+    ]
+
+
+def _classes():
+    classes = {}
+    for name in sorted(os.listdir(PROVIDERS)):
+        if name.endswith(".py"):
+            with open(os.path.join(PROVIDERS, name)) as f:
+                tree = ast.parse(f.read(), name)
+            # Only defs directly in the class body are methods, a misindented
+            # def at module level must not count
+            classes.update(
+                {
+                    node.name: (
+                        name,
+                        node,
+                        {
+                            method.name
+                            for method in node.body
+                            if isinstance(method, (ast.FunctionDef, ast.AsyncFunctionDef))
+                        },
+                    )
+                    for node in tree.body
+                    if isinstance(node, ast.ClassDef)
+                }
+            )
+    return classes
+
+
+def _methods(classes, name):
+    if name not in classes:
+        return set()
+    _, node, methods = classes[name]
+    for base in node.bases:
+        if isinstance(base, ast.Name):
+            methods = methods | _methods(classes, base.id)
+    return methods
+
+
+def _is_datastore(classes, name):
+    # Subclasses of a store base class, directly or through another provider
+    _, node, _ = classes[name]
+    bases = [base.id for base in node.bases if isinstance(base, ast.Name)]
+    return bool(BASE_CLASSES & set(bases)) or any(base in classes and _is_datastore(classes, base) for base in bases)
+
+
+class TestProviderMethods(unittest.TestCase):
+    def test_self_calls_resolve(self):
+        # The remote providers only import with their SDKs, so check statically
+        # that every self.method() they call is defined on the class or a base
+        classes = _classes()
+        for name, (filename, node, _) in classes.items():
+            if not _is_datastore(classes, name):
+                continue
+            methods = _methods(classes, name) | BASE_METHODS
+            called = {
+                call.func.attr
+                for call in ast.walk(node)
+                if isinstance(call, ast.Call)
+                and isinstance(call.func, ast.Attribute)
+                and isinstance(call.func.value, ast.Name)
+                and call.func.value.id in ("self", "cls")
+            }
+            attributes = {
+                target.attr
+                for assign in ast.walk(node)
+                if isinstance(assign, (ast.Assign, ast.AnnAssign))
+                for target in (assign.targets if isinstance(assign, ast.Assign) else [assign.target])
+                if isinstance(target, ast.Attribute)
+            }
+            missing = called - methods - attributes
+            assert not missing, f"{filename} {name} calls undefined {sorted(missing)}"
+
+
+@unittest.skipIf(redis_datastore is None, "redis is not installed")
+class TestRedisDataStore(unittest.TestCase):
+    def test_add_query_delete(self):
+        async def run():
+            client = FakeRedis()
+            with client.patch(redis_datastore):
+                store = await redis_datastore.RedisDataStore.init()
+            datas = _datas(6)
+            assert await store.add(datas) == [str(i) for i in range(6)]
+
+            query = VectorStoreQuery(query_embedding=datas[4].embedding, similarity_top_k=6)
+            result = await store.query(query)
+            assert result.ids[0] == "4"
+            assert result.data[0] == {"document_id": "0", "text": "text 4"}
+
+            # Deletes by document id, chunks 0, 2 and 4 belong to document "0"
+            assert await store.delete(ids=["0"])
+            result = await store.query(query)
+            assert sorted(result.ids) == ["1", "3", "5"]
+
+        asyncio.run(run())
+
+    def test_delete_with_legacy_document_id_index(self):
+        if redis_datastore.REDIS_STORAGE_TYPE != "JSON":
+            self.skipTest("legacy indexes are JSON")
+
+        async def run():
+            client = FakeRedis()
+            # Indexes built before document_id moved into the metadata
+            schema = redis_datastore.search_schema("JSON", redis_datastore.REDIS_VECTOR_TYPE)
+            schema["document_id"] = redis_datastore.TagField("$.document_id", as_name="document_id")
+            await client.ft(redis_datastore.REDIS_INDEX_NAME).create_index(
+                fields=list(redis_datastore.unpack_schema(schema)),
+                definition=redis_datastore.IndexDefinition(
+                    prefix=[redis_datastore.REDIS_DOC_PREFIX], index_type=redis_datastore.IndexType.JSON
+                ),
+            )
+            with client.patch(redis_datastore):
+                store = await redis_datastore.RedisDataStore.init()
+            assert not store.document_id_indexed
+            datas = _datas(6)
+            await store.add(datas)
+
+            assert await store.delete(ids=["0"])
+            result = await store.query(VectorStoreQuery(query_embedding=datas[4].embedding, similarity_top_k=6))
+            assert sorted(result.ids) == ["1", "3", "5"]
+
+        asyncio.run(run())
+
+    def test_init_reads_existing_index(self):
+        async def run():
+            client = FakeRedis()
+            # Created with other settings than the ones in the environment now
+            storage_type = "HASH" if redis_datastore.REDIS_STORAGE_TYPE == "JSON" else "JSON"
+            await redis_datastore._create_index(
+                client, redis_datastore.REDIS_INDEX_NAME, storage_type, "FLOAT16", "L2"
+            )
+            with client.patch(redis_datastore):
+                store = await redis_datastore.RedisDataStore.init()
+            assert (store.storage_type, store.vector_type, store.distance_metric) == (storage_type, "FLOAT16", "L2")
+            assert store.document_id_indexed
+
+            datas = _datas(6)
+            await store.add(datas)
+            result = await store.query(VectorStoreQuery(query_embedding=datas[4].embedding, similarity_top_k=2))
+            assert result.ids[0] == "4"
+            assert result.similarities[0] > result.similarities[1]
+
+        asyncio.run(run())
+
+
+class QueryBatchTests:
+    """
+    Shared checks of a provider's native query_batch against its fake: each
+    query finds its own vector first, the batch costs the expected number of
+    requests and an exhausted latency budget gives partial results.
+    """
+
+    # Fake requests one query_batch of several queries may cost
+    batch_requests = 1
+
+    async def create_store(self):
+        raise NotImplementedError
+
+    def test_query_batch(self):
+        async def run():
+            store = await self.create_store()
+            datas = _datas()
+            await store.add(datas)
+            queries = [VectorStoreQuery(query_embedding=datas[i].embedding, similarity_top_k=3) for i in (0, 5, 11)]
+            requests = self.fake.latency.requests
+            results = await store.query_batch(queries)
+            assert self.fake.latency.requests - requests == self.batch_requests
+            assert [result.ids[0] for result in results] == ["0", "5", "11"]
+            for result in results:
+                assert len(result.ids) == 3 and not result.partial
+                assert result.similarities == sorted(result.similarities, reverse=True)
+            assert results[1].data[0]["text"] == "text 5"
+            assert await store.query(queries[1]) == results[1]
+            await store.close()
+
+        asyncio.run(run())
+
+    def test_query_batch_partial(self):
+        async def run():
+            store = await self.create_store()
+            datas = _datas()
+            await store.add(datas)
+            self.fake.latency = LatencyModel(latency=0.5)
+            queries = [
+                VectorStoreQuery(query_embedding=datas[i].embedding, similarity_top_k=3, latency_budget=0.05)
+                for i in range(3)
+            ]
+            results = await store.query_batch(queries)
+            assert all(result.partial and result.ids == [] for result in results)
+            await store.close()
+
+        asyncio.run(run())
+
+
+@unittest.skipIf(qdrant_datastore is None, "qdrant-client is not installed")
+class TestQdrantQueryBatch(QueryBatchTests, unittest.TestCase):
+    async def create_store(self):
+        self.fake = FakeQdrantClient()
+        with self.fake.patch(qdrant_datastore):
+            return qdrant_datastore.QdrantDataStore(qdrant_datastore.QdrantOptions(vector_size=8))
+
+    def test_query_batch_ids(self):
+        async def run():
+            store = await self.create_store()
+            datas = _datas()
+            await store.add(datas)
+            [result] = await store.query_batch(
+                [VectorStoreQuery(query_embedding=datas[0].embedding, similarity_top_k=5, ids=["3", "4"])]
+            )
+            assert sorted(result.ids) == ["3", "4"]
+            await store.close()
+
+        asyncio.run(run())
+
+
+@unittest.skipIf(milvus_datastore is None, "pymilvus is not installed")
+class TestMilvusQueryBatch(QueryBatchTests, unittest.TestCase):
+    async def create_store(self):
+        self.fake = FakeMilvus()
+        with self.fake.patch(milvus_datastore):
+            return milvus_datastore.MilvusDataStore(consistency_level="Strong")
+
+    def test_query_batch_ids(self):
+        async def run():
+            store = await self.create_store()
+            datas = _datas()
+            await store.add(datas)
+            queries = [
+                VectorStoreQuery(query_embedding=datas[i].embedding, similarity_top_k=5, ids=["3", "4"])
+                for i in range(2)
+            ]
+            requests = self.fake.latency.requests
+            results = await store.query_batch(queries)
+            # Queries with the same restriction share one search
+            assert self.fake.latency.requests - requests == 1
+            assert all(sorted(result.ids) == ["3", "4"] for result in results)
+            await store.close()
+
+        asyncio.run(run())
+
+    def test_tune_search_params(self):
+        async def run(without_iterator: bool):
+            index_params = {"metric_type": "IP", "index_type": "HNSW", "params": {"M": 8, "efConstruction": 64}}
+            with mock.patch.object(milvus_datastore, "MILVUS_INDEX_PARAMS", json.dumps(index_params)):
+                store = await self.create_store()
+            await store.add(_datas(50))
+            if without_iterator:
+                store.col = _WithoutQueryIterator(store.col)
+            # Several pages, the exact neighbours need all of them
+            with tempfile.TemporaryDirectory() as tmp, mock.patch.object(
+                tuning, "VECTORDBS_TUNING_PATH", os.path.join(tmp, "tuning.json")
+            ), mock.patch.object(milvus_datastore, "MILVUS_TUNING_PAGE_SIZE", 7):
+                result = await store.tune_search_params(k=5, sample=10, values=[8, 16])
+            # The fake searches exactly, the smallest effort is enough
+            assert (result.value, result.recall) == (8, 1.0)
+            assert store.search_params["params"]["ef"] == 8
+            await store.close()
+
+        for without_iterator in (False, True):
+            with self.subTest(without_iterator=without_iterator):
+                asyncio.run(run(without_iterator))
+
+
+class _WithoutQueryIterator:
+    """A collection of a pymilvus release before query_iterator."""
+
+    def __init__(self, col):
+        self._col = col
+
+    def __getattr__(self, name: str):
+        if name == "query_iterator":
+            raise AttributeError(name)
+        return getattr(self._col, name)
+
+
+@unittest.skipIf(redis_datastore is None, "redis is not installed")
+class TestRedisQueryBatch(QueryBatchTests, unittest.TestCase):
+    async def create_store(self):
+        self.fake = FakeRedis()
+        with self.fake.patch(redis_datastore):
+            return await redis_datastore.RedisDataStore.init()
+
+
+@unittest.skipIf(pinecone_datastore is None, "pinecone-client is not installed")
+class TestPineconeQueryBatch(QueryBatchTests, unittest.TestCase):
+    # One concurrent request per query
+    batch_requests = 3
+
+    async def create_store(self):
+        self.fake = FakePinecone()
+        with self.fake.patch(pinecone_datastore):
+            return pinecone_datastore.PineconeDataStore(
+                pinecone_datastore.PineconeOptions(api_key="key", environment="env", index="index")
+            )
+
+    def test_requests_overlap(self):
+        async def run():
+            store = await self.create_store()
+            datas = _datas()
+            await store.add(datas)
+            self.fake.latency = LatencyModel(latency=0.1)
+            queries = [VectorStoreQuery(query_embedding=data.embedding, similarity_top_k=3) for data in datas[:4]]
+            start = time.perf_counter()
+            await store.query_batch(queries)
+            assert time.perf_counter() - start < 0.3
+            await store.close()
+
+        asyncio.run(run())
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from vectordbs.providers.hnsw_datastore import HnswDataStore, HnswOptions
+from vectordbs.providers.memory_datastore import MemoryDataStore, MemoryOptions
+from vectordbs.tuning import (
+    Candidate,
+    choose,
+    ef_values,
+    exact_neighbors,
+    load_tuning,
+    nprobe_values,
+    recall,
+    sample_ids,
+    save_tuning,
+    tune_store,
+)
+from vectordbs.types import VectorStoreData, VectorStoreQuery
+
+
+class TestTuning(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.embeddings = rng.standard_normal((400, 16)).astype(np.float32)
+        self.ids = [str(i) for i in range(len(self.embeddings))]
+        self.queries = self.embeddings[:20] + 0.1 * rng.standard_normal((20, 16)).astype(np.float32)
+
+    def pages(self, size: int):
+        for start in range(0, len(self.ids), size):
+            yield self.ids[start : start + size], self.embeddings[start : start + size]
+
+    def test_exact_neighbors_match_memory_store(self):
+        exact = MemoryDataStore(MemoryOptions(dimension=16))
+        exact.add([VectorStoreData(id=id, data={}, embedding=e) for id, e in zip(self.ids, self.embeddings)])
+        truth = exact_neighbors(self.pages(64), self.queries, k=5)
+        for query, expected in zip(self.queries, truth):
+            assert exact.query(VectorStoreQuery(query_embedding=query, similarity_top_k=5)).ids == expected
+        assert recall(truth, truth) == 1.0
+        assert abs(recall([ids[:1] for ids in truth], truth) - 0.2) < 1e-9
+
+    def test_choose_and_candidate_values(self):
+        candidates = [Candidate(8, 0.8, 1.0), Candidate(16, 0.96, 2.0), Candidate(32, 0.99, 3.0)]
+        assert choose(candidates, 0.95).value == 16
+        assert choose(candidates, 0.999).value == 32
+        # A larger value timed faster by noise does not win
+        assert choose(candidates + [Candidate(64, 0.99, 1.5)], 0.95).value == 16
+        assert ef_values(20) == [20, 32, 64, 128, 256, 512]
+        assert nprobe_values(12) == [1, 2, 4, 8, 12]
+
+    def test_sample_ids(self):
+        assert sample_ids(range(5), 10) == [0, 1, 2, 3, 4]
+        drawn = sample_ids(range(1000), 50, seed=0)
+        assert len(set(drawn)) == 50 and max(drawn) > 500
+
+    def test_tune_hnsw_and_persist(self):
+        store = HnswDataStore(HnswOptions(dimension=16, m=4, ef_construction=32, ef_search=1, seed=0))
+        store.add([VectorStoreData(id=id, data={}, embedding=e) for id, e in zip(self.ids, self.embeddings)])
+        truth = exact_neighbors(self.pages(100), self.queries, k=10)
+
+        result = tune_store(store, "ef_search", ef_values(10, (10, 20, 40, 80, 160)), self.queries, truth, 0.9)
+        assert result.met_target and store.ef_search == result.value
+        assert [candidate.value for candidate in result.candidates] == [10, 20, 40, 80, 160]
+
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, "tuning", "tuning.json")
+            assert load_tuning("hnsw", "", path) is None
+            save_tuning("hnsw", result, path)
+            assert load_tuning("hnsw", "", path) == result
@@ -0,0 +1,21 @@
+import argparse
+import sys
+from typing import List, Optional
+
+from vectordbs import bench
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="vectordbs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bench_parser = commands.add_parser("bench", help="Benchmark providers through the VectorStore interface")
+    bench.add_arguments(bench_parser)
+    bench_parser.set_defaults(run=bench.run)
+
+    args = parser.parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
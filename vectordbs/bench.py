@@ -0,0 +1,454 @@
+"""
+Benchmark harness for VectorStore providers.
+
+Measures ingest throughput, query QPS, latency percentiles and recall@k against
+exact NumPy ground truth, sweeping batch size, concurrency and top k. Run it with
+
+    python -m vectordbs bench --provider memory --provider hnsw --output bench.json
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from unittest import mock
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from vectordbs import factory
+from vectordbs.distances import normalize, top_k
+from vectordbs.types import (
+    AsyncVectorStore,
+    QueryResult,
+    VectorStore,
+    VectorStoreData,
+    VectorStoreQuery,
+)
+
+
+@dataclass
+class Dataset:
+    vectors: np.ndarray
+    queries: np.ndarray
+    distance: str = "Cosine"
+
+    @property
+    def dimension(self) -> int:
+        return self.vectors.shape[1]
+
+    def datas(self) -> List[VectorStoreData]:
+        return [
+            VectorStoreData(id=str(i), data={"i": i}, embedding=vector)
+            for i, vector in enumerate(self.vectors)
+        ]
+
+    def ground_truth(self, k: int) -> np.ndarray:
+        """
+        Exact top k row numbers for every query, best first.
+        """
+        vectors, queries = self.vectors, self.queries
+        if self.distance == "Cosine":
+            vectors, queries = normalize(vectors), normalize(queries)
+        scores = queries @ vectors.T
+        if self.distance == "Euclid":
+            scores = 2 * scores - (vectors * vectors).sum(axis=1)
+        return np.stack([top_k(row, k) for row in scores])
+
+
+def generate_dataset(
+    count: int,
+    dimension: int,
+    queries: int,
+    distance: str = "Cosine",
+    seed: int = 0,
+) -> Dataset:
+    """
+    Clustered Gaussian vectors, closer to real embeddings than iid noise.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, count // 100), dimension)).astype(np.float32)
+
+    def sample(n: int) -> np.ndarray:
+        noise = 0.5 * rng.standard_normal((n, dimension)).astype(np.float32)
+        return centers[rng.integers(len(centers), size=n)] + noise
+
+    return Dataset(sample(count), sample(queries), distance)
+
+
+def load_dataset(path: str, queries: int, distance: str = "Cosine", seed: int = 0) -> Dataset:
+    """
+    Load vectors from a .npy file, holding out a random sample as queries.
+    """
+    vectors = np.load(path).astype(np.float32)
+    rows = np.random.default_rng(seed).permutation(len(vectors))
+    return Dataset(vectors[rows[queries:]], vectors[rows[:queries]], distance)
+
+
+### Providers ###
+
+
+def _memory(dataset: Dataset, workdir: str) -> VectorStore:
+    from vectordbs.providers.memory_datastore import MemoryDataStore, MemoryOptions
+
+    return MemoryDataStore(MemoryOptions(dimension=dataset.dimension, distance=dataset.distance))
+
+
+def _hnsw(dataset: Dataset, workdir: str) -> VectorStore:
+    from vectordbs.providers.hnsw_datastore import HnswDataStore, HnswOptions
+
+    return HnswDataStore(HnswOptions(dimension=dataset.dimension, distance=dataset.distance, seed=0))
+
+
+def _ivfpq(dataset: Dataset, workdir: str) -> VectorStore:
+    from vectordbs.providers.ivfpq_datastore import IvfPqDataStore, IvfPqOptions
+
+    dimension = dataset.dimension
+    m = next(m for m in (dimension // 8, dimension // 4, dimension // 2, dimension) if m and dimension % m == 0)
+    return IvfPqDataStore(
+        IvfPqOptions(
+            dimension=dimension,
+            distance=dataset.distance,
+            m=m,
+            nlist=max(1, min(256, len(dataset.vectors) // 39)),
+            training_size=min(10000, len(dataset.vectors)),
+            seed=0,
+        )
+    )
+
+
+def _mmap(dataset: Dataset, workdir: str) -> VectorStore:
+    from vectordbs.providers.mmap_datastore import MmapDataStore, MmapOptions
+
+    path = tempfile.mkdtemp(prefix="mmap-", dir=workdir)
+    return MmapDataStore(MmapOptions(path=path, dimension=dataset.dimension, distance=dataset.distance))
+
+
+# Offline providers sized to the dataset, anything else goes through the factory
+LOCAL_PROVIDERS: Dict[str, Callable[[Dataset, str], VectorStore]] = {
+    "memory": _memory,
+    "hnsw": _hnsw,
+    "ivfpq": _ivfpq,
+    "mmap": _mmap,
+}
+
+# Names of the remote providers map to the store names of the dataset's distance
+_FAKE_METRICS = {
+    "qdrant": {"Cosine": "Cosine", "Dot": "Dot", "Euclid": "Euclid"},
+    "milvus": {"Cosine": "COSINE", "Dot": "IP", "Euclid": "L2"},
+    "redis": {"Cosine": "COSINE", "Dot": "IP", "Euclid": "L2"},
+    "pinecone": {"Cosine": "cosine", "Dot": "dotproduct", "Euclid": "euclidean"},
+}
+
+
+async def _fake_qdrant(dataset: Dataset) -> AsyncVectorStore:
+    from vectordbs.fakes import FakeQdrantClient
+    from vectordbs.providers import qdrant_datastore
+
+    options = qdrant_datastore.QdrantOptions(
+        vector_size=dataset.dimension, distance=_FAKE_METRICS["qdrant"][dataset.distance]
+    )
+    with FakeQdrantClient().patch(qdrant_datastore):
+        return qdrant_datastore.QdrantDataStore(options, recreate_collection=True)
+
+
+async def _fake_milvus(dataset: Dataset) -> AsyncVectorStore:
+    from vectordbs.fakes import FakeMilvus
+    from vectordbs.providers import milvus_datastore
+
+    index_params = {
+        "metric_type": _FAKE_METRICS["milvus"][dataset.distance],
+        "index_type": "HNSW",
+        "params": {"M": 8, "efConstruction": 64},
+    }
+    with FakeMilvus().patch(milvus_datastore), mock.patch.object(
+        milvus_datastore, "MILVUS_INDEX_PARAMS", json.dumps(index_params)
+    ):
+        return milvus_datastore.MilvusDataStore(create_new=True, consistency_level="Strong")
+
+
+async def _fake_redis(dataset: Dataset) -> AsyncVectorStore:
+    from vectordbs.fakes import FakeRedis
+    from vectordbs.providers import redis_datastore
+
+    client = FakeRedis()
+    # init keeps the metric of an existing index
+    await redis_datastore._create_index(
+        client,
+        redis_datastore.REDIS_INDEX_NAME,
+        redis_datastore.REDIS_STORAGE_TYPE,
+        redis_datastore.REDIS_VECTOR_TYPE,
+        _FAKE_METRICS["redis"][dataset.distance],
+    )
+    with client.patch(redis_datastore):
+        return await redis_datastore.RedisDataStore.init()
+
+
+async def _fake_pinecone(dataset: Dataset) -> AsyncVectorStore:
+    from vectordbs.fakes import FakePinecone
+    from vectordbs.providers import pinecone_datastore
+
+    options = pinecone_datastore.PineconeOptions(api_key="fake", environment="fake", index="bench")
+    with FakePinecone(metric=_FAKE_METRICS["pinecone"][dataset.distance]).patch(pinecone_datastore):
+        return pinecone_datastore.PineconeDataStore(options)
+
+
+# Remote providers talking to the in-process clients of vectordbs.fakes, these
+# measure the providers' client side work (batching, conversions) offline
+FAKE_PROVIDERS: Dict[str, Callable[[Dataset], Awaitable[AsyncVectorStore]]] = {
+    "fake-qdrant": _fake_qdrant,
+    "fake-milvus": _fake_milvus,
+    "fake-redis": _fake_redis,
+    "fake-pinecone": _fake_pinecone,
+}
+
+
+class _LoopVectorStore(VectorStore):
+    """
+    Drive an AsyncVectorStore from threads through a private event loop. An
+    awaitable store (redis) is awaited on that loop too, clients bound to
+    the loop they were created on keep working.
+    """
+
+    def __init__(self, store: Union[AsyncVectorStore, Awaitable[AsyncVectorStore]]):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        if inspect.isawaitable(store):
+            store = self._run(store)
+        self.store = store
+        self.stream_concurrency = getattr(store, "stream_concurrency", VectorStore.stream_concurrency)
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def add(self, datas: List[VectorStoreData]) -> List[str]:
+        return self._run(self.store.add(datas))
+
+    def delete(self, ids: List[str]) -> None:
+        self._run(self.store.delete(ids))
+
+    def query(self, query: VectorStoreQuery) -> QueryResult:
+        return self._run(self.store.query(query))
+
+    def close(self):
+        self._run(self.store.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+def create_store(provider: str, dataset: Dataset, workdir: str) -> VectorStore:
+    if provider in LOCAL_PROVIDERS:
+        return LOCAL_PROVIDERS[provider](dataset, workdir)
+    if provider in FAKE_PROVIDERS:
+        return _LoopVectorStore(FAKE_PROVIDERS[provider](dataset))
+    store = factory.get_datastore(provider, reuse=False)
+    if inspect.isawaitable(store) or isinstance(store, AsyncVectorStore):
+        store = _LoopVectorStore(store)
+    return store
+
+
+### Measurements ###
+
+
+@dataclass
+class IngestRun:
+    provider: str
+    batch_size: int
+    concurrency: int
+    records: int
+    seconds: float
+    records_per_second: float
+    failed: int = 0
+
+
+@dataclass
+class QueryRun:
+    provider: str
+    top_k: int
+    concurrency: int
+    queries: int
+    seconds: float
+    qps: float
+    latency_ms: Dict[str, float] = field(default_factory=dict)
+    recall: float = 0.0
+
+
+def latency_summary(latencies: Sequence[float]) -> Dict[str, float]:
+    millis = np.asarray(latencies) * 1000
+    return {
+        "mean": float(millis.mean()),
+        "p50": float(np.percentile(millis, 50)),
+        "p95": float(np.percentile(millis, 95)),
+        "p99": float(np.percentile(millis, 99)),
+        "max": float(millis.max()),
+    }
+
+
+def recall_at_k(results: Sequence[QueryResult], truth: np.ndarray) -> float:
+    """
+    Mean fraction of the exact top k found by each query.
+    """
+    k = truth.shape[1]
+    found = [
+        len({int(id) for id in result.ids or []} & set(expected.tolist()))
+        for result, expected in zip(results, truth)
+    ]
+    return float(np.mean(found) / k)
+
+
+def bench_ingest(
+    provider: str,
+    store: VectorStore,
+    datas: List[VectorStoreData],
+    batch_size: int,
+    concurrency: int,
+) -> IngestRun:
+    start = time.perf_counter()
+    report = store.add_stream(datas, batch_size=batch_size, max_in_flight=concurrency)
+    # IVF-PQ style stores that have not seen enough vectors still need training
+    if getattr(store, "is_trained", True) is False and len(store) > 0:
+        store.train()
+    seconds = time.perf_counter() - start
+    return IngestRun(provider, batch_size, concurrency, report.added, seconds, report.added / seconds, report.failed)
+
+
+def bench_queries(
+    provider: str,
+    store: VectorStore,
+    dataset: Dataset,
+    k: int,
+    concurrency: int,
+    truth: np.ndarray,
+) -> QueryRun:
+    queries = [VectorStoreQuery(query_embedding=query, similarity_top_k=k) for query in dataset.queries]
+
+    def timed(query: VectorStoreQuery):
+        start = time.perf_counter()
+        result = store.query(query)
+        return result, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        timings = list(pool.map(timed, queries))
+    seconds = time.perf_counter() - start
+
+    results = [result for result, _ in timings]
+    return QueryRun(
+        provider,
+        k,
+        concurrency,
+        len(queries),
+        seconds,
+        len(queries) / seconds,
+        latency_summary([latency for _, latency in timings]),
+        recall_at_k(results, truth),
+    )
+
+
+def run_benchmark(
+    providers: Sequence[str],
+    dataset: Dataset,
+    batch_sizes: Sequence[int] = (100,),
+    concurrencies: Sequence[int] = (1,),
+    top_ks: Sequence[int] = (10,),
+    progress: Optional[Callable[[str], None]] = None,
+) -> dict:
+    """
+    Run every sweep for every provider, returns a JSON serializable report.
+
+    Ingest is measured on a fresh store per (batch size, concurrency), concurrency
+    capped by the store's stream_concurrency. Queries run against the last store.
+    """
+    datas = dataset.datas()
+    truths = {k: dataset.ground_truth(k) for k in top_ks}
+    ingest: List[IngestRun] = []
+    queries: List[QueryRun] = []
+
+    with tempfile.TemporaryDirectory(prefix="vectordbs-bench-") as workdir:
+        for provider in providers:
+            store = create_store(provider, dataset, workdir)
+            # Levels above the store's limit would only repeat the capped run
+            levels = list(dict.fromkeys(min(c, store.stream_concurrency) for c in concurrencies))
+            for i, (batch_size, concurrency) in enumerate(
+                (batch_size, concurrency) for batch_size in batch_sizes for concurrency in levels
+            ):
+                if i > 0:
+                    store.close()
+                    store = create_store(provider, dataset, workdir)
+                run = bench_ingest(provider, store, datas, batch_size, concurrency)
+                ingest.append(run)
+                if progress is not None:
+                    progress(f"{provider} ingest batch={batch_size} concurrency={concurrency}: "
+                             f"{run.records_per_second:.0f} records/s")
+
+            for k in top_ks:
+                for concurrency in concurrencies:
+                    run = bench_queries(provider, store, dataset, k, concurrency, truths[k])
+                    queries.append(run)
+                    if progress is not None:
+                        progress(f"{provider} query k={k} concurrency={concurrency}: {run.qps:.0f} qps, "
+                                 f"p99 {run.latency_ms['p99']:.2f} ms, recall {run.recall:.3f}")
+            store.close()
+
+    return {
+        "dataset": {
+            "count": len(dataset.vectors),
+            "queries": len(dataset.queries),
+            "dimension": dataset.dimension,
+            "distance": dataset.distance,
+        },
+        "ingest": [asdict(run) for run in ingest],
+        "query": [asdict(run) for run in queries],
+    }
+
+
+### Command line ###
+
+
+def _ints(value: str) -> List[int]:
+    return [int(part) for part in value.split(",")]
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--provider", action="append", help="Provider name, repeatable (default: every local provider)")
+    parser.add_argument("--dataset", help=".npy file of vectors, generated when omitted")
+    parser.add_argument("--count", type=int, default=10000, help="Generated vectors")
+    parser.add_argument("--dimension", type=int, default=128, help="Generated dimension")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--distance", default="Cosine", choices=("Cosine", "Dot", "Euclid"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=_ints, default=[100], help="Comma separated sweep")
+    parser.add_argument("--concurrency", type=_ints, default=[1], help="Comma separated sweep")
+    parser.add_argument("--top-k", type=_ints, default=[10], help="Comma separated sweep")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--quiet", action="store_true", help="No progress on stderr")
+
+
+def run(args: argparse.Namespace) -> dict:
+    import sys
+
+    if args.dataset:
+        dataset = load_dataset(args.dataset, args.queries, args.distance, args.seed)
+    else:
+        dataset = generate_dataset(args.count, args.dimension, args.queries, args.distance, args.seed)
+
+    report = run_benchmark(
+        args.provider or list(LOCAL_PROVIDERS),
+        dataset,
+        args.batch_size,
+        args.concurrency,
+        args.top_k,
+        progress=None if args.quiet else lambda line: print(line, file=sys.stderr),
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return report
@@ -0,0 +1,132 @@
+import threading
+from typing import Dict, List, Optional
+
+from vectordbs.types import QueryResult, VectorBatch, VectorStore, VectorStoreBatch, VectorStoreData, VectorStoreQuery
+
+
+class BufferedVectorStore(VectorStore):
+    """
+    Coalesce small add() calls into larger batches in front of any VectorStore.
+
+    Added records are held in memory and written with a single store.add() once
+    max_batch_size records are pending or the oldest has waited max_delay
+    seconds. Re-adding a pending id replaces it. Queries flush first so callers
+    always read their own writes. A failed flush keeps the records pending; the
+    error is raised by that flush, or by the next call when it happened on the
+    background timer.
+    """
+
+    def __init__(
+        self,
+        store: VectorStore,
+        max_batch_size: int = 100,
+        max_delay: Optional[float] = 1.0,
+    ):
+        self.store = store
+        self.stream_concurrency = store.stream_concurrency
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+
+        self._pending: Dict[str, VectorStoreData] = {}
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+        self._error: Optional[Exception] = None
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _raise_background_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _schedule(self):
+        if self.max_delay is None or self._timer is not None:
+            return
+        self._timer = threading.Timer(self.max_delay, self._flush_on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _flush_on_timer(self):
+        with self._lock:
+            self._timer = None
+            try:
+                self._flush()
+            except Exception as e:
+                self._error = e
+
+    def _flush(self):
+        self._cancel_timer()
+        if not self._pending:
+            return
+        batch = list(self._pending.values())
+        self._pending.clear()
+        try:
+            self.store.add(batch)
+        except Exception:
+            # Put the batch back without clobbering anything added since
+            for data in batch:
+                self._pending.setdefault(data.id, data)
+            raise
+
+    def flush(self):
+        """
+        Write all pending records to the store now.
+        """
+        with self._lock:
+            self._error = None
+            self._flush()
+
+    def close(self):
+        """
+        Flush pending records, stop the background timer and close the wrapped
+        store, further adds are rejected.
+        """
+        with self._lock:
+            self.flush()
+            self._closed = True
+        self.store.close()
+
+    def add(self, datas: VectorStoreBatch) -> List[str]:
+        if isinstance(datas, VectorBatch):
+            # Pending rows are keyed by id so a later add can replace them
+            datas = datas.rows()
+        with self._lock:
+            if self._closed:
+                raise ValueError("BufferedVectorStore is closed")
+            self._raise_background_error()
+            for data in datas:
+                self._pending[data.id] = data
+            if len(self._pending) >= self.max_batch_size:
+                self._flush()
+            elif self._pending:
+                self._schedule()
+        return [data.id for data in datas]
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            self._raise_background_error()
+            for id in ids:
+                self._pending.pop(id, None)
+            self.store.delete(ids)
+
+    def _read(self, fn, arg):
+        with self._lock:
+            self._raise_background_error()
+            self._flush()
+            # Stores that are not thread safe must not be read while the timer flushes
+            if self.store.stream_concurrency == 1:
+                return fn(arg)
+        return fn(arg)
+
+    def query(self, query: VectorStoreQuery) -> QueryResult:
+        return self._read(self.store.query, query)
+
+    def query_batch(self, queries: List[VectorStoreQuery]) -> List[QueryResult]:
+        return self._read(self.store.query_batch, queries)
@@ -0,0 +1,317 @@
+import dataclasses
+import hashlib
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from vectordbs.embeddings import as_array
+from vectordbs.types import QueryResult, VectorStore, VectorStoreBatch, VectorStoreQuery
+
+
+# Query fields that do not change a complete result
+_UNKEYED_FIELDS = ("query_embedding", "latency_budget")
+
+
+# Helper functions
+def query_params(query: VectorStoreQuery) -> Tuple:
+    """
+    Hashable key of every query field except the embedding and the latency
+    budget, so new query options are never ignored by the caches.
+    """
+    key: List[Any] = []
+    for field in dataclasses.fields(query):
+        if field.name in _UNKEYED_FIELDS:
+            continue
+        value = getattr(query, field.name)
+        if isinstance(value, list):
+            value = tuple(value)
+        elif not isinstance(value, (str, int, float, bool, type(None))):
+            value = repr(value)
+        key.append(value)
+    return tuple(key)
+
+
+def query_key(query: VectorStoreQuery) -> Tuple:
+    """
+    Build a hashable cache key for a query, the embedding is reduced to a digest of its raw bytes.
+    """
+    digest = None
+    if query.query_embedding is not None:
+        embedding = np.ascontiguousarray(as_array(query.query_embedding))
+        digest = (embedding.dtype.str, hashlib.blake2b(embedding.tobytes(), digest_size=16).digest())
+    return (digest,) + query_params(query)
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Rough recursive estimate of the memory held by a query result, in bytes.
+    """
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return sys.getsizeof(value) + sum(
+            estimate_size(getattr(value, field.name)) for field in dataclasses.fields(value)
+        )
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(k) + estimate_size(v) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    return sys.getsizeof(value)
+
+
+class CachedVectorStore(VectorStore):
+    """
+    Memoize query results of any VectorStore.
+
+    Entries are evicted least recently used first once max_entries or max_bytes
+    is exceeded, and expire after ttl seconds when set. add() clears the cache
+    since any query may now have a better match, delete() only drops results
+    that contain one of the deleted ids.
+    """
+
+    def __init__(
+        self,
+        store: VectorStore,
+        max_entries: int = 1024,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.store = store
+        self.stream_concurrency = store.stream_concurrency
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        # key -> (expires at, size in bytes, result)
+        self._entries: "OrderedDict[Tuple, Tuple[float, int, QueryResult]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def close(self):
+        self.clear()
+        self.store.close()
+
+    def _pop(self, key: Tuple):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _put(self, key: Tuple, result: QueryResult):
+        # A search cut short by its latency budget must not answer later queries
+        if getattr(result, "partial", False):
+            return
+        size = estimate_size(result)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        if key in self._entries:
+            self._pop(key)
+        self._entries[key] = (expires_at, size, result)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None and self._bytes > self.max_bytes
+        ):
+            self._pop(next(iter(self._entries)))
+
+    def add(self, datas: VectorStoreBatch) -> List[str]:
+        ids = self.store.add(datas)
+        self.clear()
+        return ids
+
+    def delete(self, ids: List[str]) -> None:
+        self.store.delete(ids)
+        deleted = set(ids)
+        for key in [
+            key
+            for key, (_, _, result) in self._entries.items()
+            if result.ids is None or not deleted.isdisjoint(result.ids)
+        ]:
+            self._pop(key)
+
+    def query(self, query: VectorStoreQuery) -> QueryResult:
+        """
+        Return the cached result for an identical query, or query the store and cache it.
+        The cached QueryResult is shared between callers and must not be mutated.
+        """
+        key = query_key(query)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self._pop(key)
+
+        self.misses += 1
+        result = self.store.query(query)
+        self._put(key, result)
+        return result
+
+    def query_batch(self, queries: List[VectorStoreQuery]) -> List[QueryResult]:
+        """
+        Serve cached queries and send only the misses to the store, in one batch.
+        """
+        now = time.monotonic()
+        keys = [query_key(query) for query in queries]
+        results: List[Optional[QueryResult]] = [None] * len(queries)
+        misses: Dict[Tuple, List[int]] = {}
+        for i, key in enumerate(keys):
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                results[i] = entry[2]
+            else:
+                misses.setdefault(key, []).append(i)
+
+        if misses:
+            self.misses += len(misses)
+            fetched = self.store.query_batch([queries[positions[0]] for positions in misses.values()])
+            for (key, positions), result in zip(misses.items(), fetched):
+                self._put(key, result)
+                # Repeats of a query inside the batch are served by the first one
+                self.hits += len(positions) - 1
+                for i in positions:
+                    results[i] = result
+        return results
+
+
+class SemanticCachedVectorStore(VectorStore):
+    """
+    Serve queries whose embedding is close enough to a recently cached one.
+
+    Cached query embeddings are normalized rows of a single matrix, a query hits
+    when its cosine similarity to a cached query with the same other parameters
+    reaches threshold. When the cache is full the least recently used entry is
+    replaced. admission decides which results are cached, by default every
+    non-empty one. Invalidation on add() and delete() works like CachedVectorStore.
+    """
+
+    def __init__(
+        self,
+        store: VectorStore,
+        threshold: float = 0.95,
+        max_entries: int = 1024,
+        admission: Optional[Callable[[VectorStoreQuery, QueryResult], bool]] = None,
+    ):
+        self.store = store
+        self.stream_concurrency = store.stream_concurrency
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.admission = admission or (lambda query, result: bool(result.ids))
+
+        self._embeddings: Optional[np.ndarray] = None
+        # Interned query parameters of each row, -1 for a free row. A key is
+        # forgotten when the last row using it is evicted
+        self._params = np.full(max_entries, -1, dtype=np.int64)
+        self._param_ids: Dict[Tuple, int] = {}
+        self._param_keys: Dict[int, Tuple] = {}
+        self._param_rows: Dict[int, int] = {}
+        self._next_param_id = 0
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._results: List[Optional[QueryResult]] = [None] * max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return int((self._params >= 0).sum())
+
+    def clear(self):
+        self._params[:] = -1
+        self._results = [None] * self.max_entries
+        self._param_ids.clear()
+        self._param_keys.clear()
+        self._param_rows.clear()
+        self._last_used[:] = 0
+
+    def close(self):
+        self.clear()
+        self.store.close()
+
+    def _intern(self, params: Tuple) -> int:
+        param_id = self._param_ids.get(params)
+        if param_id is None:
+            param_id = self._param_ids[params] = self._next_param_id
+            self._param_keys[param_id] = params
+            self._next_param_id += 1
+        self._param_rows[param_id] = self._param_rows.get(param_id, 0) + 1
+        return param_id
+
+    def _evict(self, row: int):
+        param_id = int(self._params[row])
+        if param_id < 0:
+            return
+        self._params[row] = -1
+        self._results[row] = None
+        self._param_rows[param_id] -= 1
+        if self._param_rows[param_id] == 0:
+            del self._param_rows[param_id]
+            del self._param_ids[self._param_keys.pop(param_id)]
+
+    def add(self, datas: VectorStoreBatch) -> List[str]:
+        ids = self.store.add(datas)
+        self.clear()
+        return ids
+
+    def delete(self, ids: List[str]) -> None:
+        self.store.delete(ids)
+        deleted = set(ids)
+        for row, result in enumerate(self._results):
+            if result is not None and (result.ids is None or not deleted.isdisjoint(result.ids)):
+                self._evict(row)
+
+    def query(self, query: VectorStoreQuery) -> QueryResult:
+        """
+        Return the result of the most similar cached query above threshold, or
+        query the store and offer the result to the cache.
+        """
+        if query.query_embedding is None:
+            return self.store.query(query)
+        embedding = as_array(query.query_embedding)
+        norm = np.linalg.norm(embedding)
+        if norm == 0:
+            return self.store.query(query)
+        embedding = embedding / norm
+
+        if self._embeddings is None:
+            self._embeddings = np.zeros((self.max_entries, len(embedding)), dtype=np.float32)
+        params = query_params(query)
+        param_id = self._param_ids.get(params)
+
+        if param_id is not None:
+            similarities = self._embeddings @ embedding
+            similarities[self._params != param_id] = -np.inf
+            best = int(similarities.argmax())
+            if similarities[best] >= self.threshold:
+                self.hits += 1
+                self._last_used[best] = time.monotonic()
+                return self._results[best]
+
+        self.misses += 1
+        result = self.store.query(query)
+        if not getattr(result, "partial", False) and self.admission(query, result):
+            free = np.flatnonzero(self._params < 0)
+            row = int(free[0]) if len(free) else int(self._last_used.argmin())
+            self._evict(row)
+            self._embeddings[row] = embedding
+            self._params[row] = self._intern(params)
+            self._last_used[row] = time.monotonic()
+            self._results[row] = result
+        return result
@@ -0,0 +1,20 @@
+"""
+Timestamps for the created_at field the remote providers index as a number.
+"""
+from datetime import datetime, timezone
+from typing import Union
+
+
+def to_unix_timestamp(date: Union[int, float, str, datetime]) -> int:
+    """
+    Seconds since the epoch of a number, an ISO 8601 string or a datetime.
+    Times without a timezone are taken as UTC.
+    """
+    if isinstance(date, (int, float)):
+        return int(date)
+    if isinstance(date, str):
+        # fromisoformat only accepts a trailing Z from Python 3.11
+        date = datetime.fromisoformat(date[:-1] + "+00:00" if date.endswith("Z") else date)
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return int(date.timestamp())
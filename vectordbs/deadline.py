@@ -0,0 +1,56 @@
+"""
+Per query latency budgets.
+
+A query's latency_budget (seconds) becomes a Deadline when a store starts
+working on it. Local stores check it between units of work (graph expansions,
+inverted lists, segments) and return what they found so far with
+QueryResult.partial set, remote providers pass the remaining time on as the
+request timeout and flag what they return once it runs out with mark_partial.
+"""
+import time
+from typing import Optional
+
+
+class Deadline:
+    __slots__ = ("expires",)
+
+    def __init__(self, budget: Optional[float] = None):
+        self.expires = None if budget is None else time.monotonic() + budget
+
+    @classmethod
+    def of(cls, query) -> "Deadline":
+        """Deadline of a query, queries without a latency_budget never expire."""
+        return cls(getattr(query, "latency_budget", None))
+
+    @classmethod
+    def earliest(cls, queries) -> "Deadline":
+        """One deadline for queries sent together, the tightest budget wins."""
+        budgets = [query.latency_budget for query in queries if getattr(query, "latency_budget", None) is not None]
+        return cls(min(budgets) if budgets else None)
+
+    @property
+    def unlimited(self) -> bool:
+        return self.expires is None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, None without a budget."""
+        if self.expires is None:
+            return None
+        return max(self.expires - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.expires is not None and time.monotonic() >= self.expires
+
+
+# Shared by every query without a budget
+NO_DEADLINE = Deadline()
+
+
+def mark_partial(result):
+    """
+    Flag a result the deadline cut short, caches do not store partial results.
+    Result models without a partial field, like the retrieval plugin's
+    QueryResult, get it as an instance attribute.
+    """
+    object.__setattr__(result, "partial", True)
+    return result
@@ -0,0 +1,63 @@
+"""
+Similarity scoring and top k selection over float32 matrices, shared by the
+in-process stores, the fakes, the benchmark and recall tuning.
+"""
+import numpy as np
+
+# Supported distances, named the same way as the Qdrant provider
+DISTANCES = ("Cosine", "Dot", "Euclid")
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    L2 normalize a vector or each row of a matrix, leaving zero vectors untouched.
+    """
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Return the positions of the k highest scores, best first.
+
+    Uses argpartition so only the k winners are sorted.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def score_vectors(
+    vectors: np.ndarray, query: np.ndarray, distance: str
+) -> np.ndarray:
+    """
+    Score every row of vectors against the query, higher is more similar.
+
+    Cosine expects both sides to be normalized already, Euclid returns the
+    negated squared L2 distance.
+    """
+    if distance == "Euclid":
+        diff = vectors - query
+        return -np.einsum("ij,ij->i", diff, diff)
+    return vectors @ query
+
+
+def score_matrix(
+    vectors: np.ndarray, queries: np.ndarray, distance: str
+) -> np.ndarray:
+    """
+    Score every row of vectors against many queries at once, returns a
+    (queries, vectors) matrix with the same convention as score_vectors.
+    """
+    scores = queries @ vectors.T
+    if distance == "Euclid":
+        scores *= 2
+        scores -= np.einsum("ij,ij->i", vectors, vectors)[None, :]
+        scores -= np.einsum("ij,ij->i", queries, queries)[:, None]
+    return scores
@@ -0,0 +1,85 @@
+"""
+Conversions for embeddings given as lists, float32 ndarrays, memoryviews or
+raw buffers.
+
+Stores keep embeddings in whatever form the caller passed them and only
+convert at the boundary: local stores and binary protocols take an ndarray
+view (no copy when the dtype already matches), JSON and REST clients take a
+list built once, straight from the array.
+"""
+from typing import Iterable, List
+
+import numpy as np
+
+from vectordbs.types import Embedding
+
+_BUFFER_TYPES = (memoryview, bytes, bytearray)
+
+
+def as_array(embedding: Embedding, dtype=np.float32) -> np.ndarray:
+    """
+    Return the embedding as a 1-d array of dtype, a view when it already is one.
+
+    Buffers without a format (bytes, bytearray, memoryview of bytes) are read
+    as packed float32 values, like embedding_nbytes counts them, and then
+    converted to dtype.
+    """
+    if isinstance(embedding, np.ndarray):
+        return embedding.reshape(-1).astype(dtype, copy=False)
+    if isinstance(embedding, _BUFFER_TYPES):
+        view = memoryview(embedding)
+        if view.format in ("B", "b", "c"):
+            return np.frombuffer(view, dtype=np.float32).astype(dtype, copy=False)
+        return np.asarray(view).reshape(-1).astype(dtype, copy=False)
+    return np.asarray(embedding, dtype=dtype)
+
+
+def as_matrix(embeddings: Iterable[Embedding], dtype=np.float32) -> np.ndarray:
+    """
+    Stack embeddings into a 2-d array, each row copied once into the result.
+    """
+    rows = [as_array(embedding, dtype) for embedding in embeddings]
+    if not rows:
+        return np.empty((0, 0), dtype=dtype)
+    if any(row.shape != rows[0].shape for row in rows):
+        raise ValueError(f"Embeddings have mixed dimensions: {sorted({row.shape[0] for row in rows})}")
+    return np.stack(rows)
+
+
+def as_list(embedding: Embedding) -> List[float]:
+    """
+    Python floats for JSON and REST clients, lists are passed through untouched.
+    """
+    if isinstance(embedding, list):
+        return embedding
+    return as_array(embedding).tolist()
+
+
+def as_bytes(embedding: Embedding, dtype=np.float32) -> bytes:
+    """
+    Packed little endian dtype values, as binary vector protocols expect.
+    """
+    array = as_array(embedding, np.dtype(dtype).newbyteorder("<"))
+    return array.tobytes()
+
+
+def from_bytes(blob: bytes, dtype=np.float32) -> np.ndarray:
+    """
+    Read packed little endian dtype values, the inverse of as_bytes.
+
+    For blobs whose element type is known from elsewhere, a Redis HASH field of
+    the index's vector type for example, where as_array would assume float32.
+    """
+    return np.frombuffer(blob, dtype=np.dtype(dtype).newbyteorder("<"))
+
+
+def embedding_nbytes(embedding: Embedding) -> int:
+    """
+    Size of the embedding as packed float32, without converting it.
+    """
+    if isinstance(embedding, np.ndarray):
+        return 4 * embedding.size
+    if isinstance(embedding, _BUFFER_TYPES):
+        view = memoryview(embedding)
+        return view.nbytes if view.format in ("B", "b", "c") else 4 * (view.nbytes // view.itemsize)
+    return 4 * len(embedding)
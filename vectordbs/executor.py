@@ -0,0 +1,101 @@
+import asyncio
+import functools
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+from vectordbs.types import (
+    AsyncVectorStore,
+    QueryResult,
+    VectorStore,
+    VectorStoreBatch,
+    VectorStoreQuery,
+)
+
+# Defaults for every executor, providers may override them with their own settings
+VECTORDBS_MAX_WORKERS = int(os.environ.get("VECTORDBS_MAX_WORKERS", 8))
+VECTORDBS_MAX_IN_FLIGHT = int(
+    os.environ.get("VECTORDBS_MAX_IN_FLIGHT", VECTORDBS_MAX_WORKERS)
+)
+
+
+class BlockingExecutor:
+    """
+    Run blocking client calls from coroutines without stalling the event loop.
+
+    Calls go to a bounded thread pool, and at most max_in_flight of them are
+    submitted at once so a single store cannot flood a shared backend.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = VECTORDBS_MAX_WORKERS,
+        max_in_flight: Optional[int] = None,
+    ):
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight or max_workers
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="vectordbs"
+        )
+        # asyncio primitives belong to one loop, keep a limiter per running loop
+        self._semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) on the pool and await its result.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_in_flight)
+        async with semaphore:
+            return await loop.run_in_executor(
+                self._pool, functools.partial(fn, *args, **kwargs)
+            )
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
+
+
+class ThreadedVectorStore(AsyncVectorStore):
+    """
+    Expose any blocking VectorStore as an AsyncVectorStore by running its
+    calls on a BlockingExecutor.
+
+    Stores that are not safe to call from several threads
+    (stream_concurrency == 1) get their calls serialized by a lock.
+    """
+
+    def __init__(
+        self, store: VectorStore, executor: Optional[BlockingExecutor] = None
+    ):
+        self.store = store
+        self.executor = executor or BlockingExecutor(
+            VECTORDBS_MAX_WORKERS, VECTORDBS_MAX_IN_FLIGHT
+        )
+        self._lock = threading.Lock() if store.stream_concurrency == 1 else None
+
+    def _call(self, fn: Callable[..., Any], *args) -> Any:
+        if self._lock is None:
+            return fn(*args)
+        with self._lock:
+            return fn(*args)
+
+    async def close(self) -> None:
+        self.executor.shutdown(wait=False)
+        self.store.close()
+
+    async def add(self, datas: VectorStoreBatch) -> List[str]:
+        return await self.executor.run(self._call, self.store.add, datas)
+
+    async def delete(self, ids: List[str]) -> None:
+        return await self.executor.run(self._call, self.store.delete, ids)
+
+    async def query(self, query: VectorStoreQuery) -> QueryResult:
+        return await self.executor.run(self._call, self.store.query, query)
+
+    async def query_batch(self, queries: List[VectorStoreQuery]) -> List[QueryResult]:
+        # One executor call so the store can use its native batch path
+        return await self.executor.run(self._call, self.store.query_batch, queries)
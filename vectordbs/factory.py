@@ -1,33 +1,125 @@
-import os
+import asyncio
+import inspect
+import threading
+from importlib import import_module
+from typing import Callable, Dict, Union
+
 from vectordbs.types import VectorStore
 
-def get_datastore(datastore: str) -> VectorStore:
-    assert datastore is not None
+# Entry point group scanned for third party providers, e.g. in pyproject.toml
+#   [tool.poetry.plugins."vectordbs.providers"]
+#   mydb = "mypackage.store:MyDataStore"
+ENTRY_POINT_GROUP = "vectordbs.providers"
+
+# Built in providers as "module:attribute" targets, only imported on first use
+_PROVIDERS: Dict[str, Union[str, Callable[[], VectorStore]]] = {
+    "pinecone": "vectordbs.providers.pinecone_datastore:PineconeDataStore",
+    "weaviate": "vectordbs.providers.weaviate_datastore:WeaviateDataStore",
+    "milvus": "vectordbs.providers.milvus_datastore:MilvusDataStore",
+    "zilliz": "vectordbs.providers.zilliz_datastore:ZillizDataStore",
+    "redis": "vectordbs.providers.redis_datastore:RedisDataStore.init",
+    "qdrant": "vectordbs.providers.qdrant_datastore:QdrantDataStore",
+    "memory": "vectordbs.providers.memory_datastore:MemoryDataStore",
+    "hnsw": "vectordbs.providers.hnsw_datastore:HnswDataStore",
+    "ivfpq": "vectordbs.providers.ivfpq_datastore:IvfPqDataStore",
+    "mmap": "vectordbs.providers.mmap_datastore:MmapDataStore",
+}
+_ENTRY_POINTS_LOADED = False
+
+# Live stores handed out by get_datastore, reused across calls until closed
+_DATASTORES: Dict[str, VectorStore] = {}
+_DATASTORES_LOCK = threading.Lock()
+# One lock per provider name, held while its shared store is built
+_CREATE_LOCKS: Dict[str, threading.Lock] = {}
+
+def register_datastore(name: str, factory: Union[str, Callable[[], VectorStore]]):
+    """
+    Register a provider under name, replacing any existing one.
+
+    factory is either a callable returning the store or a "module:attribute"
+    string that is only imported when the provider is first requested.
+    """
+    _PROVIDERS[name] = factory
 
-    match datastore:
-        case "pinecone":
-            from vectordbs.providers.pinecone_datastore import PineconeDataStore
+def available_datastores():
+    """
+    Names of every registered provider, including entry point plugins.
+    """
+    _load_entry_points()
+    return sorted(_PROVIDERS)
 
-            return PineconeDataStore()
-        case "weaviate":
-            from vectordbs.providers.weaviate_datastore import WeaviateDataStore
+def _load_entry_points():
+    global _ENTRY_POINTS_LOADED
+    if _ENTRY_POINTS_LOADED:
+        return
+    from importlib.metadata import entry_points
+
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        # Built in providers win, plugins only add new names
+        _PROVIDERS.setdefault(entry_point.name, entry_point.value)
+    _ENTRY_POINTS_LOADED = True
+
+def _resolve(target: str) -> Callable[[], VectorStore]:
+    module_name, _, attribute = target.partition(":")
+    resolved = import_module(module_name)
+    for name in attribute.split("."):
+        resolved = getattr(resolved, name)
+    return resolved
+
+def get_datastore(datastore: str, reuse: bool = True) -> VectorStore:
+    """
+    Return the store for the given provider name.
+
+    With reuse the store, and the clients it holds, are created once and
+    shared by every later call until close_datastores(). Pass reuse=False
+    for a private instance that the caller must close.
+    """
+    assert datastore is not None
 
-            return WeaviateDataStore()
-        case "milvus":
-            from vectordbs.providers.milvus_datastore import MilvusDataStore
+    if not reuse:
+        return _create_datastore(datastore)
 
-            return MilvusDataStore()
-        case "zilliz":
-            from vectordbs.providers.zilliz_datastore import ZillizDataStore
+    with _DATASTORES_LOCK:
+        store = _DATASTORES.get(datastore)
+        if store is not None:
+            return store
+        create_lock = _CREATE_LOCKS.setdefault(datastore, threading.Lock())
 
-            return ZillizDataStore()
-        case "redis":
-            from vectordbs.providers.redis_datastore import RedisDataStore
+    # Connecting can take seconds, only callers asking for the same provider wait
+    with create_lock:
+        with _DATASTORES_LOCK:
+            store = _DATASTORES.get(datastore)
+        if store is not None:
+            return store
+        store = _create_datastore(datastore)
+        # Async initializers (redis) can only be awaited once, never share them
+        if hasattr(store, "__await__"):
+            return store
+        with _DATASTORES_LOCK:
+            _DATASTORES[datastore] = store
+        return store
 
-            return RedisDataStore.init()
-        case "qdrant":
-            from vectordbs.providers.qdrant_datastore import QdrantDataStore
+def close_datastores():
+    """
+    Close every shared store created by get_datastore.
+    """
+    with _DATASTORES_LOCK:
+        stores = list(_DATASTORES.values())
+        _DATASTORES.clear()
+    for store in stores:
+        close = getattr(store, "close", None)
+        if close is not None:
+            result = close()
+            # The remote providers are async stores with a coroutine close()
+            if inspect.isawaitable(result):
+                asyncio.run(result)
 
-            return QdrantDataStore()
-        case _:
-            raise ValueError(f"Unsupported vector database: {datastore}")
+def _create_datastore(datastore: str) -> VectorStore:
+    if datastore not in _PROVIDERS:
+        _load_entry_points()
+    factory = _PROVIDERS.get(datastore)
+    if factory is None:
+        raise ValueError(f"Unsupported vector database: {datastore}")
+    if isinstance(factory, str):
+        factory = _PROVIDERS[datastore] = _resolve(factory)
+    return factory()
@@ -0,0 +1,1242 @@
+"""
+In-process stand-ins for the Qdrant, Redis, Milvus and Pinecone clients.
+
+Each fake implements the calls the providers make, keeps its data in NumPy and
+sleeps according to a LatencyModel before answering, so client side batching,
+concurrency and tail latency can be measured without a network:
+
+    fake = FakePinecone(LatencyModel(latency=0.02, jitter=0.01, rate_limit=100))
+    with fake.patch("vectordbs.providers.pinecone_datastore"):
+        store = PineconeDataStore(options)
+
+Results mimic the shape of the real client responses (attributes, score
+direction), not their classes, since the client libraries are optional.
+"""
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from unittest import mock
+
+import numpy as np
+
+from vectordbs.distances import normalize, score_vectors, top_k
+from vectordbs.embeddings import as_array, from_bytes
+
+
+class RateLimitExceeded(Exception):
+    """Raised by a fake when its rate limit is hit and throttle is off, like a 429."""
+
+
+class LatencyModel:
+    """
+    Per request delay: latency + per_item * items + an exponential jitter tail.
+
+    rate_limit caps requests per second with a token bucket of burst tokens.
+    Requests over the limit wait for a token, or raise RateLimitExceeded when
+    throttle is False.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        per_item: float = 0.0,
+        rate_limit: Optional[float] = None,
+        burst: Optional[int] = None,
+        throttle: bool = True,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.per_item = per_item
+        self.rate_limit = rate_limit
+        self.burst = burst or max(1, int(rate_limit or 1))
+        self.throttle = throttle
+        self.requests = 0
+        self.throttled = 0
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    def _acquire(self) -> float:
+        """Take a token, returns how long the request must wait for it."""
+        with self._lock:
+            self.requests += 1
+            if self.rate_limit is None:
+                return 0.0
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_limit)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            self.throttled += 1
+            if not self.throttle:
+                raise RateLimitExceeded(f"Rate limit of {self.rate_limit} requests/s exceeded")
+            # Reserve the next token, later requests queue behind this one
+            self._tokens -= 1
+            return -self._tokens / self.rate_limit
+
+    def delay(self, items: int = 1) -> float:
+        """Total seconds the next request of items should take, including throttling."""
+        wait = self._acquire()
+        jitter = self._random.expovariate(1 / self.jitter) if self.jitter > 0 else 0.0
+        return wait + self.latency + self.per_item * items + jitter
+
+    def sleep(self, items: int = 1):
+        seconds = self.delay(items)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    async def asleep(self, items: int = 1):
+        seconds = self.delay(items)
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+
+class _VectorTable:
+    """Thread safe id -> (vector, payload) table with brute force search."""
+
+    def __init__(self, distance: str = "Cosine"):
+        self.distance = distance
+        self.rows: Dict[Any, Tuple[np.ndarray, Any]] = {}
+        self._lock = threading.RLock()
+        self._matrix: Optional[Tuple[List[Any], np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def upsert(self, id: Any, vector: Iterable[float], payload: Any):
+        # Copy, as a client serializing the request would, so callers may reuse their arrays
+        vector = as_array(vector).copy()
+        if self.distance == "Cosine":
+            vector = normalize(vector)
+        with self._lock:
+            self.rows[id] = (vector, payload)
+            self._matrix = None
+
+    def remove(self, ids: Iterable[Any]) -> int:
+        removed = 0
+        with self._lock:
+            for id in ids:
+                if self.rows.pop(id, None) is not None:
+                    removed += 1
+            if removed:
+                self._matrix = None
+        return removed
+
+    def select(self, predicate: Optional[Callable[[Any], bool]]) -> List[Any]:
+        with self._lock:
+            return [id for id, (_, payload) in self.rows.items() if predicate is None or predicate(payload)]
+
+    def search(
+        self,
+        vector: Iterable[float],
+        k: int,
+        predicate: Optional[Callable[[Any], bool]] = None,
+    ) -> List[Tuple[Any, float]]:
+        """
+        Top k (id, score) pairs, score higher is more similar as in score_vectors.
+        """
+        query = as_array(vector)
+        if self.distance == "Cosine":
+            query = normalize(query)
+        with self._lock:
+            if self._matrix is None:
+                ids = list(self.rows)
+                matrix = np.stack([self.rows[id][0] for id in ids]) if ids else np.zeros((0, len(query)), np.float32)
+                self._matrix = (ids, matrix)
+            ids, matrix = self._matrix
+            if predicate is not None:
+                rows = [i for i, id in enumerate(ids) if predicate(self.rows[id][1])]
+                ids, matrix = [ids[i] for i in rows], matrix[rows]
+        if len(ids) == 0:
+            return []
+        scores = score_vectors(matrix, query, self.distance)
+        return [(ids[i], float(scores[i])) for i in top_k(scores, k)]
+
+
+def _get_path(document: Any, path: str) -> Any:
+    """Read a dotted (metadata.source) or JSONPath ($.metadata.source) field."""
+    for part in path.lstrip("$").strip(".").split("."):
+        if not isinstance(document, dict):
+            return None
+        document = document.get(part)
+    return document
+
+
+### Qdrant ###
+
+
+def _qdrant_distance(distance: Any) -> str:
+    name = str(getattr(distance, "value", distance)).capitalize()
+    return {"Cosine": "Cosine", "Dot": "Dot", "Euclid": "Euclid"}[name]
+
+
+def _qdrant_matches(condition: Any, id: Any, payload: dict) -> bool:
+    if any(hasattr(condition, key) for key in ("must", "should", "must_not")):
+        return _qdrant_filter(condition)(id, payload)
+    if getattr(condition, "has_id", None) is not None:
+        return id in condition.has_id
+    value = _get_path(payload, condition.key)
+    values = value if isinstance(value, list) else [value]
+    match = getattr(condition, "match", None)
+    if match is not None:
+        if getattr(match, "value", None) is not None:
+            return match.value in values
+        if getattr(match, "any", None) is not None:
+            return any(v in match.any for v in values)
+        return False
+    bounds = getattr(condition, "range", None)
+    if bounds is not None:
+        if value is None:
+            return False
+        return all(
+            bound is None or compare(value, bound)
+            for bound, compare in (
+                (getattr(bounds, "gt", None), lambda a, b: a > b),
+                (getattr(bounds, "gte", None), lambda a, b: a >= b),
+                (getattr(bounds, "lt", None), lambda a, b: a < b),
+                (getattr(bounds, "lte", None), lambda a, b: a <= b),
+            )
+        )
+    return False
+
+
+def _qdrant_filter(query_filter: Any) -> Callable[[Any, dict], bool]:
+    def predicate(id: Any, payload: dict) -> bool:
+        must = getattr(query_filter, "must", None) or []
+        should = getattr(query_filter, "should", None) or []
+        must_not = getattr(query_filter, "must_not", None) or []
+        return (
+            all(_qdrant_matches(c, id, payload) for c in must)
+            and not any(_qdrant_matches(c, id, payload) for c in must_not)
+            and (not should or any(_qdrant_matches(c, id, payload) for c in should))
+        )
+
+    return predicate
+
+
+def _qdrant_not_found(collection_name: str) -> Exception:
+    # The provider catches the client's own exception for a missing collection
+    try:
+        from qdrant_client.http.exceptions import UnexpectedResponse
+
+        return UnexpectedResponse(404, "Not Found", b"", None)  # type: ignore
+    except ImportError:
+        return KeyError(f"Collection {collection_name} not found")
+
+
+class _QdrantTable(_VectorTable):
+    """Keeps the point id next to its payload so filters can use has_id."""
+
+    def upsert(self, id: Any, vector: Iterable[float], payload: Any):
+        super().upsert(id, vector, (id, payload))
+
+
+class FakeQdrantClient:
+    """Stand-in for qdrant_client.QdrantClient."""
+
+    def __init__(self, latency: Optional[LatencyModel] = None):
+        self.latency = latency or LatencyModel()
+        self.collections: Dict[str, Tuple[Any, _VectorTable]] = {}
+
+    def patch(self, module: Any):
+        """Make the provider module build this fake instead of a real client."""
+        return mock.patch.multiple(
+            module, qdrant_client=SimpleNamespace(QdrantClient=lambda *args, **kwargs: self), _CLIENTS={}
+        )
+
+    def _table(self, collection_name: str) -> _VectorTable:
+        if collection_name not in self.collections:
+            raise _qdrant_not_found(collection_name)
+        return self.collections[collection_name][1]
+
+    def recreate_collection(self, collection_name: str, vectors_config: Any, **kwargs) -> bool:
+        self.latency.sleep()
+        self.collections[collection_name] = (vectors_config, _QdrantTable(_qdrant_distance(vectors_config.distance)))
+        return True
+
+    def create_collection(self, collection_name: str, vectors_config: Any, **kwargs) -> bool:
+        if collection_name in self.collections:
+            raise ValueError(f"Collection {collection_name} already exists")
+        return self.recreate_collection(collection_name, vectors_config)
+
+    def get_collection(self, collection_name: str):
+        self.latency.sleep()
+        table = self._table(collection_name)
+        vectors_config = self.collections[collection_name][0]
+        return SimpleNamespace(
+            points_count=len(table),
+            vectors_count=len(table),
+            config=SimpleNamespace(params=SimpleNamespace(vectors=vectors_config)),
+        )
+
+    def create_payload_index(self, collection_name: str, field_name: str, **kwargs):
+        self.latency.sleep()
+        self._table(collection_name)
+        return SimpleNamespace(status="completed")
+
+    def upsert(self, collection_name: str, points: Any, wait: bool = True, **kwargs):
+        table = self._table(collection_name)
+        if hasattr(points, "ids"):
+            # Batch of columns
+            points = [
+                SimpleNamespace(id=id, vector=vector, payload=payload)
+                for id, vector, payload in zip(
+                    points.ids, points.vectors, points.payloads or [None] * len(points.ids)
+                )
+            ]
+        self.latency.sleep(len(points))
+        for point in points:
+            table.upsert(point.id, point.vector, point.payload or {})
+        return SimpleNamespace(operation_id=0, status="completed")
+
+    def _search(self, table: _VectorTable, vector, query_filter, limit, with_payload, with_vectors):
+        predicate = None
+        if query_filter is not None:
+            matches = _qdrant_filter(query_filter)
+            predicate = lambda row: matches(*row)  # noqa: E731
+        results = []
+        for id, score in table.search(vector, limit, predicate):
+            stored, (id, payload) = table.rows[id]
+            if table.distance == "Euclid":
+                score = float(np.sqrt(-score))
+            results.append(
+                SimpleNamespace(
+                    id=id,
+                    version=0,
+                    score=score,
+                    payload=payload if with_payload else None,
+                    vector=stored.tolist() if with_vectors else None,
+                )
+            )
+        return results
+
+    def search(
+        self,
+        collection_name: str,
+        query_vector: Any,
+        query_filter: Any = None,
+        limit: int = 10,
+        with_payload: bool = True,
+        with_vectors: bool = False,
+        **kwargs,
+    ):
+        table = self._table(collection_name)
+        self.latency.sleep()
+        return self._search(table, query_vector, query_filter, limit, with_payload, with_vectors)
+
+    def search_batch(self, collection_name: str, requests: List[Any], **kwargs):
+        table = self._table(collection_name)
+        self.latency.sleep(len(requests))
+        return [
+            self._search(
+                table,
+                request.vector,
+                request.filter,
+                request.limit,
+                getattr(request, "with_payload", True),
+                getattr(request, "with_vector", False),
+            )
+            for request in requests
+        ]
+
+    def delete(self, collection_name: str, points_selector: Any, wait: bool = True, **kwargs):
+        table = self._table(collection_name)
+        self.latency.sleep()
+        if isinstance(points_selector, list):
+            ids = points_selector
+        elif hasattr(points_selector, "points"):
+            ids = points_selector.points
+        else:
+            matches = _qdrant_filter(getattr(points_selector, "filter", points_selector))
+            ids = table.select(lambda row: matches(*row))
+        table.remove(ids)
+        return SimpleNamespace(operation_id=0, status="completed")
+
+
+### Redis ###
+
+
+_REDIS_DTYPES = {"FLOAT16": np.float16, "FLOAT32": np.float32, "FLOAT64": np.float64}
+
+
+class _RedisHash(dict):
+    """A HASH key, field name -> bytes value as the server keeps them."""
+
+
+@dataclass
+class _RedisIndex:
+    prefixes: List[str]
+    # as_name -> (JSON path or hash field, field type)
+    fields: Dict[str, Tuple[str, str]]
+    key_type: str = "HASH"
+    vector_field: Optional[str] = None
+    vector_dtype: str = "FLOAT32"
+    metric: str = "COSINE"
+
+
+def _redis_index(fields: List[Any], definition: Any) -> _RedisIndex:
+    args = [str(arg) for arg in getattr(definition, "args", [])]
+    prefixes = []
+    if "PREFIX" in args:
+        start = args.index("PREFIX")
+        prefixes = args[start + 2 : start + 2 + int(args[start + 1])]
+    # Like the server, indexes are on hashes unless ON JSON is given
+    key_type = args[args.index("ON") + 1] if "ON" in args else "HASH"
+    index = _RedisIndex(prefixes=prefixes, fields={}, key_type=key_type)
+    for field in fields:
+        field_args = [str(arg) for arg in field.args]
+        kind = field_args[0]
+        name = field.as_name or field.name
+        index.fields[name] = (field.name, kind)
+        if kind == "VECTOR":
+            index.vector_field = name
+            attributes = dict(zip(field_args[3::2], field_args[4::2]))
+            index.vector_dtype = attributes.get("TYPE", "FLOAT32")
+            index.metric = attributes.get("DISTANCE_METRIC", "COSINE")
+    return index
+
+
+_REDIS_KNN = re.compile(r"=>\s*\[KNN\s+(\d+)\s+@(\w+)\s+\$(\w+)(?:\s+\w+\s+\S+)*?(?:\s+AS\s+(\w+))?\s*\]", re.I)
+_REDIS_CLAUSE = re.compile(r"(-?)@(\w+):(\{(?:\\.|[^}])*\}|\[[^\]]*\])")
+
+
+def _redis_unescape(value: str) -> str:
+    return re.sub(r"\\(.)", r"\1", value)
+
+
+def _redis_field(document: Any, path: str) -> Any:
+    """Field of a JSON document or a hash, hash values decoded to text."""
+    if isinstance(document, _RedisHash):
+        value = document.get(path)
+        return value.decode(errors="replace") if isinstance(value, bytes) else value
+    return _get_path(document, path)
+
+
+def _redis_predicate(index: _RedisIndex, query_string: str) -> Callable[[dict], bool]:
+    """
+    Predicate for the filter part of a query: @tag:{a|b}, @num:[lo hi], negated
+    with a leading -, all clauses and-ed. Anything else matches everything.
+    """
+    clauses = []
+    for negated, name, body in _REDIS_CLAUSE.findall(query_string):
+        path = index.fields.get(name, ("$." + name, "TAG"))[0]
+        if body.startswith("{"):
+            options = {_redis_unescape(option.strip()) for option in re.split(r"(?<!\\)\|", body[1:-1])}
+            test = lambda value, options=options: str(value) in options  # noqa: E731
+        else:
+            # Exclusive "(" bounds are treated as inclusive
+            low, high = (float(bound.lstrip("(")) for bound in body[1:-1].split())
+            test = lambda value, low=low, high=high: value is not None and low <= float(value) <= high  # noqa: E731
+        clauses.append((bool(negated), path, test))
+
+    def predicate(document: dict) -> bool:
+        for negated, path, test in clauses:
+            value = _redis_field(document, path)
+            values = value if isinstance(value, list) else [value]
+            if any(test(v) for v in values) == negated:
+                return False
+        return True
+
+    return predicate
+
+
+class _FakeSearch:
+    """Stand-in for client.ft(index_name)."""
+
+    def __init__(self, redis: "FakeRedis", name: str):
+        self.redis = redis
+        self.name = name
+
+    def _resolve(self) -> str:
+        name = self.redis.aliases.get(self.name, self.name)
+        if name not in self.redis.indexes:
+            raise ValueError("Unknown Index name")
+        return name
+
+    async def info(self):
+        await self.redis.latency.asleep()
+        name = self._resolve()
+        index = self.redis.indexes[name]
+        return {
+            "index_name": name,
+            "index_definition": ["key_type", index.key_type, "prefixes", index.prefixes],
+            "attributes": [
+                ["identifier", path, "attribute", name, "type", kind]
+                + (
+                    ["data_type", index.vector_dtype, "distance_metric", index.metric]
+                    if name == index.vector_field
+                    else []
+                )
+                for name, (path, kind) in index.fields.items()
+            ],
+            "num_docs": len(self.redis._indexed(index)),
+        }
+
+    async def aliasadd(self, alias: str):
+        await self.redis.latency.asleep()
+        if alias in self.redis.aliases or alias in self.redis.indexes:
+            raise ValueError("Alias already exists")
+        self.redis.aliases[alias] = self._resolve()
+        return "OK"
+
+    async def aliasupdate(self, alias: str):
+        await self.redis.latency.asleep()
+        self.redis.aliases[alias] = self._resolve()
+        return "OK"
+
+    async def create_index(self, fields: List[Any], definition: Any = None, **kwargs):
+        await self.redis.latency.asleep()
+        if self.name in self.redis.indexes:
+            raise ValueError("Index already exists")
+        self.redis.indexes[self.name] = _redis_index(fields, definition)
+        return "OK"
+
+    async def dropindex(self, delete_documents: bool = False):
+        await self.redis.latency.asleep()
+        name = self._resolve()
+        if delete_documents:
+            for key in self.redis._indexed(self.redis.indexes[name]):
+                self.redis.data.pop(key, None)
+        del self.redis.indexes[name]
+        self.redis.aliases = {alias: target for alias, target in self.redis.aliases.items() if target != name}
+        return "OK"
+
+    async def search(self, query: Any, query_params: Optional[Dict[str, Any]] = None):
+        await self.redis.latency.asleep()
+        query_string = query.query_string() if hasattr(query, "query_string") else str(query)
+        # RETURN f1 f2 AS alias ..., as (field, alias) pairs
+        tokens = [str(token) for token in getattr(query, "_return_fields", []) or []]
+        return_fields = []
+        while tokens:
+            field = tokens.pop(0)
+            alias = field
+            if len(tokens) >= 2 and tokens[0].upper() == "AS":
+                alias = tokens[1]
+                del tokens[:2]
+            return_fields.append((field, alias))
+        return self.redis._search(
+            self._resolve(),
+            query_string,
+            getattr(query, "_offset", 0),
+            getattr(query, "_num", 10),
+            return_fields,
+            getattr(query, "_no_content", False),
+            query_params,
+        )
+
+
+class _FakeJson:
+    def __init__(self, target: Any):
+        self.target = target
+
+    def set(self, key: str, path: str, value: Any):
+        return self.target._command("json_set", key, path, value)
+
+    def get(self, key: str, *paths: str):
+        return self.target._command("json_get", key, *paths)
+
+
+class _FakePipeline:
+    """Buffers commands and applies them in one round trip on execute()."""
+
+    def __init__(self, redis: "FakeRedis"):
+        self.redis = redis
+        self.commands: List[Tuple[str, tuple]] = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.commands = []
+
+    def __await__(self):
+        # redis-py pipeline commands return the pipeline, which may be awaited
+        yield from asyncio.sleep(0).__await__()
+        return self
+
+    def _command(self, name: str, *args):
+        self.commands.append((name, args))
+        return self
+
+    def json(self) -> _FakeJson:
+        return _FakeJson(self)
+
+    def hset(self, key: str, field: Optional[str] = None, value: Any = None, mapping: Optional[dict] = None):
+        mapping = dict(mapping or {})
+        if field is not None:
+            mapping[field] = value
+        return self._command("hset", key, mapping)
+
+    def hgetall(self, key: str):
+        return self._command("hgetall", key)
+
+    def type(self, key: str):
+        return self._command("type", key)
+
+    def delete(self, *keys: str):
+        return self._command("delete", *keys)
+
+    def unlink(self, *keys: str):
+        return self._command("delete", *keys)
+
+    def execute_command(self, *args):
+        return self._command(str(args[0]).upper(), *args[1:])
+
+    async def execute(self):
+        commands, self.commands = self.commands, []
+        await self.redis.latency.asleep(len(commands))
+        return [self.redis._apply(name, args) for name, args in commands]
+
+
+class FakeRedis:
+    """
+    Stand-in for redis.asyncio.Redis with the JSON and search modules.
+
+    Supports JSON documents and hashes, pipelines, KNN and tag/numeric
+    filtered FT.SEARCH over JSON and HASH indexes, index aliases, key
+    deletion and SCAN.
+    """
+
+    def __init__(self, latency: Optional[LatencyModel] = None):
+        self.latency = latency or LatencyModel()
+        self.data: Dict[str, Any] = {}
+        self.indexes: Dict[str, _RedisIndex] = {}
+        self.aliases: Dict[str, str] = {}
+
+    def patch(self, module: Any):
+        """Make the provider module connect to this fake instead of a server."""
+        return mock.patch.multiple(module, redis=SimpleNamespace(Redis=lambda *args, **kwargs: self))
+
+    def _indexed(self, index: _RedisIndex) -> List[str]:
+        return [
+            key
+            for key, value in self.data.items()
+            if any(key.startswith(prefix) for prefix in index.prefixes)
+            and isinstance(value, _RedisHash) == (index.key_type == "HASH")
+        ]
+
+    def _apply(self, name: str, args: tuple):
+        if name == "json_set":
+            key, path, value = args
+            # Round trip through JSON like the server does
+            value = json.loads(json.dumps(value, default=str))
+            if path in ("$", "."):
+                self.data[key] = value
+            else:
+                parent = self.data.setdefault(key, {})
+                *parts, last = path.lstrip("$").strip(".").split(".")
+                for part in parts:
+                    parent = parent.setdefault(part, {})
+                parent[last] = value
+            return True
+        if name == "json_get":
+            key, *paths = args
+            document = self.data.get(key)
+            if document is None or not paths:
+                return document
+            return [_get_path(document, path) for path in paths]
+        if name == "hset":
+            key, mapping = args
+            document = self.data.get(key)
+            if not isinstance(document, _RedisHash):
+                document = self.data[key] = _RedisHash()
+            added = len(set(mapping) - set(document))
+            for field, value in mapping.items():
+                if value is None:
+                    raise ValueError(f"Invalid input of type: 'NoneType' for field {field}")
+                document[field] = value if isinstance(value, bytes) else str(value).encode()
+            return added
+        if name == "hgetall":
+            document = self.data.get(args[0])
+            if not isinstance(document, _RedisHash):
+                return {}
+            return {field.encode(): value for field, value in document.items()}
+        if name == "type":
+            document = self.data.get(args[0])
+            if document is None:
+                return b"none"
+            return b"hash" if isinstance(document, _RedisHash) else b"ReJSON-RL"
+        if name == "delete":
+            return sum(self.data.pop(key, None) is not None for key in args)
+        if name == "FT.SEARCH":
+            return self._ft_search(*args)
+        raise ValueError(f"Unsupported command {name}")
+
+    def _ft_search(self, index_name: str, query_string: str, *args) -> list:
+        """
+        FT.SEARCH sent as a raw command, the reply in the RESP2 layout
+        redis.commands.search.result.Result parses: [total, id, [field, value, ...], ...].
+        """
+        index_name = self.aliases.get(index_name, index_name)
+        if index_name not in self.indexes:
+            raise ValueError("Unknown Index name")
+        # Only for matching keywords, PARAMS values are taken from args as sent
+        tokens = [arg.decode(errors="replace") if isinstance(arg, bytes) else arg for arg in args]
+        offset, num, return_fields, no_content, params = 0, 10, [], False, {}
+        i = 0
+        while i < len(tokens):
+            token = str(tokens[i]).upper()
+            if token == "LIMIT":
+                offset, num = int(tokens[i + 1]), int(tokens[i + 2])
+                i += 3
+            elif token == "RETURN":
+                count = int(tokens[i + 1])
+                fields = [str(field) for field in tokens[i + 2 : i + 2 + count]]
+                while fields:
+                    field = alias = fields.pop(0)
+                    if len(fields) >= 2 and fields[0].upper() == "AS":
+                        alias = fields[1]
+                        del fields[:2]
+                    return_fields.append((field, alias))
+                i += 2 + count
+            elif token == "PARAMS":
+                count = int(tokens[i + 1])
+                pairs = args[i + 2 : i + 2 + count]
+                params = dict(zip(map(str, pairs[::2]), pairs[1::2]))
+                i += 2 + count
+            elif token == "SORTBY":
+                # Results are always by score, the only sort the providers ask for
+                i += 3 if i + 2 < len(tokens) and str(tokens[i + 2]).upper() in ("ASC", "DESC") else 2
+            elif token in ("TIMEOUT", "DIALECT"):
+                i += 2
+            elif token == "NOCONTENT":
+                no_content = True
+                i += 1
+            else:
+                raise ValueError(f"Unsupported FT.SEARCH argument {tokens[i]}")
+        result = self._search(index_name, query_string, offset, num, return_fields, no_content, params)
+        reply: list = [result.total]
+        for doc in result.docs:
+            reply.append(doc.id)
+            if not no_content:
+                # A whole JSON document is returned as the "$" field
+                fields = [
+                    ("$" if name == "json" else name, value)
+                    for name, value in vars(doc).items()
+                    if name not in ("id", "payload")
+                ]
+                reply.append([item for field in fields for item in field])
+        return reply
+
+    def _search(
+        self,
+        index_name: str,
+        query_string: str,
+        offset: int,
+        num: int,
+        return_fields: List[Tuple[str, str]],
+        no_content: bool,
+        query_params: Optional[Dict[str, Any]],
+    ):
+        """FT.SEARCH over one index, the documents as attributes of SimpleNamespaces."""
+        index = self.indexes[index_name]
+        knn = _REDIS_KNN.search(query_string)
+        predicate = _redis_predicate(index, query_string[: knn.start()] if knn else query_string)
+        keys = [key for key in self._indexed(index) if predicate(self.data[key])]
+
+        scores: Dict[str, float] = {}
+        score_name = None
+        if knn:
+            k, field_name, param, score_name = int(knn.group(1)), knn.group(2), knn.group(3), knn.group(4)
+            score_name = score_name or f"__{field_name}_score"
+            dtype = _REDIS_DTYPES[index.vector_dtype]
+            vector = from_bytes(query_params[param], dtype).astype(np.float32)
+            path = index.fields[field_name][0]
+            table = _VectorTable("Cosine" if index.metric == "COSINE" else "Dot" if index.metric == "IP" else "Euclid")
+            for key in keys:
+                document = self.data[key]
+                if isinstance(document, _RedisHash):
+                    embedding = document.get(path)
+                    embedding = None if embedding is None else from_bytes(embedding, dtype)
+                else:
+                    embedding = _get_path(document, path)
+                if embedding is not None:
+                    table.upsert(key, embedding, None)
+            for key, score in table.search(vector, k):
+                # RediSearch returns distances, lower is closer
+                scores[key] = 1 - score if index.metric in ("COSINE", "IP") else -score
+            keys = sorted(scores, key=scores.get)
+
+        docs = []
+        for key in keys[offset : offset + num]:
+            document = self.data[key]
+            doc = SimpleNamespace(id=key, payload=None)
+            if score_name is not None:
+                setattr(doc, score_name, str(scores[key]))
+            if isinstance(document, _RedisHash):
+                # Hash fields come back as attributes, by field name or alias
+                fields = return_fields or ([] if no_content else [(name, name) for name in document])
+                for field, alias in fields:
+                    path = index.fields[field][0] if field in index.fields else field
+                    if field != index.vector_field and path in document:
+                        setattr(doc, alias, _redis_field(document, path))
+            elif return_fields:
+                for field, alias in return_fields:
+                    if field == "$":
+                        doc.json = json.dumps(document)
+                        continue
+                    path = index.fields[field][0] if field in index.fields else field
+                    # Missing fields are left out of the reply
+                    value = _get_path(document, path) if path.startswith("$") else None
+                    if value is not None:
+                        setattr(doc, alias, value if isinstance(value, str) else json.dumps(value))
+            elif not no_content:
+                doc.json = json.dumps(document)
+            docs.append(doc)
+        return SimpleNamespace(total=len(keys), docs=docs, duration=0.0)
+
+    async def _command(self, name: str, *args):
+        await self.latency.asleep()
+        return self._apply(name, args)
+
+    async def info(self, section: Optional[str] = None):
+        await self.latency.asleep()
+        return {"modules": [{"name": "search", "ver": 20612}, {"name": "ReJSON", "ver": 20609}]}
+
+    def ft(self, index_name: str = "idx") -> _FakeSearch:
+        return _FakeSearch(self, index_name)
+
+    def json(self) -> _FakeJson:
+        return _FakeJson(self)
+
+    def pipeline(self, transaction: bool = True) -> _FakePipeline:
+        return _FakePipeline(self)
+
+    async def hset(self, key: str, field: Optional[str] = None, value: Any = None, mapping: Optional[dict] = None) -> int:
+        mapping = dict(mapping or {})
+        if field is not None:
+            mapping[field] = value
+        return await self._command("hset", key, mapping)
+
+    async def hgetall(self, key: str) -> dict:
+        return await self._command("hgetall", key)
+
+    async def type(self, key: str) -> bytes:
+        return await self._command("type", key)
+
+    async def delete(self, *keys: str) -> int:
+        return await self._command("delete", *keys)
+
+    async def unlink(self, *keys: str) -> int:
+        return await self._command("delete", *keys)
+
+    async def execute_command(self, *args):
+        return await self._command(str(args[0]).upper(), *args[1:])
+
+    async def scan_iter(self, match: Optional[str] = None, count: Optional[int] = None):
+        pattern = re.compile("^" + ".*".join(re.escape(part) for part in (match or "*").split("*")) + "$")
+        keys = [key for key in self.data if pattern.match(key)]
+        # One round trip per SCAN page
+        for start in range(0, len(keys), count or 10):
+            await self.latency.asleep()
+            for key in keys[start : start + (count or 10)]:
+                yield key
+
+    async def close(self):
+        pass
+
+
+### Milvus ###
+
+
+def _milvus_eval(expr: Optional[str], row: dict) -> bool:
+    """
+    Evaluate a Milvus boolean expression against a row. The expression grammar
+    used by the providers (==, <=, in [...], and/or/not) is valid Python.
+    """
+    if not expr:
+        return True
+    expr = expr.replace("&&", " and ").replace("||", " or ")
+    expr = re.sub(r"\bnot in\b", " not in ", expr)
+    return bool(eval(expr, {"__builtins__": {}}, dict(row)))  # noqa: S307
+
+
+class FakeMilvusException(Exception):
+    """Stand-in for pymilvus.MilvusException."""
+
+
+class _FakeQueryIterator:
+    """Stand-in for the pymilvus query iterator, pages matching rows in primary key order."""
+
+    def __init__(self, collection: "FakeCollection", batch_size: int, expr: Optional[str], output_fields: List[str]):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.expr = expr
+        self.output_fields = output_fields
+        self._last = None
+
+    def next(self) -> List[dict]:
+        collection = self.collection
+        collection.milvus.latency.sleep()
+        pks = sorted(
+            pk
+            for pk, row in collection._rows.items()
+            if (self._last is None or pk > self._last) and _milvus_eval(self.expr, row)
+        )[: self.batch_size]
+        if pks:
+            self._last = pks[-1]
+        return [collection._project(collection._rows[pk], self.output_fields) for pk in pks]
+
+    def close(self):
+        pass
+
+
+class FakeCollection:
+    """Stand-in for pymilvus.Collection."""
+
+    def __init__(self, milvus: "FakeMilvus", name: str, schema: Any, consistency_level: str = "Bounded"):
+        self.milvus = milvus
+        self.name = name
+        self.schema = schema
+        self.consistency_level = consistency_level
+        self.indexes: List[Any] = []
+        self.loaded = False
+
+        fields = list(schema.fields)
+        self._primary = next(field for field in fields if getattr(field, "is_primary", False))
+        self._insert_fields = [field.name for field in fields if not getattr(field, "auto_id", False)]
+        self._vector_field = next(
+            (field.name for field in fields if "VECTOR" in str(getattr(field, "dtype", ""))), "embedding"
+        )
+        self._next_pk = 1
+        self._rows: Dict[Any, dict] = {}
+        self._table = _VectorTable("Dot")
+
+    @property
+    def num_entities(self) -> int:
+        return len(self._rows)
+
+    @property
+    def metric(self) -> str:
+        for index in self.indexes:
+            return index.params.get("metric_type", "IP")
+        return "IP"
+
+    def create_index(self, field_name: str, index_params: Optional[dict] = None, **kwargs):
+        self.milvus.latency.sleep()
+        params = index_params or {}
+        index = SimpleNamespace(field_name=field_name, params=params)
+        index.to_dict = lambda: {"collection": self.name, "field": field_name, "index_param": params}
+        self.indexes = [existing for existing in self.indexes if existing.field_name != field_name] + [index]
+        self._table = _VectorTable({"IP": "Dot", "L2": "Euclid", "COSINE": "Cosine"}[params.get("metric_type", "IP")])
+        for pk, row in self._rows.items():
+            self._table.upsert(pk, row[self._vector_field], pk)
+
+    def load(self, **kwargs):
+        self.milvus.latency.sleep()
+        self.loaded = True
+
+    def release(self, **kwargs):
+        self.loaded = False
+
+    def flush(self, **kwargs):
+        self.milvus.latency.sleep()
+
+    def drop(self, **kwargs):
+        self.milvus.latency.sleep()
+        self.milvus.collections.pop(self.name, None)
+
+    def insert(self, data: List[Any], **kwargs):
+        if data and isinstance(data[0], dict):
+            rows = [dict(row) for row in data]
+        else:
+            if len(data) != len(self._insert_fields):
+                raise ValueError(f"Expected {len(self._insert_fields)} columns, got {len(data)}")
+            rows = [dict(zip(self._insert_fields, values)) for values in zip(*data)]
+        self.milvus.latency.sleep(len(rows))
+
+        pks = []
+        for row in rows:
+            if getattr(self._primary, "auto_id", False):
+                row[self._primary.name] = self._next_pk
+                self._next_pk += 1
+            pk = row[self._primary.name]
+            # Milvus appends, a second insert of a primary key is a duplicate row
+            self._rows[pk] = row
+            self._table.upsert(pk, row[self._vector_field], pk)
+            pks.append(pk)
+        return SimpleNamespace(insert_count=len(rows), delete_count=0, primary_keys=pks)
+
+    def search(
+        self,
+        data: List[List[float]],
+        anns_field: str,
+        param: Optional[dict],
+        limit: int,
+        expr: Optional[str] = None,
+        output_fields: Optional[List[str]] = None,
+        **kwargs,
+    ):
+        if not self.loaded:
+            raise ValueError(f"Collection {self.name} is not loaded")
+        self.milvus.latency.sleep(len(data))
+        predicate = None
+        if expr:
+            matching = {pk for pk, row in self._rows.items() if _milvus_eval(expr, row)}
+            predicate = matching.__contains__
+        results = []
+        for vector in data:
+            hits = []
+            for pk, score in self._table.search(vector, limit, predicate):
+                # L2 is reported as the squared distance, lower is closer
+                distance = -score if self.metric == "L2" else score
+                row = self._rows[pk]
+                entity = {name: row.get(name) for name in output_fields or []}
+                hits.append(
+                    SimpleNamespace(id=pk, distance=distance, score=distance, entity=SimpleNamespace(get=entity.get))
+                )
+            results.append(hits)
+        return results
+
+    def _project(self, row: dict, output_fields: Optional[List[str]]) -> dict:
+        fields = [self._primary.name] + [name for name in output_fields or [] if name != self._primary.name]
+        return {name: row.get(name) for name in fields}
+
+    def query(self, expr: str, output_fields: Optional[List[str]] = None, limit: Optional[int] = None, **kwargs):
+        self.milvus.latency.sleep()
+        # The server merges the results of its segments in primary key order
+        rows = [
+            self._project(self._rows[pk], output_fields)
+            for pk in sorted(self._rows)
+            if _milvus_eval(expr, self._rows[pk])
+        ]
+        return rows[:limit] if limit is not None else rows
+
+    def query_iterator(
+        self, batch_size: int = 1000, expr: Optional[str] = None, output_fields: Optional[List[str]] = None, **kwargs
+    ) -> _FakeQueryIterator:
+        return _FakeQueryIterator(self, batch_size, expr, output_fields or [])
+
+    def delete(self, expr: str, **kwargs):
+        if not self.milvus.delete_by_expression and not re.match(rf"\s*{self._primary.name} in \[", expr):
+            raise FakeMilvusException(f"invalid plan node type, only pk in [1, 2] supported, got {expr}")
+        matching = [pk for pk, row in self._rows.items() if _milvus_eval(expr, row)]
+        self.milvus.latency.sleep()
+        for pk in matching:
+            del self._rows[pk]
+        self._table.remove(matching)
+        return SimpleNamespace(insert_count=0, delete_count=len(matching), primary_keys=matching)
+
+
+class FakeMilvus:
+    """
+    Stand-in for the pymilvus module level API: connections, utility and Collection.
+    """
+
+    def __init__(self, latency: Optional[LatencyModel] = None, delete_by_expression: bool = True):
+        self.latency = latency or LatencyModel()
+        # False behaves like servers before 2.3, which only delete by primary key
+        self.delete_by_expression = delete_by_expression
+        self.collections: Dict[str, FakeCollection] = {}
+        self._aliases: Dict[str, dict] = {}
+
+        aliases = self._aliases
+        self.connections = SimpleNamespace(
+            connect=lambda alias="default", **kwargs: aliases.__setitem__(alias, kwargs),
+            disconnect=lambda alias: aliases.pop(alias, None),
+            has_connection=lambda alias: alias in aliases,
+            list_connections=lambda: [(alias, True) for alias in aliases],
+            get_connection_addr=lambda alias: {
+                "address": "{}:{}".format(aliases[alias].get("host"), aliases[alias].get("port"))
+            },
+        )
+        self.utility = SimpleNamespace(
+            has_collection=lambda name, using="default": name in self.collections,
+            drop_collection=lambda name, using="default": self.collections.pop(name, None) and None,
+            list_collections=lambda using="default": list(self.collections),
+        )
+
+    def patch(self, module: Any):
+        """Point the provider module's pymilvus names at this fake."""
+        return mock.patch.multiple(
+            module,
+            Collection=self.Collection,
+            connections=self.connections,
+            utility=self.utility,
+            MilvusException=FakeMilvusException,
+            _CONNECTIONS={},
+        )
+
+    def Collection(
+        self,
+        name: str,
+        schema: Any = None,
+        using: str = "default",
+        consistency_level: str = "Bounded",
+        **kwargs,
+    ) -> FakeCollection:
+        if name not in self.collections:
+            if schema is None:
+                raise ValueError(f"Collection {name} not exist, or you can pass in schema to create one.")
+            self.collections[name] = FakeCollection(self, name, schema, consistency_level)
+        return self.collections[name]
+
+
+### Pinecone ###
+
+
+_PINECONE_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "$eq": lambda value, operand: value == operand,
+    "$ne": lambda value, operand: value != operand,
+    "$gt": lambda value, operand: value is not None and value > operand,
+    "$gte": lambda value, operand: value is not None and value >= operand,
+    "$lt": lambda value, operand: value is not None and value < operand,
+    "$lte": lambda value, operand: value is not None and value <= operand,
+    "$in": lambda value, operand: value in operand,
+    "$nin": lambda value, operand: value not in operand,
+}
+
+
+def _pinecone_matches(metadata: dict, query_filter: Optional[dict]) -> bool:
+    if not query_filter:
+        return True
+    for key, condition in query_filter.items():
+        if key == "$and":
+            if not all(_pinecone_matches(metadata, part) for part in condition):
+                return False
+        elif key == "$or":
+            if not any(_pinecone_matches(metadata, part) for part in condition):
+                return False
+        else:
+            value = metadata.get(key)
+            conditions = condition if isinstance(condition, dict) else {"$eq": condition}
+            values = value if isinstance(value, list) else [value]
+            for operator, operand in conditions.items():
+                if operator == "$nin" or operator == "$ne":
+                    if not all(_PINECONE_OPERATORS[operator](v, operand) for v in values):
+                        return False
+                elif not any(_PINECONE_OPERATORS[operator](v, operand) for v in values):
+                    return False
+    return True
+
+
+class FakePineconeIndex:
+    """Stand-in for pinecone.Index."""
+
+    def __init__(self, pinecone: "FakePinecone", name: str):
+        self.pinecone = pinecone
+        self.name = name
+        self.namespaces: Dict[str, _VectorTable] = {}
+
+    def _namespace(self, namespace: str) -> _VectorTable:
+        if namespace not in self.namespaces:
+            distance = {"cosine": "Cosine", "dotproduct": "Dot", "euclidean": "Euclid"}[self.pinecone.metric]
+            self.namespaces[namespace] = _VectorTable(distance)
+        return self.namespaces[namespace]
+
+    def upsert(self, vectors: List[Any], namespace: str = "", **kwargs):
+        self.pinecone.latency.sleep(len(vectors))
+        table = self._namespace(namespace)
+        for vector in vectors:
+            if isinstance(vector, dict):
+                id, values, metadata = vector["id"], vector["values"], vector.get("metadata")
+            else:
+                id, values, metadata = (tuple(vector) + (None,))[:3]
+            table.upsert(id, values, metadata or {})
+        return SimpleNamespace(upserted_count=len(vectors))
+
+    def _query(self, table, vector, top_k, query_filter, include_values, include_metadata):
+        matches = []
+        predicate = (lambda metadata: _pinecone_matches(metadata, query_filter)) if query_filter else None
+        for id, score in table.search(vector, top_k, predicate):
+            stored, metadata = table.rows[id]
+            matches.append(
+                SimpleNamespace(
+                    id=id,
+                    # Pinecone reports the squared distance for euclidean
+                    score=-score if table.distance == "Euclid" else score,
+                    values=stored.tolist() if include_values else [],
+                    metadata=metadata if include_metadata else None,
+                )
+            )
+        return matches
+
+    def query(
+        self,
+        vector: Optional[List[float]] = None,
+        top_k: int = 10,
+        filter: Optional[dict] = None,
+        include_values: bool = False,
+        include_metadata: bool = False,
+        namespace: str = "",
+        queries: Optional[List[Any]] = None,
+        id: Optional[str] = None,
+        **kwargs,
+    ):
+        table = self._namespace(namespace)
+        if queries is not None:
+            self.pinecone.latency.sleep(len(queries))
+            results = []
+            for query in queries:
+                values, query_filter = (query["values"], query.get("filter")) if isinstance(query, dict) else (query, None)
+                results.append(
+                    SimpleNamespace(
+                        matches=self._query(
+                            table, values, top_k, query_filter or filter, include_values, include_metadata
+                        ),
+                        namespace=namespace,
+                    )
+                )
+            return SimpleNamespace(results=results, matches=[], namespace=namespace)
+
+        self.pinecone.latency.sleep()
+        if id is not None:
+            vector = table.rows[id][0]
+        matches = self._query(table, vector, top_k, filter, include_values, include_metadata)
+        return SimpleNamespace(matches=matches, namespace=namespace)
+
+    def delete(
+        self,
+        ids: Optional[List[str]] = None,
+        delete_all: bool = False,
+        filter: Optional[dict] = None,
+        namespace: str = "",
+        **kwargs,
+    ):
+        self.pinecone.latency.sleep()
+        table = self._namespace(namespace)
+        if delete_all:
+            ids = list(table.rows)
+        elif filter is not None:
+            ids = table.select(lambda metadata: _pinecone_matches(metadata, filter))
+        table.remove(ids or [])
+        return {}
+
+    def describe_index_stats(self, **kwargs):
+        self.pinecone.latency.sleep()
+        return SimpleNamespace(
+            namespaces={name: SimpleNamespace(vector_count=len(table)) for name, table in self.namespaces.items()},
+            total_vector_count=sum(len(table) for table in self.namespaces.values()),
+        )
+
+
+class FakePinecone:
+    """Stand-in for the pinecone module: init() and Index()."""
+
+    def __init__(self, latency: Optional[LatencyModel] = None, metric: str = "cosine"):
+        self.latency = latency or LatencyModel()
+        self.metric = metric
+        self.indexes: Dict[str, FakePineconeIndex] = {}
+
+    def patch(self, module: Any):
+        """Make the provider module talk to this fake instead of the pinecone package."""
+        return mock.patch.multiple(module, pinecone=self, _INITIALIZED=set())
+
+    def init(self, api_key: Optional[str] = None, environment: Optional[str] = None, **kwargs):
+        pass
+
+    def Index(self, index_name: str, pool_threads: int = 1) -> FakePineconeIndex:
+        if index_name not in self.indexes:
+            self.indexes[index_name] = FakePineconeIndex(self, index_name)
+        return self.indexes[index_name]
@@ -0,0 +1,192 @@
+import asyncio
+import json
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+    Union,
+)
+
+from vectordbs.embeddings import embedding_nbytes
+from vectordbs.types import VectorStoreData
+
+# Defaults sized for the common 1536-d case, about 620 KB of vectors per batch
+STREAM_BATCH_SIZE = 100
+STREAM_BATCH_BYTES = 4 * 1024 * 1024
+STREAM_MAX_IN_FLIGHT = 4
+
+T = TypeVar("T")
+
+
+@dataclass
+class BatchFailure:
+    batch: int
+    ids: List[str]
+    error: Exception
+
+
+@dataclass
+class StreamReport:
+    """Progress of an add_stream call, final once it returns."""
+
+    added: int = 0
+    batches: int = 0
+    failures: List[BatchFailure] = field(default_factory=list)
+
+    @property
+    def failed(self) -> int:
+        return sum(len(failure.ids) for failure in self.failures)
+
+
+def record_bytes(data: VectorStoreData) -> int:
+    """
+    Approximate wire size of a record: float32 vector, id and JSON data.
+    """
+    return embedding_nbytes(data.embedding) + len(data.id) + len(json.dumps(data.data, default=str))
+
+
+def iter_batches(
+    datas: Iterable[T],
+    batch_size: int = STREAM_BATCH_SIZE,
+    max_batch_bytes: int = STREAM_BATCH_BYTES,
+    nbytes: Callable[[T], int] = record_bytes,
+) -> Iterator[List[T]]:
+    """
+    Lazily group records into batches of at most batch_size records and
+    max_batch_bytes bytes. A single oversized record gets a batch of its own.
+
+    nbytes sizes one record, providers batching their own row format pass
+    their own estimate.
+    """
+    batch: List[T] = []
+    size = 0
+    for data in datas:
+        data_size = nbytes(data)
+        if batch and (len(batch) >= batch_size or size + data_size > max_batch_bytes):
+            yield batch
+            batch, size = [], 0
+        batch.append(data)
+        size += data_size
+    if batch:
+        yield batch
+
+
+def add_stream(
+    add: Callable[[List[VectorStoreData]], List[str]],
+    datas: Iterable[VectorStoreData],
+    batch_size: int = STREAM_BATCH_SIZE,
+    max_batch_bytes: int = STREAM_BATCH_BYTES,
+    max_in_flight: int = STREAM_MAX_IN_FLIGHT,
+    progress: Optional[Callable[[StreamReport], None]] = None,
+) -> StreamReport:
+    """
+    Feed a stream of records to add() in bounded batches on a thread pool.
+
+    The next batch is only pulled from datas once fewer than max_in_flight
+    batches are pending, so memory stays bounded whatever the stream length.
+    A failed batch is recorded in the report and does not stop the stream.
+    """
+    report = StreamReport()
+    pending: Dict[Future, tuple] = {}
+
+    def _collect(done):
+        for future in done:
+            index, batch = pending.pop(future)
+            try:
+                future.result()
+                report.added += len(batch)
+            except Exception as e:
+                report.failures.append(BatchFailure(index, [data.id for data in batch], e))
+            report.batches += 1
+            if progress is not None:
+                progress(report)
+
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="vectordbs-ingest") as pool:
+        for index, batch in enumerate(iter_batches(datas, batch_size, max_batch_bytes)):
+            if len(pending) >= max_in_flight:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                _collect(done)
+            pending[pool.submit(add, batch)] = (index, batch)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            _collect(done)
+
+    return report
+
+
+async def aiter_batches(
+    datas: Union[Iterable[T], AsyncIterable[T]],
+    batch_size: int = STREAM_BATCH_SIZE,
+    max_batch_bytes: int = STREAM_BATCH_BYTES,
+    nbytes: Callable[[T], int] = record_bytes,
+) -> AsyncIterator[List[T]]:
+    """
+    iter_batches for a regular or an async iterable of records.
+    """
+    if not hasattr(datas, "__aiter__"):
+        for batch in iter_batches(datas, batch_size, max_batch_bytes, nbytes):  # type: ignore
+            yield batch
+        return
+
+    batch: List[T] = []
+    size = 0
+    async for data in datas:  # type: ignore
+        data_size = nbytes(data)
+        if batch and (len(batch) >= batch_size or size + data_size > max_batch_bytes):
+            yield batch
+            batch, size = [], 0
+        batch.append(data)
+        size += data_size
+    if batch:
+        yield batch
+
+
+async def aadd_stream(
+    add: Callable[[List[VectorStoreData]], Awaitable[List[str]]],
+    datas: Union[Iterable[VectorStoreData], AsyncIterable[VectorStoreData]],
+    batch_size: int = STREAM_BATCH_SIZE,
+    max_batch_bytes: int = STREAM_BATCH_BYTES,
+    max_in_flight: int = STREAM_MAX_IN_FLIGHT,
+    progress: Optional[Callable[[StreamReport], None]] = None,
+) -> StreamReport:
+    """
+    Async version of add_stream for coroutine add() functions, datas may be
+    a regular or an async iterable.
+    """
+    report = StreamReport()
+    pending: Dict[asyncio.Task, tuple] = {}
+
+    def _collect(done):
+        for task in done:
+            index, batch = pending.pop(task)
+            error = task.exception()
+            if error is None:
+                report.added += len(batch)
+            else:
+                report.failures.append(BatchFailure(index, [data.id for data in batch], error))
+            report.batches += 1
+            if progress is not None:
+                progress(report)
+
+    index = 0
+    async for batch in aiter_batches(datas, batch_size, max_batch_bytes):
+        if len(pending) >= max_in_flight:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            _collect(done)
+        pending[asyncio.ensure_future(add(batch))] = (index, batch)
+        index += 1
+
+    while pending:
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        _collect(done)
+
+    return report
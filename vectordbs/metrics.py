@@ -0,0 +1,356 @@
+"""
+Instrumentation hooks for VectorStore operations.
+
+Providers wrap each add, query and delete in an operation, split into
+serialize, network and parse phases, and report the batch size, the bytes
+sent and any error to every registered hook:
+
+    recorder = MetricsRecorder()
+    add_hook(recorder)
+    ...
+    recorder.snapshot()
+
+With no hook registered operation() returns a shared no-op, so the hot path
+costs one function call and a truth test.
+"""
+import bisect
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from vectordbs.types import QueryResult, VectorStore, VectorStoreBatch, VectorStoreQuery
+
+PHASES = ("serialize", "network", "parse")
+
+# Seconds, the Prometheus client defaults extended down to 100 us for local stores
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+@dataclass
+class OperationEvent:
+    store: str
+    operation: str
+    seconds: float
+    # Seconds per phase, phases that did not run are absent
+    phases: Dict[str, float] = field(default_factory=dict)
+    batch_size: int = 0
+    bytes_sent: int = 0
+    error: Optional[BaseException] = None
+
+
+class MetricsHook:
+    """Base class for instrumentation hooks, called once per finished operation."""
+
+    def on_operation(self, event: OperationEvent) -> None:
+        ...
+
+
+# Swapped as a whole so the hot path reads it without a lock
+_HOOKS: Tuple[MetricsHook, ...] = ()
+_HOOKS_LOCK = threading.Lock()
+
+
+def add_hook(hook: MetricsHook) -> MetricsHook:
+    global _HOOKS
+    with _HOOKS_LOCK:
+        _HOOKS = _HOOKS + (hook,)
+    return hook
+
+
+def remove_hook(hook: MetricsHook):
+    global _HOOKS
+    with _HOOKS_LOCK:
+        _HOOKS = tuple(existing for existing in _HOOKS if existing is not hook)
+
+
+def enabled() -> bool:
+    return bool(_HOOKS)
+
+
+class _Phase:
+    __slots__ = ("operation", "name", "start")
+
+    def __init__(self, operation: "_Operation", name: str):
+        self.operation = operation
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        phases = self.operation.phases
+        phases[self.name] = phases.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+
+class _Operation:
+    """A timed operation, phases entered more than once add up."""
+
+    __slots__ = ("store", "operation", "batch_size", "bytes_sent", "error", "phases", "start")
+
+    def __init__(self, store: str, operation: str, batch_size: int, bytes_sent: int):
+        self.store = store
+        self.operation = operation
+        self.batch_size = batch_size
+        self.bytes_sent = bytes_sent
+        # Set by callers that handle the error themselves but still want it counted
+        self.error: Optional[BaseException] = None
+        self.phases: Dict[str, float] = {}
+
+    def __bool__(self) -> bool:
+        return True
+
+    def phase(self, name: str) -> _Phase:
+        return _Phase(self, name)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        event = OperationEvent(
+            self.store,
+            self.operation,
+            time.perf_counter() - self.start,
+            self.phases,
+            self.batch_size,
+            self.bytes_sent,
+            exc or self.error,
+        )
+        for hook in _HOOKS:
+            try:
+                hook.on_operation(event)
+            except Exception:
+                # A broken exporter must not fail the request
+                logging.exception(f"Metrics hook {hook!r} failed")
+        return False
+
+
+class _NoopOperation:
+    """Stands in for _Operation when no hook is registered, falsy so callers can skip extra work."""
+
+    __slots__ = ()
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+    def phase(self, name: str) -> "_NoopOperation":
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP = _NoopOperation()
+
+
+def operation(store: str, name: str, batch_size: int = 0, bytes_sent: int = 0):
+    """
+    Context manager timing one operation of a store, use op.phase(name) inside
+    it for the serialize, network and parse parts. Work that only feeds the
+    metrics (counting bytes) should be guarded with `if op:`.
+    """
+    if not _HOOKS:
+        return _NOOP
+    return _Operation(store, name, batch_size, bytes_sent)
+
+
+### In-process recorder ###
+
+
+class Histogram:
+    """Fixed bucket histogram with per bucket counts, the last bucket counts overflows."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q quantile, inf when it overflowed."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts)),
+        }
+
+
+class MetricsRecorder(MetricsHook):
+    """
+    Aggregates events in memory: latency histograms per phase, batch size
+    histograms, bytes sent and error counts per (store, operation).
+    """
+
+    def __init__(
+        self,
+        latency_buckets: Sequence[float] = LATENCY_BUCKETS,
+        batch_size_buckets: Sequence[float] = BATCH_SIZE_BUCKETS,
+    ):
+        self.latency_buckets = latency_buckets
+        self.batch_size_buckets = batch_size_buckets
+        self.latencies: Dict[Tuple[str, str, str], Histogram] = {}
+        self.batch_sizes: Dict[Tuple[str, str], Histogram] = {}
+        self.bytes_sent: Dict[Tuple[str, str], int] = {}
+        self.errors: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def _latency(self, key: Tuple[str, str, str]) -> Histogram:
+        if key not in self.latencies:
+            self.latencies[key] = Histogram(self.latency_buckets)
+        return self.latencies[key]
+
+    def on_operation(self, event: OperationEvent) -> None:
+        key = (event.store, event.operation)
+        with self._lock:
+            self._latency(key + ("total",)).observe(event.seconds)
+            for phase, seconds in event.phases.items():
+                self._latency(key + (phase,)).observe(seconds)
+            if event.batch_size:
+                if key not in self.batch_sizes:
+                    self.batch_sizes[key] = Histogram(self.batch_size_buckets)
+                self.batch_sizes[key].observe(event.batch_size)
+            self.bytes_sent[key] = self.bytes_sent.get(key, 0) + event.bytes_sent
+            if event.error is not None:
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def snapshot(self) -> dict:
+        """JSON serializable view, {"store.operation": {...}}."""
+        with self._lock:
+            report: Dict[str, dict] = {}
+            for (store, operation, phase), histogram in self.latencies.items():
+                entry = report.setdefault(f"{store}.{operation}", {"latency": {}})
+                entry["latency"][phase] = histogram.to_dict()
+            for (store, operation), histogram in self.batch_sizes.items():
+                report[f"{store}.{operation}"]["batch_size"] = histogram.to_dict()
+            for (store, operation), sent in self.bytes_sent.items():
+                report[f"{store}.{operation}"]["bytes_sent"] = sent
+                report[f"{store}.{operation}"]["errors"] = self.errors.get((store, operation), 0)
+            return report
+
+
+### Exporters ###
+
+
+class PrometheusHook(MetricsHook):
+    """Export to prometheus_client metrics, registered on registry (default: the global one)."""
+
+    def __init__(self, registry=None, namespace: str = "vectordbs"):
+        from prometheus_client import REGISTRY, Counter, Histogram
+
+        registry = registry or REGISTRY
+        self.latency = Histogram(
+            "operation_seconds", "VectorStore operation latency", ["store", "operation", "phase"],
+            namespace=namespace, buckets=LATENCY_BUCKETS, registry=registry,
+        )
+        self.batch_size = Histogram(
+            "batch_size", "Records or queries per operation", ["store", "operation"],
+            namespace=namespace, buckets=BATCH_SIZE_BUCKETS, registry=registry,
+        )
+        self.bytes_sent = Counter(
+            "bytes_sent", "Request payload bytes", ["store", "operation"], namespace=namespace, registry=registry
+        )
+        self.errors = Counter(
+            "errors", "Failed operations", ["store", "operation", "error"], namespace=namespace, registry=registry
+        )
+
+    def on_operation(self, event: OperationEvent) -> None:
+        self.latency.labels(event.store, event.operation, "total").observe(event.seconds)
+        for phase, seconds in event.phases.items():
+            self.latency.labels(event.store, event.operation, phase).observe(seconds)
+        if event.batch_size:
+            self.batch_size.labels(event.store, event.operation).observe(event.batch_size)
+        if event.bytes_sent:
+            self.bytes_sent.labels(event.store, event.operation).inc(event.bytes_sent)
+        if event.error is not None:
+            self.errors.labels(event.store, event.operation, type(event.error).__name__).inc()
+
+
+class OpenTelemetryHook(MetricsHook):
+    """Export to OpenTelemetry instruments created on meter (default: the global meter provider)."""
+
+    def __init__(self, meter=None):
+        if meter is None:
+            from opentelemetry import metrics
+
+            meter = metrics.get_meter("vectordbs")
+        self.latency = meter.create_histogram("vectordbs.operation.duration", unit="s")
+        self.batch_size = meter.create_histogram("vectordbs.operation.batch_size")
+        self.bytes_sent = meter.create_counter("vectordbs.operation.bytes_sent", unit="By")
+        self.errors = meter.create_counter("vectordbs.operation.errors")
+
+    def on_operation(self, event: OperationEvent) -> None:
+        attributes = {"store": event.store, "operation": event.operation}
+        self.latency.record(event.seconds, {**attributes, "phase": "total"})
+        for phase, seconds in event.phases.items():
+            self.latency.record(seconds, {**attributes, "phase": phase})
+        if event.batch_size:
+            self.batch_size.record(event.batch_size, attributes)
+        if event.bytes_sent:
+            self.bytes_sent.add(event.bytes_sent, attributes)
+        if event.error is not None:
+            self.errors.add(1, {**attributes, "error": type(event.error).__name__})
+
+
+### Wrapper for stores without built in instrumentation ###
+
+
+class InstrumentedVectorStore(VectorStore):
+    """
+    Report every add, delete, query and query_batch of a store to the hooks.
+
+    Local stores do no serialization or network calls, so only the total
+    latency and batch sizes are reported.
+    """
+
+    def __init__(self, store: VectorStore, name: Optional[str] = None):
+        self.store = store
+        self.name = name or type(store).__name__
+        self.stream_concurrency = store.stream_concurrency
+
+    def close(self):
+        self.store.close()
+
+    def add(self, datas: VectorStoreBatch) -> List[str]:
+        with operation(self.name, "add", batch_size=len(datas)):
+            return self.store.add(datas)
+
+    def delete(self, ids: List[str]) -> None:
+        with operation(self.name, "delete", batch_size=len(ids)):
+            self.store.delete(ids)
+
+    def query(self, query: VectorStoreQuery) -> QueryResult:
+        with operation(self.name, "query", batch_size=1):
+            return self.store.query(query)
+
+    def query_batch(self, queries: List[VectorStoreQuery]) -> List[QueryResult]:
+        with operation(self.name, "query_batch", batch_size=len(queries)):
+            return self.store.query_batch(queries)
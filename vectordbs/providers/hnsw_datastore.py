@@ -0,0 +1,329 @@
+import heapq
+import math
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseSettings, Field
+
+from vectordbs.deadline import NO_DEADLINE, Deadline
+from vectordbs.distances import DISTANCES, normalize, score_vectors
+from vectordbs.providers.memory_datastore import check_query, unpack_batch
+from vectordbs.types import QueryResult, VectorStore, VectorStoreBatch, VectorStoreQuery
+
+# Upper bound on the number of layers, only reached with astronomically bad luck
+MAX_LEVEL = 16
+
+
+class HnswOptions(BaseSettings):
+    dimension: int = Field(1536, env="HNSW_DIMENSION")
+    distance: str = Field("Cosine", env="HNSW_DISTANCE")
+    m: int = Field(16, env="HNSW_M")
+    ef_construction: int = Field(200, env="HNSW_EF_CONSTRUCTION")
+    ef_search: int = Field(64, env="HNSW_EF_SEARCH")
+    # Preallocate room for this many vectors so memory use is known upfront
+    initial_capacity: int = Field(1024, env="HNSW_INITIAL_CAPACITY")
+    seed: Optional[int] = Field(None, env="HNSW_SEED")
+
+
+class HnswDataStore(VectorStore):
+    """
+    Approximate nearest neighbour search with a Hierarchical Navigable Small World graph.
+
+    All graph state lives in fixed-width numpy arrays indexed by node number:
+    level 0 links are an (capacity, 2 * m) int32 matrix, and nodes that reach the
+    upper layers get consecutive rows of an (slots, m) int32 matrix, one per layer.
+    Deleted nodes are tombstoned, they keep routing searches but are never returned.
+    """
+
+    # Graph updates must not interleave
+    stream_concurrency = 1
+
+    def __init__(self, options: Optional[HnswOptions] = None):
+        options = options or HnswOptions()
+        if options.distance not in DISTANCES:
+            raise ValueError(f"Unsupported distance: {options.distance}")
+        if options.m < 2:
+            raise ValueError("m must be at least 2")
+
+        self.dimension = options.dimension
+        self.distance = options.distance
+        self.m = options.m
+        self.m0 = 2 * options.m
+        self.ef_construction = options.ef_construction
+        self.ef_search = options.ef_search
+        self._level_mult = 1 / math.log(options.m)
+        self._rng = np.random.default_rng(options.seed)
+
+        capacity = max(options.initial_capacity, 1)
+        self._vectors = np.zeros((capacity, self.dimension), dtype=np.float32)
+        self._levels = np.zeros(capacity, dtype=np.int8)
+        self._deleted = np.zeros(capacity, dtype=bool)
+        self._links0 = np.full((capacity, self.m0), -1, dtype=np.int32)
+        self._counts0 = np.zeros(capacity, dtype=np.int16)
+        # Row of the first upper layer slot of each node, -1 for level 0 only nodes
+        self._upper_offsets = np.full(capacity, -1, dtype=np.int64)
+        self._upper_links = np.full((max(capacity // self.m, 1), self.m), -1, dtype=np.int32)
+        self._upper_counts = np.zeros(len(self._upper_links), dtype=np.int16)
+        self._upper_used = 0
+
+        self._size = 0
+        self._entry_point = -1
+        self._max_level = -1
+
+        self._ids: List[Optional[str]] = []
+        self._datas: List[Optional[dict]] = []
+        self._nodes: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    ### Graph storage helpers ###
+
+    def _grow(self, size: int):
+        capacity = len(self._vectors)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+
+        def _resize(array: np.ndarray, fill) -> np.ndarray:
+            resized = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+            resized[: len(array)] = array
+            return resized
+
+        self._vectors = _resize(self._vectors, 0)
+        self._levels = _resize(self._levels, 0)
+        self._deleted = _resize(self._deleted, False)
+        self._links0 = _resize(self._links0, -1)
+        self._counts0 = _resize(self._counts0, 0)
+        self._upper_offsets = _resize(self._upper_offsets, -1)
+
+    def _allocate_upper(self, node: int, level: int):
+        needed = self._upper_used + level
+        if needed > len(self._upper_links):
+            slots = len(self._upper_links)
+            while slots < needed:
+                slots *= 2
+            links = np.full((slots, self.m), -1, dtype=np.int32)
+            links[: self._upper_used] = self._upper_links[: self._upper_used]
+            counts = np.zeros(slots, dtype=np.int16)
+            counts[: self._upper_used] = self._upper_counts[: self._upper_used]
+            self._upper_links = links
+            self._upper_counts = counts
+        self._upper_offsets[node] = self._upper_used
+        self._upper_used = needed
+
+    def _neighbors(self, node: int, level: int) -> np.ndarray:
+        if level == 0:
+            return self._links0[node, : self._counts0[node]]
+        slot = self._upper_offsets[node] + level - 1
+        return self._upper_links[slot, : self._upper_counts[slot]]
+
+    def _set_neighbors(self, node: int, level: int, neighbors: List[int]):
+        if level == 0:
+            self._links0[node, : len(neighbors)] = neighbors
+            self._counts0[node] = len(neighbors)
+        else:
+            slot = self._upper_offsets[node] + level - 1
+            self._upper_links[slot, : len(neighbors)] = neighbors
+            self._upper_counts[slot] = len(neighbors)
+
+    def _distances(self, nodes, vector: np.ndarray) -> np.ndarray:
+        # Lower is closer, the negated similarity used by the other providers
+        return -score_vectors(self._vectors[nodes], vector, self.distance)
+
+    ### HNSW algorithm ###
+
+    def _search_layer(
+        self,
+        vector: np.ndarray,
+        entry_points: List[int],
+        ef: int,
+        level: int,
+        accept: Optional[Callable[[int], bool]] = None,
+        deadline: Deadline = NO_DEADLINE,
+    ) -> Tuple[List[Tuple[float, int]], bool]:
+        """
+        Greedy beam search of one layer, returns up to ef (distance, node) pairs
+        sorted closest first. Nodes rejected by accept are traversed but not returned.
+        The search stops expanding once deadline expires, keeping what it found,
+        the second value tells whether it stopped early for that.
+        """
+        visited = set(entry_points)
+        distances = self._distances(entry_points, vector).tolist()
+        candidates = list(zip(distances, entry_points))
+        heapq.heapify(candidates)
+        results = [(-d, n) for d, n in candidates if accept is None or accept(n)]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            distance, node = heapq.heappop(candidates)
+            if len(results) >= ef and distance > -results[0][0]:
+                break
+            if deadline.expired():
+                return sorted((-d, n) for d, n in results), True
+            neighbors = [n for n in self._neighbors(node, level).tolist() if n not in visited]
+            if not neighbors:
+                continue
+            visited.update(neighbors)
+            for d, n in zip(self._distances(neighbors, vector).tolist(), neighbors):
+                if len(results) < ef or d < -results[0][0]:
+                    heapq.heappush(candidates, (d, n))
+                    if accept is None or accept(n):
+                        heapq.heappush(results, (-d, n))
+                        if len(results) > ef:
+                            heapq.heappop(results)
+
+        return sorted((-d, n) for d, n in results), False
+
+    def _select_neighbors(self, candidates: List[Tuple[float, int]], m: int) -> List[int]:
+        """
+        Neighbour selection heuristic: keep a candidate only if it is closer to the
+        base point than to every neighbour already kept. Candidates are sorted closest first.
+        """
+        if len(candidates) <= m:
+            return [n for _, n in candidates]
+        nodes = [n for _, n in candidates]
+        vectors = self._vectors[nodes]
+        # Pairwise distances between all candidates in one matrix product
+        if self.distance == "Euclid":
+            sq_norms = np.einsum("ij,ij->i", vectors, vectors)
+            pairwise = sq_norms[:, None] + sq_norms[None, :] - 2 * (vectors @ vectors.T)
+        else:
+            pairwise = -(vectors @ vectors.T)
+
+        distances = np.array([d for d, _ in candidates], dtype=pairwise.dtype)
+
+        # A candidate is blocked once any selected neighbour is closer to it than the base
+        blocked = np.zeros(len(nodes), dtype=bool)
+        selected: List[int] = []
+        i = 0
+        while len(selected) < m:
+            remaining = np.flatnonzero(~blocked[i:])
+            if len(remaining) == 0:
+                break
+            i += int(remaining[0])
+            selected.append(nodes[i])
+            blocked |= pairwise[i] < distances
+            i += 1
+        return selected
+
+    def _connect(self, node: int, neighbor: int, level: int):
+        max_links = self.m0 if level == 0 else self.m
+        links = self._neighbors(neighbor, level)
+        if len(links) < max_links:
+            self._set_neighbors(neighbor, level, links.tolist() + [node])
+            return
+        # Neighbour is full, re-run the selection heuristic over its links
+        candidates = links.tolist() + [node]
+        distances = self._distances(candidates, self._vectors[neighbor]).tolist()
+        self._set_neighbors(
+            neighbor, level, self._select_neighbors(sorted(zip(distances, candidates)), max_links)
+        )
+
+    def _insert(self, vector: np.ndarray) -> int:
+        node = self._size
+        self._grow(node + 1)
+        self._size += 1
+
+        level = min(int(-math.log(1.0 - self._rng.random()) * self._level_mult), MAX_LEVEL)
+        self._vectors[node] = vector
+        self._levels[node] = level
+        if level > 0:
+            self._allocate_upper(node, level)
+
+        if self._entry_point < 0:
+            self._entry_point = node
+            self._max_level = level
+            return node
+
+        entry_points = [self._entry_point]
+        for current in range(self._max_level, level, -1):
+            nearest, _ = self._search_layer(vector, entry_points, 1, current)
+            entry_points = [nearest[0][1]]
+
+        for current in range(min(level, self._max_level), -1, -1):
+            candidates, _ = self._search_layer(vector, entry_points, self.ef_construction, current)
+            neighbors = self._select_neighbors(candidates, self.m0 if current == 0 else self.m)
+            self._set_neighbors(node, current, neighbors)
+            for neighbor in neighbors:
+                self._connect(node, neighbor, current)
+            entry_points = [n for _, n in candidates]
+
+        if level > self._max_level:
+            self._entry_point = node
+            self._max_level = level
+        return node
+
+    ### VectorStore interface ###
+
+    def add(self, datas: VectorStoreBatch) -> List[str]:
+        """
+        Insert the given vectors into the graph, returns their ids.
+        Re-adding an existing id tombstones the old node.
+        """
+        if len(datas) == 0:
+            return []
+
+        ids, embeddings, payloads = unpack_batch(datas, self.dimension)
+        if self.distance == "Cosine":
+            embeddings = normalize(embeddings)
+
+        self._grow(self._size + len(ids))
+        for id, payload, embedding in zip(ids, payloads, embeddings):
+            self.delete([id])
+            node = self._insert(embedding)
+            self._ids.append(id)
+            self._datas.append(payload)
+            self._nodes[id] = node
+
+        return ids
+
+    def delete(self, ids: List[str]) -> None:
+        """
+        Tombstone vectors by id, unknown ids are ignored.
+        """
+        for id in ids:
+            node = self._nodes.pop(id, None)
+            if node is None:
+                continue
+            self._deleted[node] = True
+            self._ids[node] = None
+            self._datas[node] = None
+
+    def query(self, query: VectorStoreQuery) -> QueryResult:
+        """
+        Approximate top k search with a beam of max(ef, top k) at level 0, ef
+        being query.ef or ef_search.
+        """
+        deadline = Deadline.of(query)
+        vector = check_query(query, self.dimension)
+        if self.distance == "Cosine":
+            vector = normalize(vector)
+        if len(self._nodes) == 0:
+            return QueryResult(data=[], similarities=[], ids=[])
+
+        if query.ids is not None:
+            allowed = {self._nodes[id] for id in query.ids if id in self._nodes}
+            accept = allowed.__contains__
+        else:
+            deleted = self._deleted
+            accept = lambda node: not deleted[node]
+
+        entry_points = [self._entry_point]
+        for level in range(self._max_level, 0, -1):
+            nearest, _ = self._search_layer(vector, entry_points, 1, level)
+            entry_points = [nearest[0][1]]
+
+        ef = max(query.ef or self.ef_search, query.similarity_top_k)
+        results, partial = self._search_layer(vector, entry_points, ef, 0, accept, deadline)
+        results = results[: query.similarity_top_k]
+
+        return QueryResult(
+            data=[self._datas[node] for _, node in results],
+            similarities=[-distance for distance, _ in results],
+            ids=[self._ids[node] for _, node in results],
+            partial=partial,
+        )
@@ -0,0 +1,348 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseSettings, Field
+
+from vectordbs.deadline import Deadline
+from vectordbs.distances import DISTANCES, normalize, score_vectors, top_k
+from vectordbs.providers.memory_datastore import check_query, dedupe_batch, unpack_batch
+from vectordbs.types import ColumnarQueryResult, QueryResult, VectorStore, VectorStoreBatch, VectorStoreQuery
+
+# 8 bit codes, one byte per sub quantizer
+PQ_CENTROIDS = 256
+
+
+class IvfPqOptions(BaseSettings):
+    dimension: int = Field(1536, env="IVFPQ_DIMENSION")
+    distance: str = Field("Cosine", env="IVFPQ_DISTANCE")
+    # Number of coarse clusters (inverted lists)
+    nlist: int = Field(256, env="IVFPQ_NLIST")
+    # Number of sub quantizers, each vector is stored in this many bytes
+    m: int = Field(96, env="IVFPQ_M")
+    nprobe: int = Field(8, env="IVFPQ_NPROBE")
+    # Vectors are kept uncompressed until this many have been added, then used for training
+    training_size: int = Field(10000, env="IVFPQ_TRAINING_SIZE")
+    kmeans_iterations: int = Field(20, env="IVFPQ_KMEANS_ITERATIONS")
+    seed: Optional[int] = Field(None, env="IVFPQ_SEED")
+
+
+# Helper functions
+def squared_distances(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """
+    Squared L2 distance between every vector and every centroid.
+    """
+    return (
+        np.einsum("ij,ij->i", vectors, vectors)[:, None]
+        - 2 * vectors @ centroids.T
+        + np.einsum("ij,ij->i", centroids, centroids)[None, :]
+    )
+
+
+def kmeans(
+    vectors: np.ndarray, k: int, iterations: int, rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Lloyd's k-means, returns a (k, dim) float32 centroid matrix.
+    Empty clusters are reseeded with random training vectors.
+    """
+    k = min(k, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = squared_distances(vectors, centroids).argmin(axis=1)
+        counts = np.bincount(assignment, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            centroids[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+    return centroids.astype(np.float32)
+
+
+class IvfPqDataStore(VectorStore):
+    """
+    Compressed approximate search with an inverted file and product quantization.
+
+    A k-means coarse quantizer splits the space into nlist cells, and each vector is
+    stored as the PQ code of its residual to the cell centroid, m uint8 codes per
+    vector. Queries probe the nprobe closest cells and score codes with asymmetric
+    distance lookup tables. Vectors are kept uncompressed and searched exactly until
+    training_size of them have been added, which then become the training sample.
+    """
+
+    # Inverted lists are updated in place, not thread safe
+    stream_concurrency = 1
+
+    def __init__(self, options: Optional[IvfPqOptions] = None):
+        options = options or IvfPqOptions()
+        if options.distance not in DISTANCES:
+            raise ValueError(f"Unsupported distance: {options.distance}")
+        if options.dimension % options.m != 0:
+            raise ValueError(
+                f"Dimension {options.dimension} is not divisible by m={options.m}"
+            )
+
+        self.dimension = options.dimension
+        self.distance = options.distance
+        self.nlist = options.nlist
+        self.m = options.m
+        self.dsub = options.dimension // options.m
+        self.nprobe = options.nprobe
+        self.training_size = options.training_size
+        self.kmeans_iterations = options.kmeans_iterations
+        self._rng = np.random.default_rng(options.seed)
+
+        # Untrained buffer, id -> (data, embedding)
+        self._pending: Dict[str, Tuple[dict, np.ndarray]] = {}
+
+        self.centroids: Optional[np.ndarray] = None
+        self.codebooks: Optional[np.ndarray] = None
+
+        # Encoded rows, kept dense like the memory provider
+        self._codes = np.zeros((0, self.m), dtype=np.uint8)
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._positions = np.zeros(0, dtype=np.int64)
+        self._size = 0
+        self._ids: List[str] = []
+        self._datas: List[dict] = []
+        self._rows: Dict[str, int] = {}
+
+        # Inverted lists of row numbers
+        self._lists: List[np.ndarray] = []
+        self._list_sizes = np.zeros(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._pending) + self._size
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def _prepare(self, embeddings: np.ndarray) -> np.ndarray:
+        if self.distance == "Cosine":
+            return normalize(embeddings)
+        return embeddings
+
+    ### Training and encoding ###
+
+    def train(self, embeddings: Optional[np.ndarray] = None):
+        """
+        Train the coarse quantizer and PQ codebooks, then encode any buffered vectors.
+
+        Args:
+            embeddings (Optional[np.ndarray]): Training sample, defaults to the buffered vectors.
+        """
+        if self.is_trained:
+            raise ValueError("Index is already trained")
+        if embeddings is None:
+            if len(self._pending) == 0:
+                raise ValueError("No vectors to train on")
+            embeddings = np.stack([embedding for _, embedding in self._pending.values()])
+        else:
+            embeddings = self._prepare(np.asarray(embeddings, dtype=np.float32))
+
+        self.centroids = kmeans(embeddings, self.nlist, self.kmeans_iterations, self._rng)
+        self.nlist = len(self.centroids)
+        residuals = embeddings - self.centroids[self._assign(embeddings)]
+
+        # Fewer training vectors than PQ_CENTROIDS shrinks every codebook alike
+        self.codebooks = np.stack(
+            [
+                kmeans(
+                    residuals[:, j * self.dsub : (j + 1) * self.dsub],
+                    PQ_CENTROIDS,
+                    self.kmeans_iterations,
+                    self._rng,
+                )
+                for j in range(self.m)
+            ]
+        )
+
+        self._lists = [np.zeros(4, dtype=np.int64) for _ in range(self.nlist)]
+        self._list_sizes = np.zeros(self.nlist, dtype=np.int64)
+
+        pending = self._pending
+        self._pending = {}
+        if pending:
+            ids = list(pending.keys())
+            self._insert(
+                ids,
+                [data for data, _ in pending.values()],
+                np.stack([embedding for _, embedding in pending.values()]),
+            )
+
+    def _assign(self, embeddings: np.ndarray) -> np.ndarray:
+        if self.distance == "Euclid":
+            return squared_distances(embeddings, self.centroids).argmin(axis=1)
+        return (embeddings @ self.centroids.T).argmax(axis=1)
+
+    def _encode(self, residuals: np.ndarray) -> np.ndarray:
+        codes = np.zeros((len(residuals), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            sub = residuals[:, j * self.dsub : (j + 1) * self.dsub]
+            codes[:, j] = squared_distances(sub, self.codebooks[j]).argmin(axis=1)
+        return codes
+
+    def _insert(self, ids: List[str], datas: List[dict], embeddings: np.ndarray):
+        assignments = self._assign(embeddings)
+        codes = self._encode(embeddings - self.centroids[assignments])
+
+        start = self._size
+        end = start + len(ids)
+        if end > len(self._codes):
+            capacity = max(end, 2 * len(self._codes))
+            self._codes = np.resize(self._codes, (capacity, self.m))
+            self._assignments = np.resize(self._assignments, capacity)
+            self._positions = np.resize(self._positions, capacity)
+        self._codes[start:end] = codes
+        self._assignments[start:end] = assignments
+
+        for row, (id, data, cell) in enumerate(zip(ids, datas, assignments.tolist()), start):
+            self._ids.append(id)
+            self._datas.append(data)
+            self._rows[id] = row
+            size = self._list_sizes[cell]
+            if size == len(self._lists[cell]):
+                self._lists[cell] = np.resize(self._lists[cell], 2 * size)
+            self._lists[cell][size] = row
+            self._positions[row] = size
+            self._list_sizes[cell] = size + 1
+        self._size = end
+
+    def _remove(self, row: int):
+        # Swap remove from the inverted list
+        cell = self._assignments[row]
+        position = self._positions[row]
+        last_position = self._list_sizes[cell] - 1
+        moved = self._lists[cell][last_position]
+        self._lists[cell][position] = moved
+        self._positions[moved] = position
+        self._list_sizes[cell] = last_position
+
+        # Swap remove from the dense row storage
+        last = self._size - 1
+        del self._rows[self._ids[row]]
+        if row != last:
+            self._codes[row] = self._codes[last]
+            self._assignments[row] = self._assignments[last]
+            self._positions[row] = self._positions[last]
+            self._lists[self._assignments[row]][self._positions[row]] = row
+            self._ids[row] = self._ids[last]
+            self._datas[row] = self._datas[last]
+            self._rows[self._ids[row]] = row
+        self._ids.pop()
+        self._datas.pop()
+        self._size = last
+
+    ### VectorStore interface ###
+
+    def add(self, datas: VectorStoreBatch) -> List[str]:
+        """
+        Encode and insert the given vectors, returns their ids. An id repeated
+        in the batch keeps its last vector.
+        """
+        if len(datas) == 0:
+            return []
+
+        ids, embeddings, payloads = unpack_batch(datas, self.dimension)
+        embeddings = self._prepare(embeddings)
+        self.delete(ids)
+
+        if not self.is_trained:
+            for id, payload, embedding in zip(ids, payloads, embeddings):
+                self._pending[id] = (payload, embedding)
+            if len(self._pending) >= self.training_size:
+                self.train()
+        else:
+            unique_ids, unique_embeddings, unique_payloads = dedupe_batch(ids, embeddings, payloads)
+            self._insert(unique_ids, unique_payloads, unique_embeddings)
+
+        return ids
+
+    def delete(self, ids: List[str]) -> None:
+        """
+        Delete vectors by id, unknown ids are ignored.
+        """
+        for id in ids:
+            if self._pending.pop(id, None) is not None:
+                continue
+            row = self._rows.get(id)
+            if row is not None:
+                self._remove(row)
+
+    def _query_pending(self, query: VectorStoreQuery, embedding: np.ndarray) -> ColumnarQueryResult:
+        ids = list(self._pending.keys())
+        if query.ids is not None:
+            allowed = set(query.ids)
+            ids = [id for id in ids if id in allowed]
+        if len(ids) == 0:
+            return ColumnarQueryResult.empty()
+        vectors = np.stack([self._pending[id][1] for id in ids])
+        scores = score_vectors(vectors, embedding, self.distance)
+        best = top_k(scores, query.similarity_top_k)
+        return ColumnarQueryResult(
+            data=[self._pending[ids[i]][0] for i in best],
+            similarities=scores[best],
+            ids=[ids[i] for i in best],
+        )
+
+    def query(self, query: VectorStoreQuery) -> QueryResult:
+        """
+        Approximate top k search over the query.nprobe (default nprobe) closest
+        inverted lists, best first. When the latency budget runs out the lists
+        not scanned yet are skipped.
+        """
+        return self.query_columnar(query).to_result()
+
+    def query_columnar(self, query: VectorStoreQuery) -> ColumnarQueryResult:
+        deadline = Deadline.of(query)
+        embedding = self._prepare(check_query(query, self.dimension))
+        if not self.is_trained:
+            return self._query_pending(query, embedding)
+
+        sub_queries = embedding.reshape(self.m, 1, self.dsub)
+        if self.distance == "Euclid":
+            cell_scores = -squared_distances(embedding[None, :], self.centroids)[0]
+        else:
+            cell_scores = self.centroids @ embedding
+            # Inner product lookup table, shared by every probed list
+            table = np.einsum("mkd,mod->mk", self.codebooks, sub_queries)
+        probes = top_k(cell_scores, query.nprobe or self.nprobe)
+
+        subspaces = np.arange(self.m)
+        all_rows, all_scores = [], []
+        partial = False
+        for i, cell in enumerate(probes.tolist()):
+            # The closest list is always scanned, a best effort answer beats none
+            if i and deadline.expired():
+                partial = True
+                break
+            rows = self._lists[cell][: self._list_sizes[cell]]
+            if len(rows) == 0:
+                continue
+            if self.distance == "Euclid":
+                residual = (embedding - self.centroids[cell]).reshape(self.m, 1, self.dsub)
+                table = -((self.codebooks - residual) ** 2).sum(axis=2)
+                scores = table[subspaces, self._codes[rows]].sum(axis=1)
+            else:
+                scores = cell_scores[cell] + table[subspaces, self._codes[rows]].sum(axis=1)
+            all_rows.append(rows)
+            all_scores.append(scores)
+
+        if not all_rows:
+            return ColumnarQueryResult.empty()
+        rows = np.concatenate(all_rows)
+        scores = np.concatenate(all_scores)
+
+        if query.ids is not None:
+            allowed = np.isin(rows, [self._rows[id] for id in query.ids if id in self._rows])
+            rows = rows[allowed]
+            scores = scores[allowed]
+
+        best = top_k(scores, query.similarity_top_k)
+        return ColumnarQueryResult(
+            data=[self._datas[row] for row in rows[best]],
+            similarities=scores[best],
+            ids=[self._ids[row] for row in rows[best]],
+            partial=partial,
+        )
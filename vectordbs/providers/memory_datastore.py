@@ -0,0 +1,219 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseSettings, Field
+
+from vectordbs.distances import DISTANCES, normalize, score_matrix, score_vectors, top_k
+from vectordbs.embeddings import as_array, as_matrix
+from vectordbs.types import (
+    ColumnarQueryResult,
+    QueryResult,
+    VectorBatch,
+    VectorStore,
+    VectorStoreBatch,
+    VectorStoreData,
+    VectorStoreQuery,
+    VectorStoreQueryMode,
+)
+
+
+class MemoryOptions(BaseSettings):
+    dimension: int = Field(1536, env="MEMORY_DIMENSION")
+    distance: str = Field("Cosine", env="MEMORY_DISTANCE")
+    initial_capacity: int = Field(1024, env="MEMORY_INITIAL_CAPACITY")
+
+
+# Helper functions shared by the in-process providers
+def check_query(query: VectorStoreQuery, dimension: int) -> np.ndarray:
+    """
+    Validate a dense query and return its embedding as a float32 vector.
+    """
+    if query.mode != VectorStoreQueryMode.DEFAULT:
+        raise ValueError(f"Unsupported query mode: {query.mode}")
+    if query.query_embedding is None:
+        raise ValueError("query_embedding is required for dense queries")
+    embedding = as_array(query.query_embedding)
+    if embedding.shape != (dimension,):
+        raise ValueError(
+            f"Expected query embedding of dimension {dimension}, got {embedding.shape}"
+        )
+    return embedding
+
+
+def unpack_batch(datas: VectorStoreBatch, dimension: int) -> Tuple[List[str], np.ndarray, List[dict]]:
+    """
+    Split rows or a VectorBatch into ids, a float32 embedding matrix and data dicts.
+    """
+    if isinstance(datas, VectorBatch):
+        ids = list(datas.ids)
+        embeddings = np.asarray(datas.embeddings, dtype=np.float32)
+        payloads = datas.datas()
+    else:
+        ids = [data.id for data in datas]
+        embeddings = as_matrix(data.embedding for data in datas)
+        payloads = [data.data for data in datas]
+    if embeddings.ndim != 2 or embeddings.shape[1] != dimension:
+        raise ValueError(f"Expected embeddings of dimension {dimension}, got {embeddings.shape}")
+    if len(embeddings) != len(ids):
+        raise ValueError(f"Got {len(ids)} ids for {len(embeddings)} embeddings")
+    return ids, embeddings, payloads
+
+
+def dedupe_batch(
+    ids: List[str], embeddings: np.ndarray, payloads: List[dict]
+) -> Tuple[List[str], np.ndarray, List[dict]]:
+    """
+    Keep the last occurrence of every id in a batch, the batch itself when ids are unique.
+    """
+    last = {id: i for i, id in enumerate(ids)}
+    if len(last) == len(ids):
+        return ids, embeddings, payloads
+    keep = sorted(last.values())
+    return [ids[i] for i in keep], embeddings[keep], [payloads[i] for i in keep]
+
+
+class MemoryDataStore(VectorStore):
+    """
+    Exact nearest neighbour search over a single contiguous float32 matrix.
+
+    Rows are kept dense: deletes move the last row into the freed slot, so a
+    query is always one matrix-vector product over the first `len(self)` rows.
+    """
+
+    # Not thread safe, and CPU bound anyway
+    stream_concurrency = 1
+
+    def __init__(self, options: Optional[MemoryOptions] = None):
+        options = options or MemoryOptions()
+        if options.distance not in DISTANCES:
+            raise ValueError(f"Unsupported distance: {options.distance}")
+
+        self.dimension = options.dimension
+        self.distance = options.distance
+        self._embeddings = np.zeros(
+            (max(options.initial_capacity, 1), self.dimension), dtype=np.float32
+        )
+        self._size = 0
+        self._ids: List[str] = []
+        self._datas: List[dict] = []
+        self._rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _prepare(self, embeddings: np.ndarray) -> np.ndarray:
+        if self.distance == "Cosine":
+            return normalize(embeddings)
+        return embeddings
+
+    def _reserve(self, size: int):
+        capacity = len(self._embeddings)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        embeddings = np.zeros((capacity, self.dimension), dtype=np.float32)
+        embeddings[: self._size] = self._embeddings[: self._size]
+        self._embeddings = embeddings
+
+    def add(self, datas: VectorStoreBatch) -> List[str]:
+        """
+        Insert or overwrite the given vectors, returns their ids.
+        """
+        if len(datas) == 0:
+            return []
+
+        ids, embeddings, payloads = unpack_batch(datas, self.dimension)
+        embeddings = self._prepare(embeddings)
+
+        self._reserve(self._size + len(ids))
+        for id, payload, embedding in zip(ids, payloads, embeddings):
+            row = self._rows.get(id)
+            if row is None:
+                row = self._size
+                self._size += 1
+                self._rows[id] = row
+                self._ids.append(id)
+                self._datas.append(payload)
+            else:
+                self._datas[row] = payload
+            self._embeddings[row] = embedding
+
+        return ids
+
+    def delete(self, ids: List[str]) -> None:
+        """
+        Delete vectors by id, unknown ids are ignored.
+        """
+        for id in ids:
+            row = self._rows.pop(id, None)
+            if row is None:
+                continue
+            last = self._size - 1
+            if row != last:
+                # Move the last row into the hole to keep the matrix dense
+                self._embeddings[row] = self._embeddings[last]
+                self._ids[row] = self._ids[last]
+                self._datas[row] = self._datas[last]
+                self._rows[self._ids[row]] = row
+            self._ids.pop()
+            self._datas.pop()
+            self._size = last
+
+    def query(self, query: VectorStoreQuery) -> QueryResult:
+        """
+        Exact top k search, restricted to query.ids when given.
+        """
+        return self.query_columnar(query).to_result()
+
+    def query_columnar(self, query: VectorStoreQuery) -> ColumnarQueryResult:
+        embedding = self._prepare(check_query(query, self.dimension))
+
+        if query.ids is not None:
+            rows = np.array(
+                [self._rows[id] for id in query.ids if id in self._rows],
+                dtype=np.int64,
+            )
+            scores = score_vectors(self._embeddings[rows], embedding, self.distance)
+        else:
+            rows = None
+            scores = score_vectors(
+                self._embeddings[: self._size], embedding, self.distance
+            )
+
+        best = top_k(scores, query.similarity_top_k)
+        if rows is not None:
+            positions = rows[best]
+        else:
+            positions = best
+
+        return ColumnarQueryResult(
+            data=[self._datas[row] for row in positions],
+            similarities=scores[best],
+            ids=[self._ids[row] for row in positions],
+        )
+
+    def query_batch(self, queries: List[VectorStoreQuery]) -> List[QueryResult]:
+        """
+        Score all unrestricted queries with a single matrix-matrix product.
+        """
+        results: List[Optional[QueryResult]] = [None] * len(queries)
+        batch = [i for i, query in enumerate(queries) if query.ids is None]
+        for i, query in enumerate(queries):
+            if query.ids is not None:
+                results[i] = self.query(query)
+        if not batch:
+            return results
+
+        embeddings = self._prepare(
+            np.stack([check_query(queries[i], self.dimension) for i in batch])
+        )
+        scores = score_matrix(self._embeddings[: self._size], embeddings, self.distance)
+        for i, row_scores in zip(batch, scores):
+            best = top_k(row_scores, queries[i].similarity_top_k)
+            results[i] = QueryResult(
+                data=[self._datas[row] for row in best],
+                similarities=row_scores[best].tolist(),
+                ids=[self._ids[row] for row in best],
+            )
+        return results
@@ -1,8 +1,11 @@
 import json
 import os
+import re
 import asyncio
 
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
 from pymilvus import (
     Collection,
     connections,
@@ -15,16 +18,29 @@ from pymilvus import (
 from uuid import uuid4
 
 
-from services.date import to_unix_timestamp
-from datastore.datastore import DataStore
-from models.models import (
-    DocumentChunk,
-    DocumentChunkMetadata,
-    Source,
-    DocumentMetadataFilter,
+from vectordbs import metrics
+from vectordbs.dates import to_unix_timestamp
+from vectordbs.deadline import Deadline, mark_partial
+from vectordbs.embeddings import as_array, as_matrix, embedding_nbytes
+from vectordbs.executor import BlockingExecutor
+from vectordbs.ingest import iter_batches
+from vectordbs.tuning import (
+    VECTORDBS_TARGET_RECALL,
+    TuningResult,
+    atune,
+    ef_values,
+    exact_neighbors,
+    load_tuning,
+    nprobe_values,
+    sample_ids,
+    save_tuning,
+)
+from vectordbs.types import (
+    AsyncVectorStore,
     QueryResult,
-    QueryWithEmbedding,
-    DocumentChunkWithScore,
+    VectorBatch,
+    VectorStoreBatch,
+    VectorStoreQuery,
 )
 
 MILVUS_COLLECTION = os.environ.get("MILVUS_COLLECTION") or "c" + uuid4().hex
@@ -37,15 +53,60 @@ MILVUS_USE_SECURITY = False if MILVUS_PASSWORD is None else True
 MILVUS_INDEX_PARAMS = os.environ.get("MILVUS_INDEX_PARAMS")
 MILVUS_SEARCH_PARAMS = os.environ.get("MILVUS_SEARCH_PARAMS")
 MILVUS_CONSISTENCY_LEVEL = os.environ.get("MILVUS_CONSISTENCY_LEVEL")
-
-UPSERT_BATCH_SIZE = 100
+# Blocking pymilvus calls run on a thread pool, bounded per store
+MILVUS_MAX_WORKERS = int(os.environ.get("MILVUS_MAX_WORKERS", 8))
+MILVUS_MAX_IN_FLIGHT = int(os.environ.get("MILVUS_MAX_IN_FLIGHT", MILVUS_MAX_WORKERS))
+
+# Connection alias per server address, shared by every store in the process
+_CONNECTIONS: Dict[str, str] = {}
+
+# Rows per insert call, batches are also cut at MILVUS_UPSERT_BATCH_BYTES to stay
+# well under the 64 MB gRPC message limit of the proxy
+UPSERT_BATCH_SIZE = int(os.environ.get("MILVUS_UPSERT_BATCH_SIZE", 1000))
+MILVUS_UPSERT_BATCH_BYTES = int(os.environ.get("MILVUS_UPSERT_BATCH_BYTES", 16 * 1024 * 1024))
+# Flush once this many rows were inserted since the last flush, 0 leaves sealing to the server
+MILVUS_FLUSH_ROWS = int(os.environ.get("MILVUS_FLUSH_ROWS", 0))
+# Primary keys per page and per delete call, and delete calls in flight, when deleting by pk pages
+MILVUS_DELETE_BATCH_SIZE = int(os.environ.get("MILVUS_DELETE_BATCH_SIZE", 1000))
+MILVUS_DELETE_CONCURRENCY = int(os.environ.get("MILVUS_DELETE_CONCURRENCY", 4))
+# How servers before 2.3 reject a delete expression that is not "pk in [...]"
+UNSUPPORTED_DELETE_EXPR = re.compile(r"invalid plan node type|only pk in|only support to delete by pk", re.IGNORECASE)
+# Entities per page when reading the collection back to tune search params
+MILVUS_TUNING_PAGE_SIZE = int(os.environ.get("MILVUS_TUNING_PAGE_SIZE", 1000))
+# Most query vectors sent in one search call
+MILVUS_SEARCH_BATCH_SIZE = int(os.environ.get("MILVUS_SEARCH_BATCH_SIZE", 256))
 OUTPUT_DIM = 1536
 EMBEDDING_FIELD = "embedding"
+# Similarity used for the exact neighbours when tuning, per Milvus metric type
+MILVUS_DISTANCES = {"IP": "Dot", "L2": "Euclid", "COSINE": "Cosine"}
 
 
 class Required:
     pass
 
+
+def _overrides(query: VectorStoreQuery) -> tuple:
+    """Per query (ef, nprobe, consistency_level), None where the query keeps the store default."""
+    return (query.ef, query.nprobe, query.consistency_level)
+
+
+def _in_expr(field: str, values: List[str]) -> str:
+    """Milvus expression matching a VARCHAR field against a list of strings."""
+    return "{} in [{}]".format(field, ",".join(json.dumps(str(value)) for value in values))
+
+
+def _row_nbytes(row) -> int:
+    """Approximate insert payload of a row: packed vectors, UTF-8 strings and 8 byte scalars."""
+    size = 0
+    for value in row:
+        if isinstance(value, str):
+            size += len(value.encode("utf-8"))
+        elif isinstance(value, (int, float)):
+            size += 8
+        else:
+            size += embedding_nbytes(value)
+    return size
+
 # The fields names that we are going to be storing within Milvus, the field declaration for schema creation, and the default value
 SCHEMA_V1 = [
     (
@@ -61,7 +122,7 @@ SCHEMA_V1 = [
     (
         "text",
         FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=65535),
-        Required,
+        "",
     ),
     (
         "document_id",
@@ -101,7 +162,7 @@ SCHEMA_V2 = SCHEMA_V1[1:]
 SCHEMA_V2[4][1].is_primary = True
 
 
-class MilvusDataStore(DataStore):
+class MilvusDataStore(AsyncVectorStore):
     def __init__(
         self,
         create_new: Optional[bool] = False,
@@ -118,12 +179,27 @@ class MilvusDataStore(DataStore):
                                                 Set to "Strong" in test cases for result validation.
         """
         # Overwrite the default consistency level by MILVUS_CONSISTENCY_LEVEL
-        self._consistency_level = MILVUS_CONSISTENCY_LEVEL or consistency_level
+        self._init_state(MILVUS_CONSISTENCY_LEVEL or consistency_level)
         self._create_connection()
 
         self._create_collection(MILVUS_COLLECTION, create_new)  # type: ignore
         self._create_index()
 
+    def _init_state(self, consistency_level: str):
+        """
+        Per store state, shared with the Zilliz store which has its own constructor.
+        """
+        self._consistency_level = consistency_level
+        self._executor = BlockingExecutor(MILVUS_MAX_WORKERS, MILVUS_MAX_IN_FLIGHT)
+        # Rows inserted since the last flush, see MILVUS_FLUSH_ROWS
+        self._unflushed_rows = 0
+        # Servers before 2.3 only delete by primary key, cleared on the first rejected expression
+        self._delete_by_expr = True
+
+    async def close(self):
+        """Stop the executor, the connection stays pooled for other stores."""
+        self._executor.shutdown(wait=False)
+
     def _print_info(self, msg):
         # TODO: logger
         print(msg)
@@ -138,14 +214,13 @@ class MilvusDataStore(DataStore):
     def _create_connection(self):
         try:
             self.alias = ""
+            address = "{}:{}".format(MILVUS_HOST, MILVUS_PORT)
             # Check if the connection already exists
-            for x in connections.list_connections():
-                addr = connections.get_connection_addr(x[0])
-                if x[1] and ('address' in addr) and (addr['address'] == "{}:{}".format(MILVUS_HOST, MILVUS_PORT)):
-                    self.alias = x[0]
-                    self._print_info("Reuse connection to Milvus server '{}:{}' with alias '{:s}'"
-                                     .format(MILVUS_HOST, MILVUS_PORT, self.alias))
-                    break
+            alias = _CONNECTIONS.get(address)
+            if alias is not None and connections.has_connection(alias):
+                self.alias = alias
+                self._print_info("Reuse connection to Milvus server '{}:{}' with alias '{:s}'"
+                                 .format(MILVUS_HOST, MILVUS_PORT, self.alias))
 
             # Connect to the Milvus instance using the passed in Environment variables
             if len(self.alias) == 0:
@@ -158,6 +233,7 @@ class MilvusDataStore(DataStore):
                     password=MILVUS_PASSWORD,  # type: ignore
                     secure=MILVUS_USE_SECURITY,
                 )
+                _CONNECTIONS[address] = self.alias
                 self._print_info("Create connection to Milvus server '{}:{}' with alias '{:s}'"
                                  .format(MILVUS_HOST, MILVUS_PORT, self.alias))
         except Exception as e:
@@ -272,189 +348,354 @@ class MilvusDataStore(DataStore):
                 }
                 # Set the search params
                 self.search_params = default_search_params[self.index_params["index_type"]]
+                # Prefer the effort chosen by tune_search_params for this collection
+                tuned = load_tuning("milvus", self.col.name)
+                if tuned is not None and tuned.parameter in self.search_params["params"]:
+                    self.search_params = self._with_param(tuned.parameter, tuned.value)
             self._print_info("Milvus search parameters: {}".format(self.search_params))
         except Exception as e:
             self._print_err("Failed to create index, error: {}".format(e))
 
-    async def _upsert(self, chunks: Dict[str, List[DocumentChunk]]) -> List[str]:
-        """Upsert chunks into the datastore.
+    async def add(self, datas: VectorStoreBatch) -> List[str]:
+        """Insert rows or a VectorBatch, see upsert_batch."""
+        batch = datas if isinstance(datas, VectorBatch) else VectorBatch.from_datas(datas)
+        return await self.upsert_batch(batch)
 
-        Args:
-            chunks (Dict[str, List[DocumentChunk]]): A list of DocumentChunks to insert
+    async def _insert(self, columns: List[list]):
+        """Insert one batch of columns on the executor."""
+        self._print_info(f"Upserting batch of size {len(columns[0])}")
+        try:
+            await self._executor.run(self.col.insert, columns)
+        except Exception as e:
+            self._print_err(f"Failed to insert batch records, error: {e}")
+            raise e
+        self._print_info(f"Upserted batch successfully")
 
-        Raises:
-            e: Error in upserting data.
+    async def _flush_if_due(self, rows: int):
+        """Count inserted rows and flush once MILVUS_FLUSH_ROWS is reached.
 
-        Returns:
-            List[str]: The document_id's that were inserted.
+        Flushing after every small insert produces many tiny segments, so by
+        default sealing is left to the server.
         """
-        try:
-            # The doc id's to return for the upsert
-            doc_ids: List[str] = []
-            # List to collect all the insert data, skip the "pk" for schema V1
-            offset = 1 if self._schema_ver == "V1" else 0
-            insert_data = [[] for _ in range(len(self._get_schema()) - offset)]
-
-            # Go through each document chunklist and grab the data
-            for doc_id, chunk_list in chunks.items():
-                # Append the doc_id to the list we are returning
-                doc_ids.append(doc_id)
-                # Examine each chunk in the chunklist
-                for chunk in chunk_list:
-                    # Extract data from the chunk
-                    list_of_data = self._get_values(chunk)
-                    # Check if the data is valid
-                    if list_of_data is not None:
-                        # Append each field to the insert_data
-                        for x in range(len(insert_data)):
-                            insert_data[x].append(list_of_data[x])
-            # Slice up our insert data into batches
-            batches = [
-                insert_data[i : i + UPSERT_BATCH_SIZE]
-                for i in range(0, len(insert_data), UPSERT_BATCH_SIZE)
-            ]
-
-            # Attempt to insert each batch into our collection
-            # batch data can work with both V1 and V2 schema
-            for batch in batches:
-                if len(batch[0]) != 0:
-                    try:
-                        self._print_info(f"Upserting batch of size {len(batch[0])}")
-                        self.col.insert(batch)
-                        self._print_info(f"Upserted batch successfully")
-                    except Exception as e:
-                        self._print_err(f"Failed to insert batch records, error: {e}")
-                        raise e
-
-            # This setting perfoms flushes after insert. Small insert == bad to use
-            # self.col.flush()
-            return doc_ids
-        except Exception as e:
-            self._print_err("Failed to insert records, error: {}".format(e))
-            return []
+        self._unflushed_rows += rows
+        if MILVUS_FLUSH_ROWS and self._unflushed_rows >= MILVUS_FLUSH_ROWS:
+            await self.flush()
 
+    async def flush(self):
+        """Seal the growing segments so everything inserted so far is persisted and indexed."""
+        self._unflushed_rows = 0
+        await self._executor.run(self.col.flush)
 
-    def _get_values(self, chunk: DocumentChunk) -> List[any] | None:  # type: ignore
-        """Convert the chunk into a list of values to insert whose indexes align with fields.
+    def _get_columns(self, batch: VectorBatch) -> List[list]:
+        """Map a columnar batch onto the schema fields, in schema order.
 
         Args:
-            chunk (DocumentChunk): The chunk to convert.
+            batch (VectorBatch): Ids, embeddings and data columns named after the fields.
+
+        Missing values take the field default, a missing document_id the row's
+        id, and created_at is converted to a unix timestamp.
+
+        Raises:
+            ValueError: A required field has no column.
 
         Returns:
-            List (any): The values to insert.
+            List[list]: One column per field, excluding the auto pk for schema V1.
         """
-        # Convert DocumentChunk and its sub models to dict
-        values = chunk.dict()
-        # Unpack the metadata into the same dict
-        meta = values.pop("metadata")
-        values.update(meta)
-
-        # Convert date to int timestamp form
-        if values["created_at"]:
-            values["created_at"] = to_unix_timestamp(values["created_at"])
-
-        # If source exists, change from Source object to the string value it holds
-        if values["source"]:
-            values["source"] = values["source"].value
-        # List to collect data we will return
-        ret = []
-        # Grab data responding to each field, excluding the hidden auto pk field for schema V1
         offset = 1 if self._schema_ver == "V1" else 0
+        columns = []
         for key, _, default in self._get_schema()[offset:]:
-            # Grab the data at the key and default to our defaults set in init
-            x = values.get(key) or default
-            # If one of our required fields is missing, ignore the entire entry
-            if x is Required:
-                self._print_info("Chunk " + values["id"] + " missing " + key + " skipping")
-                return None
-            # Add the corresponding value if it passes the tests
-            ret.append(x)
-        return ret
-
-    async def _query(
+            if key == "id":
+                column = batch.ids
+            elif key == EMBEDDING_FIELD:
+                column = as_array(batch.embeddings).reshape(len(batch), -1)
+            else:
+                column = batch.columns.get(key)
+                if column is not None:
+                    if key == "document_id":
+                        # Records without a document are their own document for delete
+                        column = [id if value is None else value for id, value in zip(batch.ids, column)]
+                    elif key == "created_at":
+                        column = [default if value is None else to_unix_timestamp(value) for value in column]
+                    elif any(value is None for value in column):
+                        column = [default if value is None else value for value in column]
+                elif key == "document_id":
+                    column = batch.ids
+            if column is None:
+                if default is Required:
+                    raise ValueError(f"Batch has no column for required field {key}")
+                column = [default] * len(batch)
+            columns.append(column)
+        return columns
+
+    async def upsert_batch(self, batch: VectorBatch) -> List[str]:
+        """Insert a columnar batch, its columns are sliced straight into insert calls.
+
+        Args:
+            batch (VectorBatch): Ids, embeddings and data columns named after the fields.
+
+        Returns:
+            List[str]: The ids that were inserted.
+        """
+        with metrics.operation("milvus", "add", batch_size=len(batch)) as op:
+            with op.phase("serialize"):
+                columns = self._get_columns(batch)
+                row_nbytes = [_row_nbytes(row) for row in zip(*columns)]
+                bounds = [
+                    (rows[0], rows[-1] + 1)
+                    for rows in iter_batches(
+                        range(len(batch)), UPSERT_BATCH_SIZE, MILVUS_UPSERT_BATCH_BYTES, row_nbytes.__getitem__
+                    )
+                ]
+            if op:
+                op.bytes_sent = sum(row_nbytes)
+            with op.phase("network"):
+                await asyncio.gather(
+                    *(self._insert([column[start:end] for column in columns]) for start, end in bounds)
+                )
+            await self._flush_if_due(len(batch))
+        return list(batch.ids)
+
+    async def query(self, query: VectorStoreQuery) -> QueryResult:
+        return (await self.query_batch([query]))[0]
+
+    async def query_batch(
         self,
-        queries: List[QueryWithEmbedding],
+        queries: List[VectorStoreQuery],
     ) -> List[QueryResult]:
-        """Query the QueryWithEmbedding against the MilvusDocumentSearch
+        """Query the collection with many embeddings.
 
-        Search the embedding and its filter in the collection.
+        Queries that share an ids restriction, similarity_top_k and search
+        overrides (ef, nprobe, consistency_level) are sent as one multi-vector
+        search of up to MILVUS_SEARCH_BATCH_SIZE vectors, the groups themselves
+        run in parallel.
 
         Args:
-            queries (List[QueryWithEmbedding]): The list of searches to perform.
+            queries (List[VectorStoreQuery]): The list of searches to perform.
 
         Returns:
             List[QueryResult]: Results for each search.
         """
-        # Async to perform the query, adapted from pinecone implementation
-        async def _single_query(query: QueryWithEmbedding) -> QueryResult:
-            try:
-                filter = None
-                # Set the filter to expression that is valid for Milvus
-                if query.filter is not None:
-                    # Either a valid filter or None will be returned
-                    filter = self._get_filter(query.filter)
-
-                # Perform our search
-                return_from = 2 if self._schema_ver == "V1" else 1
-                res = self.col.search(
-                    data=[query.embedding],
-                    anns_field=EMBEDDING_FIELD,
-                    param=self.search_params,
-                    limit=query.top_k,
-                    expr=filter,
-                    output_fields=[
-                        field[0] for field in self._get_schema()[return_from:]
-                    ],  # Ignoring pk, embedding
-                )
-                # Results that will hold our DocumentChunkWithScores
-                results = []
-                # Parse every result for our search
-                for hit in res[0]:  # type: ignore
-                    # The distance score for the search result, falls under DocumentChunkWithScore
-                    score = hit.score
-                    # Our metadata info, falls under DocumentChunkMetadata
-                    metadata = {}
-                    # Grab the values that correspond to our fields, ignore pk and embedding.
-                    for x in [field[0] for field in self._get_schema()[return_from:]]:
-                        metadata[x] = hit.entity.get(x)
-                    # If the source isn't valid, convert to None
-                    if metadata["source"] not in Source.__members__:
-                        metadata["source"] = None
-                    # Text falls under the DocumentChunk
-                    text = metadata.pop("text")
-                    # Id falls under the DocumentChunk
-                    ids = metadata.pop("id")
-                    chunk = DocumentChunkWithScore(
-                        id=ids,
-                        score=score,
-                        text=text,
-                        metadata=DocumentChunkMetadata(**metadata),
-                    )
-                    results.append(chunk)
+        results: List[Optional[QueryResult]] = [None] * len(queries)
+
+        # Group the queries by (expression, top_k, overrides), remembering their positions
+        groups: Dict[Tuple[Optional[str], int, tuple], List[int]] = {}
+        for i, query in enumerate(queries):
+            if query.query_embedding is None:
+                raise ValueError("query_embedding is required for dense queries")
+            filter = _in_expr("id", query.ids) if query.ids is not None else None
+            groups.setdefault((filter, query.similarity_top_k, _overrides(query)), []).append(i)
+
+        batches = [
+            (positions[start : start + MILVUS_SEARCH_BATCH_SIZE], filter, top_k, overrides)
+            for (filter, top_k, overrides), positions in groups.items()
+            for start in range(0, len(positions), MILVUS_SEARCH_BATCH_SIZE)
+        ]
+        batch_results = await asyncio.gather(
+            *[
+                self._search_group([queries[i] for i in positions], filter, top_k, overrides)
+                for positions, filter, top_k, overrides in batches
+            ]
+        )
 
-                # TODO: decide on doing queries to grab the embedding itself, slows down performance as double query occurs
+        # Split the results back out in query order
+        for (positions, _, _, _), batch_result in zip(batches, batch_results):
+            for i, result in zip(positions, batch_result):
+                results[i] = result
+        return results
 
-                return QueryResult(query=query.query, results=results)
-            except Exception as e:
-                self._print_err("Failed to query, error: {}".format(e))
-                return QueryResult(query=query.query, results=[])
+    async def _search_group(
+        self,
+        queries: List[VectorStoreQuery],
+        filter: Optional[str],
+        top_k: int,
+        overrides: tuple = (None, None, None),
+    ) -> List[QueryResult]:
+        """Run queries sharing an expression, top_k and overrides as one search call.
 
-        results: List[QueryResult] = await asyncio.gather(
-            *[_single_query(query) for query in queries]
+        The tightest latency budget of the group is sent as the request
+        timeout, queries whose budget ran out get empty results flagged
+        partial. If the grouped call fails for another reason each query is
+        retried on its own, so a single bad query only empties its own result.
+        """
+        ef, nprobe, consistency_level = overrides
+        deadline = Deadline.earliest(queries)
+        return_from = 2 if self._schema_ver == "V1" else 1
+        output_fields = [field[0] for field in self._get_schema()[return_from:]]  # Ignoring pk, embedding
+        options = {}
+        if consistency_level is not None:
+            options["consistency_level"] = consistency_level
+        try:
+            if deadline.expired():
+                raise TimeoutError("Latency budget spent before the search was sent")
+            if not deadline.unlimited:
+                options["timeout"] = deadline.remaining()
+            with metrics.operation("milvus", "query_batch", batch_size=len(queries)) as op:
+                with op.phase("serialize"):
+                    data = as_matrix(query.query_embedding for query in queries)
+                op.bytes_sent = data.nbytes
+                # pymilvus is blocking, run the search on the executor, wait_for
+                # also bounds the time spent queued behind other calls
+                with op.phase("network"):
+                    res = await asyncio.wait_for(
+                        self._executor.run(
+                            self.col.search,
+                            data=data,
+                            anns_field=EMBEDDING_FIELD,
+                            param=self._search_params(top_k, ef, nprobe),
+                            limit=top_k,
+                            expr=filter,
+                            output_fields=output_fields,
+                            **options,
+                        ),
+                        deadline.remaining(),
+                    )
+                with op.phase("parse"):
+                    return [self._get_result(hits, output_fields) for hits in res]  # type: ignore
+        except Exception as e:
+            if len(queries) == 1 or deadline.expired():
+                self._print_err("Failed to query, error: {}".format(e))
+                # Incomplete either way, keep the empty results out of caches
+                return [mark_partial(QueryResult(data=[], similarities=[], ids=[])) for _ in queries]
+            self._print_err("Grouped search failed, retrying queries one by one, error: {}".format(e))
+        singles = await asyncio.gather(
+            *[self._search_group([query], filter, top_k, overrides) for query in queries]
         )
-        return results
+        return [result for single in singles for result in single]
+
+    def _with_param(self, name: str, value: int) -> dict:
+        """Copy of the search params with one index param replaced."""
+        return {**self.search_params, "params": {**self.search_params.get("params", {}), name: value}}
+
+    def _search_params(self, top_k: int, ef: Optional[int] = None, nprobe: Optional[int] = None) -> dict:
+        """The search params for top_k with per query overrides.
+
+        Overrides only replace params the index uses. HNSW returns at most ef
+        hits so ef is raised to top_k.
+        """
+        params = self.search_params
+        index_params = (params or {}).get("params", {})
+        if nprobe is not None and "nprobe" in index_params:
+            params = {**params, "params": {**params["params"], "nprobe": nprobe}}
+        if "ef" in index_params:
+            ef = max(ef if ef is not None else index_params["ef"], top_k)
+            if ef != index_params["ef"]:
+                params = {**params, "params": {**params["params"], "ef": ef}}
+        return params
+
+    def _iter_pages(self, pk_name: str, output_fields: List[str]):
+        """Page the entities of the whole collection in primary key order.
+
+        Clients without query_iterator query the keys after the last one seen,
+        a page at a time, the way the iterator does on the server.
+        """
+        if hasattr(self.col, "query_iterator"):
+            iterator = self.col.query_iterator(batch_size=MILVUS_TUNING_PAGE_SIZE, output_fields=output_fields)
+            try:
+                while page := iterator.next():
+                    yield page
+            finally:
+                iterator.close()
+            return
+
+        expr = f"{pk_name} >= 0" if self._schema_ver == "V1" else f'{pk_name} != ""'
+        while page := self.col.query(expr, output_fields=output_fields, limit=MILVUS_TUNING_PAGE_SIZE):
+            yield page
+            expr = f"{pk_name} > {json.dumps(max(entry[pk_name] for entry in page))}"
+
+    def _iter_vectors(self, pk_name: str):
+        """Page (pks, embeddings) through the whole collection."""
+        for page in self._iter_pages(pk_name, [pk_name, EMBEDDING_FIELD]):
+            yield [str(entry[pk_name]) for entry in page], np.asarray([entry[EMBEDDING_FIELD] for entry in page])
+
+    def _iter_pks(self, pk_name: str):
+        """Every primary key of the collection, paged without the embeddings."""
+        for page in self._iter_pages(pk_name, [pk_name]):
+            yield from (entry[pk_name] for entry in page)
+
+    async def tune_search_params(
+        self,
+        k: int = 10,
+        target_recall: float = VECTORDBS_TARGET_RECALL,
+        sample: int = 100,
+        values: Optional[Sequence[int]] = None,
+    ) -> Optional[TuningResult]:
+        """Pick the smallest ef or nprobe that reaches target_recall at top k.
+
+        sample stored vectors drawn at random serve as queries, their exact
+        neighbours are computed locally while paging through the collection.
+        The choice is applied to this store and saved for the collection, so
+        later stores opening it start with it.
+
+        Args:
+            k (int, optional): The top k recall is measured at. Defaults to 10.
+            target_recall (float, optional): The recall@k to reach. Defaults to VECTORDBS_TARGET_RECALL.
+            sample (int, optional): How many stored vectors to query with. Defaults to 100.
+            values (Optional[Sequence[int]], optional): Candidate values, derived from the index when None.
+
+        Returns:
+            Optional[TuningResult]: The sweep and the chosen value, None for indexes without a search effort.
+        """
+        index_type = self.index_params["index_type"]
+        if "HNSW" in index_type:
+            parameter = "ef"
+            values = values or ef_values(k)
+        elif index_type.startswith("IVF"):
+            parameter = "nprobe"
+            values = values or nprobe_values(int(self.index_params["params"]["nlist"]))
+        else:
+            self._print_info("Index {} has no search effort to tune".format(index_type))
+            return None
+
+        pk_name = "pk" if self._schema_ver == "V1" else "id"
+        distance = MILVUS_DISTANCES[self.search_params.get("metric_type", "IP")]
+        # Milvus has no random access, draw keys from all of them
+        pks = await self._executor.run(sample_ids, self._iter_pks(pk_name), sample)
+        # Keys are INT64 in schema V1 and VARCHAR after, json quotes only the strings
+        expr = "{} in [{}]".format(pk_name, ",".join(json.dumps(pk) for pk in pks))
+        rows = await self._executor.run(self.col.query, expr, output_fields=[EMBEDDING_FIELD])
+        queries = np.asarray([row[EMBEDDING_FIELD] for row in rows], dtype=np.float32)
+        truth = await self._executor.run(exact_neighbors, self._iter_vectors(pk_name), queries, k, distance)
+
+        async def search(value: int) -> List[List[str]]:
+            res = await self._executor.run(
+                self.col.search,
+                data=queries,
+                anns_field=EMBEDDING_FIELD,
+                param=self._with_param(parameter, value),
+                limit=k,
+            )
+            return [[str(hit.id) for hit in hits] for hits in res]
+
+        result = await atune(search, values, truth, parameter, self.col.name, target_recall)
+        self.search_params = self._with_param(parameter, result.value)
+        save_tuning("milvus", result)
+        self._print_info("Milvus search parameters tuned: {}, recall {:.3f}".format(self.search_params, result.recall))
+        return result
+
+    def _get_result(self, hits, output_fields: List[str]) -> QueryResult:
+        """Convert the hits of one search vector into a QueryResult."""
+        # L2 reports distances, flip them so higher is more similar
+        sign = -1 if self.search_params.get("metric_type") == "L2" else 1
+        ids, datas, similarities = [], [], []
+        for hit in hits:
+            data = {field: hit.entity.get(field) for field in output_fields}
+            ids.append(data.pop("id"))
+            datas.append(data)
+            similarities.append(sign * hit.score)
+        return QueryResult(data=datas, similarities=similarities, ids=ids)
 
     async def delete(
         self,
         ids: Optional[List[str]] = None,
-        filter: Optional[DocumentMetadataFilter] = None,
+        filter: Optional[Dict[str, Any]] = None,
         delete_all: Optional[bool] = None,
     ) -> bool:
-        """Delete the entities based either on the chunk_id of the vector,
+        """Delete the entities of documents, or the ones matching a filter.
 
         Args:
             ids (Optional[List[str]], optional): The document_ids to delete. Defaults to None.
-            filter (Optional[DocumentMetadataFilter], optional): The filter to delete by. Defaults to None.
+            filter (Optional[Dict[str, Any]], optional): Field -> value to delete by, start_date
+                and end_date bound created_at. Defaults to None.
             delete_all (Optional[bool], optional): Whether to drop the collection and recreate it. Defaults to None.
         """
         # If deleting all, drop and create the new collection
@@ -470,81 +711,144 @@ class MilvusDataStore(DataStore):
             self._create_index()
             return True
 
-        # Keep track of how many we have deleted for later printing
-        delete_count = 0
-        batch_size = 100
-        pk_name = "pk" if self._schema_ver == "V1" else "id"
-        try:
-            # According to the api design, the ids is a list of document_id,
-            # document_id is not primary key, use query+delete to workaround,
-            # in future version we can delete by expression
-            if (ids is not None) and len(ids) > 0:
-                # Add quotation marks around the string format id
-                ids = ['"' + str(id) + '"' for id in ids]
-                # Query for the pk's of entries that match id's
-                ids = self.col.query(f"document_id in [{','.join(ids)}]")
-                # Convert to list of pks
-                pks = [str(entry[pk_name]) for entry in ids]  # type: ignore
-                # for schema V2, the "id" is varchar, rewrite the expression
-                if self._schema_ver != "V1":
-                    pks = ['"' + pk + '"' for pk in pks]
-
-                # Delete by ids batch by batch(avoid too long expression)
-                self._print_info("Apply {:d} deletions to schema {:s}".format(len(pks), self._schema_ver))
-                while len(pks) > 0:
-                    batch_pks = pks[:batch_size]
-                    pks = pks[batch_size:]
-                    # Delete the entries batch by batch
-                    res = self.col.delete(f"{pk_name} in [{','.join(batch_pks)}]")
-                    # Increment our deleted count
-                    delete_count += int(res.delete_count)  # type: ignore
-        except Exception as e:
-            self._print_err("Failed to delete by ids, error: {}".format(e))
+        with metrics.operation("milvus", "delete") as op:
+            # Keep track of how many we have deleted for later printing
+            delete_count = 0
+            try:
+                # ids are document_ids, not primary keys, delete by expression in chunks to keep it short
+                if (ids is not None) and len(ids) > 0:
+                    for start in range(0, len(ids), MILVUS_DELETE_BATCH_SIZE):
+                        chunk = ids[start : start + MILVUS_DELETE_BATCH_SIZE]
+                        delete_count += await self._delete_matching(_in_expr("document_id", chunk), op)
+                        op.batch_size = delete_count
+            except Exception as e:
+                op.error = e
+                self._print_err("Failed to delete by ids, error: {}".format(e))
 
-        try:
-            # Check if empty filter
-            if filter is not None:
-                # Convert filter to milvus expression
-                filter = self._get_filter(filter)  # type: ignore
-                # Check if there is anything to filter
-                if len(filter) != 0:  # type: ignore
-                    # Query for the pk's of entries that match filter
-                    res = self.col.query(filter)  # type: ignore
-                    # Convert to list of pks
-                    pks = [str(entry[pk_name]) for entry in res]  # type: ignore
-                    # for schema V2, the "id" is varchar, rewrite the expression
-                    if self._schema_ver != "V1":
-                        pks = ['"' + pk + '"' for pk in pks]
-                    # Check to see if there are valid pk's to delete, delete batch by batch(avoid too long expression)
-                    while len(pks) > 0:  # type: ignore
-                        batch_pks = pks[:batch_size]
-                        pks = pks[batch_size:]
-                        # Delete the entries batch by batch
-                        res = self.col.delete(f"{pk_name} in [{','.join(batch_pks)}]")  # type: ignore
-                        # Increment our delete count
-                        delete_count += int(res.delete_count)  # type: ignore
-        except Exception as e:
-            self._print_err("Failed to delete by filter, error: {}".format(e))
+            try:
+                # Check if empty filter
+                if filter is not None:
+                    # Convert filter to milvus expression
+                    filter = self._get_filter(filter)  # type: ignore
+                    # Check if there is anything to filter
+                    if len(filter) != 0:  # type: ignore
+                        delete_count += await self._delete_matching(filter, op)  # type: ignore
+                        op.batch_size = delete_count
+            except Exception as e:
+                op.error = e
+                self._print_err("Failed to delete by filter, error: {}".format(e))
 
-        self._print_info("{:d} records deleted".format(delete_count))
+            self._print_info("{:d} records deleted".format(delete_count))
 
         # This setting performs flushes after delete. Small delete == bad to use
         # self.col.flush()
 
         return True
 
-    def _get_filter(self, filter: DocumentMetadataFilter) -> Optional[str]:
-        """Converts a DocumentMetdataFilter to the expression that Milvus takes.
+    async def _delete_matching(self, expr: str, op) -> int:
+        """Delete every entity matching a boolean expression.
+
+        Milvus 2.3 and later delete by any expression in one call. Older
+        servers only accept primary keys, once one rejects an expression as
+        unsupported the keys are paged with _delete_pages instead.
+
+        Args:
+            expr (str): The Milvus boolean expression.
+            op: The metrics operation the calls are timed under.
+
+        Returns:
+            int: The number of entities deleted.
+        """
+        if self._delete_by_expr:
+            try:
+                with op.phase("network"):
+                    res = await self._executor.run(self.col.delete, expr)
+                return int(res.delete_count)
+            except MilvusException as e:
+                # Anything else, a timeout or a bad field name, is not about the server version
+                if not UNSUPPORTED_DELETE_EXPR.search(str(e)):
+                    raise
+                self._print_info("Delete by expression rejected, deleting by primary key: {}".format(e))
+                self._delete_by_expr = False
+        return await self._delete_pages(expr, op)
+
+    async def _delete_pages(self, expr: str, op) -> int:
+        """Page the primary keys matching expr and delete them page by page.
+
+        A query iterator walks the keys in order, so up to
+        MILVUS_DELETE_CONCURRENCY pages are deleted while the next is read and
+        only those pages are held in memory. Clients without query_iterator
+        re-query the first page after each delete instead, one page at a time.
+
+        Args:
+            expr (str): The Milvus boolean expression.
+            op: The metrics operation the calls are timed under.
+
+        Raises:
+            RuntimeError: A page of keys was not deleted, re-querying would not end.
+
+        Returns:
+            int: The number of entities deleted.
+        """
+        pk_name = "pk" if self._schema_ver == "V1" else "id"
+        iterator = None
+        if hasattr(self.col, "query_iterator"):
+            iterator = await self._executor.run(
+                self.col.query_iterator, batch_size=MILVUS_DELETE_BATCH_SIZE, expr=expr, output_fields=[pk_name]
+            )
+        concurrency = MILVUS_DELETE_CONCURRENCY if iterator is not None else 1
+        delete_count = 0
+        pending = set()
+        try:
+            while True:
+                with op.phase("network"):
+                    if iterator is not None:
+                        page = await self._executor.run(iterator.next)
+                    else:
+                        page = await self._executor.run(
+                            self.col.query,
+                            expr,
+                            output_fields=[pk_name],
+                            limit=MILVUS_DELETE_BATCH_SIZE,
+                            consistency_level="Strong",
+                        )
+                if not page:
+                    break
+                pks = [str(entry[pk_name]) for entry in page]
+                # for schema V2, the "id" is varchar, quote the keys
+                if self._schema_ver != "V1":
+                    pks = ['"' + pk + '"' for pk in pks]
+                pending.add(asyncio.ensure_future(self._executor.run(self.col.delete, f"{pk_name} in [{','.join(pks)}]")))
+                if len(pending) >= concurrency:
+                    with op.phase("network"):
+                        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    deleted = sum(int(task.result().delete_count) for task in done)
+                    if iterator is None and deleted == 0:
+                        raise RuntimeError(f"Deleting {len(pks)} entities matching {expr} made no progress")
+                    delete_count += deleted
+            if pending:
+                with op.phase("network"):
+                    done, pending = await asyncio.wait(pending)
+                delete_count += sum(int(task.result().delete_count) for task in done)
+        finally:
+            for task in pending:
+                task.cancel()
+            if iterator is not None:
+                iterator.close()
+        return delete_count
+
+    def _get_filter(self, filter: Dict[str, Any]) -> Optional[str]:
+        """Converts a field -> value filter to the expression that Milvus takes.
 
         Args:
-            filter (DocumentMetadataFilter): The Filter to convert to Milvus expression.
+            filter (Dict[str, Any]): The Filter to convert to Milvus expression.
 
         Returns:
             Optional[str]: The filter if valid, otherwise None.
         """
         filters = []
         # Go through all the fields and their values
-        for field, value in filter.dict().items():
+        for field, value in filter.items():
             # Check if the Value is empty
             if value is not None:
                 # Convert start_date to int and add greater than or equal logic
@@ -557,11 +861,8 @@ class MilvusDataStore(DataStore):
                     filters.append(
                         "(created_at <= " + str(to_unix_timestamp(value)) + ")"
                     )
-                # Convert Source to its string value and check equivalency
-                elif field == "source":
-                    filters.append("(" + field + ' == "' + str(value.value) + '")')
                 # Check equivalency of rest of string fields
                 else:
-                    filters.append("(" + field + ' == "' + str(value) + '")')
+                    filters.append("(" + field + " == " + json.dumps(str(value)) + ")")
         # Join all our expressions with `and``
         return " and ".join(filters)
@@ -0,0 +1,298 @@
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseSettings, Field
+
+from vectordbs.deadline import Deadline
+from vectordbs.distances import DISTANCES, normalize, score_matrix, score_vectors, top_k
+from vectordbs.providers.memory_datastore import check_query, dedupe_batch, unpack_batch
+from vectordbs.types import ColumnarQueryResult, QueryResult, VectorStore, VectorStoreBatch, VectorStoreQuery
+
+# File layout inside the store directory
+SEGMENT_FILE = "segment-{:05d}.f32"
+METADATA_FILE = "metadata.jsonl"
+OFFSETS_FILE = "offsets.i64"
+TOMBSTONES_FILE = "tombstones.bitmap"
+# Every metadata line starts with the id, see _append
+_ID_PREFIX = b'{"id": '
+_ID_DECODER = json.JSONDecoder()
+
+
+class MmapOptions(BaseSettings):
+    path: str = Field("vectordbs_data", env="MMAP_PATH")
+    dimension: int = Field(1536, env="MMAP_DIMENSION")
+    distance: str = Field("Cosine", env="MMAP_DISTANCE")
+    # Rows per segment file, a 1536-d segment of 65536 rows is 384 MB
+    segment_size: int = Field(65536, env="MMAP_SEGMENT_SIZE")
+
+
+def _read_id(line: bytes) -> str:
+    """The id of a metadata line, decoded without parsing the data after it."""
+    if line.startswith(_ID_PREFIX):
+        return _ID_DECODER.raw_decode(line.decode(), len(_ID_PREFIX))[0]
+    return json.loads(line)["id"]
+
+
+class MmapDataStore(VectorStore):
+    """
+    Append-only on disk store searched through memory mapped segment files.
+
+    Vectors are appended as raw float32 rows to fixed size segment files, the
+    id and data of each row are appended to a JSON lines sidecar whose byte
+    offsets are kept in a fixed-width offsets file, and deletes flip a bit in
+    a tombstone bitmap. Opening a store stats the offsets file and reads the
+    bitmap, which is then kept in memory. Segments are mapped on first query
+    and paged in by the OS.
+    """
+
+    # Appends to the segment files must not interleave
+    stream_concurrency = 1
+
+    def __init__(self, options: Optional[MmapOptions] = None):
+        options = options or MmapOptions()
+        if options.distance not in DISTANCES:
+            raise ValueError(f"Unsupported distance: {options.distance}")
+
+        self.path = options.path
+        self.dimension = options.dimension
+        self.distance = options.distance
+        self.segment_size = options.segment_size
+        os.makedirs(self.path, exist_ok=True)
+
+        # The offsets file is written last on append, so it defines the row count
+        offsets = self._file(OFFSETS_FILE)
+        self._size = os.path.getsize(offsets) // 8 if os.path.exists(offsets) else 0
+        self._segments: Dict[int, np.memmap] = {}
+        # Built on first use, maps live ids to their row
+        self._rows: Optional[Dict[str, int]] = None
+        # Deleted flag per row, grown by doubling, mirrors the bitmap file
+        self._deleted = self._read_tombstones()
+        self._deleted_count = int(self._deleted.sum())
+
+    def __len__(self) -> int:
+        return self._size - self._deleted_count
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    ### Storage helpers ###
+
+    def _segment(self, segment: int) -> np.memmap:
+        rows = min(self.segment_size, self._size - segment * self.segment_size)
+        mapped = self._segments.get(segment)
+        if mapped is None or len(mapped) != rows:
+            mapped = np.memmap(
+                self._file(SEGMENT_FILE.format(segment)),
+                dtype=np.float32,
+                mode="r",
+                shape=(rows, self.dimension),
+            )
+            self._segments[segment] = mapped
+        return mapped
+
+    def _tombstones(self) -> np.ndarray:
+        return self._deleted[: self._size]
+
+    def _read_tombstones(self) -> np.ndarray:
+        path = self._file(TOMBSTONES_FILE)
+        if self._size == 0 or not os.path.exists(path):
+            return np.zeros(self._size, dtype=bool)
+        bitmap = np.fromfile(path, dtype=np.uint8)
+        deleted = np.unpackbits(bitmap, bitorder="little")[: self._size].astype(bool)
+        if len(deleted) < self._size:
+            deleted = np.concatenate([deleted, np.zeros(self._size - len(deleted), dtype=bool)])
+        return deleted
+
+    def _set_tombstones(self, rows: List[int]):
+        if len(rows) == 0:
+            return
+        path = self._file(TOMBSTONES_FILE)
+        needed = (self._size + 7) // 8
+        with open(path, "ab") as f:
+            missing = needed - f.tell()
+            if missing > 0:
+                f.write(bytes(missing))
+        bitmap = np.memmap(path, dtype=np.uint8, mode="r+")
+        for row in rows:
+            bitmap[row // 8] |= 1 << (row % 8)
+        bitmap.flush()
+        del bitmap
+        self._deleted[rows] = True
+        self._deleted_count += len(rows)
+
+    def _read_metadata(self, rows: List[int]) -> List[dict]:
+        offsets = np.memmap(self._file(OFFSETS_FILE), dtype=np.int64, mode="r")
+        records = []
+        with open(self._file(METADATA_FILE), "rb") as f:
+            for row in rows:
+                f.seek(int(offsets[row]))
+                records.append(json.loads(f.readline()))
+        return records
+
+    def _load_rows(self) -> Dict[str, int]:
+        if self._rows is None:
+            self._rows = {}
+            if self._size > 0:
+                deleted = self._tombstones()
+                with open(self._file(METADATA_FILE), "rb") as f:
+                    for row, line in zip(range(self._size), f):
+                        if not deleted[row]:
+                            self._rows[_read_id(line)] = row
+        return self._rows
+
+    def _append(self, ids: List[str], payloads: List[dict], embeddings: np.ndarray):
+        # The ids must be unique and not live, add deletes them first
+        row = self._size
+        start = 0
+        while start < len(embeddings):
+            segment, offset = divmod(row, self.segment_size)
+            count = min(self.segment_size - offset, len(embeddings) - start)
+            with open(self._file(SEGMENT_FILE.format(segment)), "ab") as f:
+                f.write(embeddings[start : start + count].tobytes())
+            row += count
+            start += count
+
+        offsets = np.zeros(len(ids), dtype=np.int64)
+        with open(self._file(METADATA_FILE), "ab") as f:
+            for i, (id, payload) in enumerate(zip(ids, payloads)):
+                offsets[i] = f.tell()
+                f.write(json.dumps({"id": id, "data": payload}).encode() + b"\n")
+        with open(self._file(OFFSETS_FILE), "ab") as f:
+            f.write(offsets.tobytes())
+
+        rows = self._load_rows()
+        for i, id in enumerate(ids):
+            rows[id] = self._size + i
+        if self._size + len(ids) > len(self._deleted):
+            deleted = np.zeros(max(self._size + len(ids), 2 * len(self._deleted)), dtype=bool)
+            deleted[: self._size] = self._tombstones()
+            self._deleted = deleted
+        self._size += len(ids)
+
+    ### VectorStore interface ###
+
+    def add(self, datas: VectorStoreBatch) -> List[str]:
+        """
+        Append the given vectors, re-adding an id tombstones its previous row.
+        An id repeated in the batch keeps its last vector.
+        """
+        if len(datas) == 0:
+            return []
+
+        ids, embeddings, payloads = unpack_batch(datas, self.dimension)
+        if self.distance == "Cosine":
+            embeddings = normalize(embeddings)
+
+        unique_ids, unique_embeddings, unique_payloads = dedupe_batch(ids, embeddings, payloads)
+        self.delete(unique_ids)
+        self._append(unique_ids, unique_payloads, unique_embeddings)
+        return ids
+
+    def delete(self, ids: List[str]) -> None:
+        """
+        Tombstone vectors by id, unknown ids are ignored.
+        """
+        rows = self._load_rows()
+        self._set_tombstones([rows.pop(id) for id in ids if id in rows])
+
+    def query(self, query: VectorStoreQuery) -> QueryResult:
+        """
+        Exact top k search, scanning one memory mapped segment at a time. When
+        the latency budget runs out the remaining segments are skipped.
+        """
+        return self.query_columnar(query).to_result()
+
+    def query_columnar(self, query: VectorStoreQuery) -> ColumnarQueryResult:
+        deadline = Deadline.of(query)
+        embedding = check_query(query, self.dimension)
+        if self.distance == "Cosine":
+            embedding = normalize(embedding)
+
+        live = ~self._tombstones()
+        if query.ids is not None:
+            rows = self._load_rows()
+            allowed = np.zeros(self._size, dtype=bool)
+            allowed[[rows[id] for id in query.ids if id in rows]] = True
+            live &= allowed
+
+        candidate_rows, candidate_scores = [], []
+        partial = False
+        for segment in range((self._size + self.segment_size - 1) // self.segment_size):
+            if segment and deadline.expired():
+                partial = True
+                break
+            start = segment * self.segment_size
+            scores = score_vectors(self._segment(segment), embedding, self.distance)
+            mask = live[start : start + len(scores)]
+            rows = np.flatnonzero(mask)
+            scores = scores[rows]
+            best = top_k(scores, query.similarity_top_k)
+            candidate_rows.append(rows[best] + start)
+            candidate_scores.append(scores[best])
+
+        if not candidate_rows:
+            return ColumnarQueryResult.empty()
+        rows = np.concatenate(candidate_rows)
+        scores = np.concatenate(candidate_scores)
+        best = top_k(scores, query.similarity_top_k)
+        records = self._read_metadata(rows[best].tolist())
+
+        return ColumnarQueryResult(
+            data=[record["data"] for record in records],
+            similarities=scores[best],
+            ids=[record["id"] for record in records],
+            partial=partial,
+        )
+
+    def query_batch(self, queries: List[VectorStoreQuery]) -> List[QueryResult]:
+        """
+        Answer all unrestricted queries in a single pass over the segments, the
+        pass stops at the tightest latency budget of the batch.
+        """
+        results: List[Optional[QueryResult]] = [None] * len(queries)
+        batch = [i for i, query in enumerate(queries) if query.ids is None]
+        for i, query in enumerate(queries):
+            if query.ids is not None:
+                results[i] = self.query(query)
+        if not batch:
+            return results
+
+        embeddings = np.stack([check_query(queries[i], self.dimension) for i in batch])
+        if self.distance == "Cosine":
+            embeddings = normalize(embeddings)
+
+        deadline = Deadline.earliest([queries[i] for i in batch])
+        live = ~self._tombstones()
+        candidate_rows = [[] for _ in batch]
+        candidate_scores = [[] for _ in batch]
+        partial = False
+        for segment in range((self._size + self.segment_size - 1) // self.segment_size):
+            if segment and deadline.expired():
+                partial = True
+                break
+            start = segment * self.segment_size
+            vectors = self._segment(segment)
+            rows = np.flatnonzero(live[start : start + len(vectors)])
+            scores = score_matrix(vectors, embeddings, self.distance)[:, rows]
+            for j, i in enumerate(batch):
+                best = top_k(scores[j], queries[i].similarity_top_k)
+                candidate_rows[j].append(rows[best] + start)
+                candidate_scores[j].append(scores[j][best])
+
+        for j, i in enumerate(batch):
+            if not candidate_rows[j]:
+                results[i] = QueryResult(data=[], similarities=[], ids=[], partial=partial)
+                continue
+            rows = np.concatenate(candidate_rows[j])
+            scores = np.concatenate(candidate_scores[j])
+            best = top_k(scores, queries[i].similarity_top_k)
+            records = self._read_metadata(rows[best].tolist())
+            results[i] = QueryResult(
+                data=[record["data"] for record in records],
+                similarities=scores[best].tolist(),
+                ids=[record["id"] for record in records],
+                partial=partial,
+            )
+        return results
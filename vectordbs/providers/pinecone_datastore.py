@@ -1,125 +1,149 @@
 import os
-from typing import Any, Dict, List, Optional
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
 import pinecone
 import asyncio
 from pydantic import BaseSettings, Field
 
-from vectordbs.types import VectorStore, VectorStoreData, VectorStoreQuery, VectorStoreQueryResult
+from vectordbs import metrics
+from vectordbs.deadline import Deadline, mark_partial
+from vectordbs.embeddings import as_list
+from vectordbs.executor import BlockingExecutor
+from vectordbs.types import AsyncVectorStore, QueryResult, VectorBatch, VectorStoreBatch, VectorStoreQuery
 
 # Set the batch size for upserting vectors to Pinecone
 UPSERT_BATCH_SIZE = 100
 
+# pinecone.init configures a process wide client, only call it once per credentials
+_INITIALIZED: Set[Tuple[str, str]] = set()
+_INIT_LOCK = threading.Lock()
+
 class PineconeOptions(BaseSettings):
     api_key: str = Field(..., env="PINECONE_API_KEY")
     environment: str = Field(..., env="PINECONE_ENVIRONMENT")
     index: str = Field(..., env="PINECONE_INDEX")
-
-class PineconeDataStore(VectorStore):
-    def __init__(self, options: PineconeOptions):
-        
-        # Initialize Pinecone with the API key and environment
-        # NOTE: Do we need a singleton to make sure we only init once?
-        pinecone.init(api_key=options.api_key, environment=options.environment)
+    # Blocking client calls run on a thread pool, bounded per store
+    max_workers: int = Field(8, env="PINECONE_MAX_WORKERS")
+    max_in_flight: int = Field(8, env="PINECONE_MAX_IN_FLIGHT")
+    # Size of the HTTP connection pool shared by the index client
+    pool_threads: int = Field(8, env="PINECONE_POOL_THREADS")
+
+class PineconeDataStore(AsyncVectorStore):
+    def __init__(self, options: Optional[PineconeOptions] = None):
+        options = options or PineconeOptions()
+
+        # Initialize Pinecone with the API key and environment, once per process
+        with _INIT_LOCK:
+            if (options.api_key, options.environment) not in _INITIALIZED:
+                pinecone.init(api_key=options.api_key, environment=options.environment)
+                _INITIALIZED.add((options.api_key, options.environment))
 
         # Will raise if index doesn't exist
-        self.index = pinecone.Index(options.index)        
+        self.index = pinecone.Index(options.index, pool_threads=options.pool_threads)
+        self._executor = BlockingExecutor(options.max_workers, options.max_in_flight)
+
+    async def close(self) -> None:
+        self._executor.shutdown(wait=False)
 
-    async def _upsert(self, datas: List[VectorStoreData]) -> List[str]:
+    async def add(self, datas: VectorStoreBatch) -> List[str]:
         """
-        Takes in a dict from document id to list of document chunks and inserts them into the index.
-        Return a list of document ids.
+        Takes in rows or a VectorBatch and upserts them into the index, the data as metadata.
+        Return a list of ids.
         """
         # Initialize a list of ids to return
         doc_ids: List[str] = []
         # Initialize a list of vectors to upsert
         vectors = []
-        # Loop through the dict items
-        for data in datas:
-            # Append the id to the ids list
-            doc_ids.append(data.id)
-            vector = (chunk.id, chunk.embedding, chunk.metadata)
-            vectors.append(vector)                
-
-        # Split the vectors list into batches of the specified size
-        batches = [
-            vectors[i : i + UPSERT_BATCH_SIZE]
-            for i in range(0, len(vectors), UPSERT_BATCH_SIZE)
-        ]
-        # Upsert each batch to Pinecone
-        for batch in batches:
-            try:
-                print(f"Upserting batch of size {len(batch)}")
-                self.index.upsert(vectors=batch)
-                print(f"Upserted batch successfully")
-            except Exception as e:
-                print(f"Error upserting batch: {e}")
-                raise e
+        with metrics.operation("pinecone", "add", batch_size=len(datas)) as op:
+            with op.phase("serialize"):
+                if isinstance(datas, VectorBatch):
+                    # One tolist over the whole matrix instead of one per row
+                    doc_ids = list(datas.ids)
+                    vectors = list(zip(doc_ids, datas.embeddings.tolist(), datas.datas()))
+                else:
+                    # Loop through the dict items
+                    for data in datas:
+                        # Append the id to the ids list
+                        doc_ids.append(data.id)
+                        vector = (data.id, as_list(data.embedding), data.data)
+                        vectors.append(vector)
+
+                # Split the vectors list into batches of the specified size
+                batches = [
+                    vectors[i : i + UPSERT_BATCH_SIZE]
+                    for i in range(0, len(vectors), UPSERT_BATCH_SIZE)
+                ]
+            # Upsert each batch to Pinecone
+            for batch in batches:
+                if op:
+                    op.bytes_sent += sum(4 * len(vector[1]) for vector in batch)
+                try:
+                    print(f"Upserting batch of size {len(batch)}")
+                    with op.phase("network"):
+                        await self._executor.run(self.index.upsert, vectors=batch)
+                    print(f"Upserted batch successfully")
+                except Exception as e:
+                    print(f"Error upserting batch: {e}")
+                    raise e
 
         return doc_ids
 
-    async def _query(
+    async def query(self, query: VectorStoreQuery) -> QueryResult:
+        return (await self.query_batch([query]))[0]
+
+    async def query_batch(
         self,
         queries: List[VectorStoreQuery],
-    ) -> List[VectorStoreQueryResult()]:
+    ) -> List[QueryResult]:
         """
-        Takes in a list of queries with embeddings and filters and returns a list of query results with matching document chunks and scores.
+        Send the queries as concurrent requests, one per query, up to the executor's in-flight limit.
+        Pinecone has no search effort to override, a query's latency budget bounds the wait for its reply.
         """
 
         # Define a helper coroutine that performs a single query and returns a QueryResult
-        async def _single_query(query: VectorStoreQuery) -> VectorStoreQueryResult():
-            #print(f"Query: {query.query}")
-
-            # Convert the metadata filter object to a dict with pinecone filter expressions
-            pinecone_filter = self._get_pinecone_filter(query.filter)
-
-            try:
-                # Query the index with the query embedding, filter, and top_k
-                query_response = self.index.query(
-                    # namespace=namespace,
-                    top_k=query.top_k,
-                    vector=query.embedding,
-                    filter=pinecone_filter,
-                    include_metadata=True,
-                )
-            except Exception as e:
-                print(f"Error querying index: {e}")
-                raise e
-
-            query_results: List[DocumentChunkWithScore] = []
-            for result in query_response.matches:
-                score = result.score
-                metadata = result.metadata
-                # Remove document id and text from metadata and store it in a new variable
-                metadata_without_text = (
-                    {key: value for key, value in metadata.items() if key != "text"}
-                    if metadata
-                    else None
-                )
-
-                # If the source is not a valid Source in the Source enum, set it to None
-                if (
-                    metadata_without_text
-                    and "source" in metadata_without_text
-                    and metadata_without_text["source"] not in Source.__members__
-                ):
-                    metadata_without_text["source"] = None
-
-                # Create a document chunk with score object with the result data
-                result = DocumentChunkWithScore(
-                    id=result.id,
-                    score=score,
-                    text=metadata["text"] if metadata and "text" in metadata else None,
-                    metadata=metadata_without_text,
-                )
-                query_results.append(result)
-            return QueryResult(query=query.query, results=query_results)
+        async def _single_query(query: VectorStoreQuery) -> QueryResult:
+            deadline = Deadline.of(query)
+
+            with metrics.operation("pinecone", "query", batch_size=1) as op:
+                with op.phase("serialize"):
+                    if query.query_embedding is None:
+                        raise ValueError("query_embedding is required for dense queries")
+                    if query.ids is not None:
+                        raise ValueError("Pinecone queries cannot be restricted to ids")
+                    # The REST client only takes lists, convert once here
+                    vector = as_list(query.query_embedding)
+                if op:
+                    op.bytes_sent = 4 * len(vector)
+
+                try:
+                    # Query the index with the query embedding and top_k
+                    with op.phase("network"):
+                        query_response = await asyncio.wait_for(
+                            self._executor.run(
+                                self.index.query,
+                                top_k=query.similarity_top_k,
+                                vector=vector,
+                                include_metadata=True,
+                            ),
+                            deadline.remaining(),
+                        )
+                except asyncio.TimeoutError as e:
+                    op.error = e
+                    print(f"Query ran out of its latency budget")
+                    return mark_partial(QueryResult(data=[], similarities=[], ids=[]))
+                except Exception as e:
+                    print(f"Error querying index: {e}")
+                    raise e
+
+                with op.phase("parse"):
+                    return QueryResult(
+                        data=[dict(match.metadata or {}) for match in query_response.matches],
+                        similarities=[match.score for match in query_response.matches],
+                        ids=[match.id for match in query_response.matches],
+                    )
 
         # Use asyncio.gather to run multiple _single_query coroutines concurrently and collect their results
-        results: List[QueryResult] = await asyncio.gather(
-            *[_single_query(query) for query in queries]
-        )
-
-        return results
+        return list(await asyncio.gather(*[_single_query(query) for query in queries]))
 
     async def delete(
         self, ids: List[str]) -> bool:
@@ -128,7 +152,8 @@ class PineconeDataStore(VectorStore):
         """
         try:
             print(f"Deleting vectors with ids {ids}")
-            self.index.delete(ids=ids)  # type: ignore
+            with metrics.operation("pinecone", "delete", batch_size=len(ids)) as op, op.phase("network"):
+                await self._executor.run(self.index.delete, ids=ids)  # type: ignore
             print(f"Deleted vectors with ids successfully")
         except Exception as e:
             print(f"Error deleting vectors with ids: {e}")
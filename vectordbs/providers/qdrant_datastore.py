@@ -1,146 +1,323 @@
-import os
+import asyncio
+import math
+import threading
 import uuid
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
 
 from grpc._channel import _InactiveRpcError
 from qdrant_client.http.exceptions import UnexpectedResponse
 from qdrant_client.http.models import PayloadSchemaType
 
-from vectordbs.datastore import DataStore
+from vectordbs import metrics
+from vectordbs.dates import to_unix_timestamp
+from vectordbs.deadline import Deadline, mark_partial
+from vectordbs.embeddings import as_list
+from vectordbs.executor import BlockingExecutor
+from vectordbs.tuning import (
+    VECTORDBS_TARGET_RECALL,
+    TuningResult,
+    atune,
+    ef_values,
+    exact_neighbors,
+    load_tuning,
+    sample_ids,
+    save_tuning,
+)
 from vectordbs.types import (
-    DocumentChunk,
-    DocumentMetadataFilter,
+    AsyncVectorStore,
     QueryResult,
-    QueryWithEmbedding,
-    DocumentChunkWithScore,
+    VectorBatch,
+    VectorStoreBatch,
+    VectorStoreQuery,
 )
 from qdrant_client.http import models as rest
 
 import qdrant_client
 
 from pydantic import BaseSettings, Field
-from services.date import to_unix_timestamp
+
+# Read consistency for the consistency_level of a query, in Milvus terms. Other
+# values, a replica count or "quorum", are passed to Qdrant as they are
+QDRANT_READ_CONSISTENCY = {
+    "Strong": rest.ReadConsistencyType.ALL,
+    "Session": rest.ReadConsistencyType.MAJORITY,
+    "Bounded": rest.ReadConsistencyType.MAJORITY,
+    "Eventually": 1,
+}
 
 
 class QdrantOptions(BaseSettings):
-    url: str = Field(..., env="QDRANT_URL", default="http://localhost")
-    port: int = Field(..., env="QDRANT_PORT", default=6333)
-    grpc_port: int = Field(..., env="QDRANT_GRPC_PORT", default=6334)
-    collection: str = Field(..., env="QDRANT_COLLECTION", default="document_chunks")
-    api_key: str = Field(..., env="QDRANT_API_KEY")
-    vector_size: int = Field(1536)
-    distance: str = Field("Cosine")
-    
-class QdrantDataStore(DataStore):
+    url: str = Field("http://localhost", env="QDRANT_URL")
+    port: int = Field(6333, env="QDRANT_PORT")
+    grpc_port: int = Field(6334, env="QDRANT_GRPC_PORT")
+    collection: str = Field("document_chunks", env="QDRANT_COLLECTION")
+    api_key: Optional[str] = Field(None, env="QDRANT_API_KEY")
+    vector_size: int = Field(1536, env="QDRANT_VECTOR_SIZE")
+    distance: str = Field("Cosine", env="QDRANT_DISTANCE")
+    # Blocking client calls run on a thread pool, bounded per store
+    max_workers: int = Field(8, env="QDRANT_MAX_WORKERS")
+    max_in_flight: int = Field(8, env="QDRANT_MAX_IN_FLIGHT")
+
+
+# Clients per server, the gRPC channel is thread safe and expensive to open
+_CLIENTS: Dict[Tuple[str, int, int, Optional[str]], qdrant_client.QdrantClient] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def _get_client(options: QdrantOptions) -> qdrant_client.QdrantClient:
+    key = (options.url, options.port, options.grpc_port, options.api_key)
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = qdrant_client.QdrantClient(
+                url=options.url,
+                port=options.port,
+                grpc_port=options.grpc_port,
+                api_key=options.api_key,
+                prefer_grpc=True,
+                timeout=10,
+            )
+            _CLIENTS[key] = client
+        return client
+
+
+class QdrantDataStore(AsyncVectorStore):
+    """
+    Qdrant collection of points whose payload is the data dict plus the
+    caller's id, the point id is a uuid5 of that id.
+    """
+
     UUID_NAMESPACE = uuid.UUID("3896d314-1e95-4a3a-b45a-945f9f0b541d")
 
     def __init__(
         self,
-        options: QdrantOptions,
+        options: Optional[QdrantOptions] = None,
         recreate_collection: bool = False
     ):
         """
         Args:
-            collection_name: Name of the collection to be used
-            vector_size: Size of the embedding stored in a collection
-            distance:
-                Any of "Cosine" / "Euclid" / "Dot". Distance function to measure
-                similarity
+            options: Connection, collection name, vector size and distance,
+                any of "Cosine" / "Euclid" / "Dot"
+            recreate_collection: Drop and create the collection even if it exists
         """
-        self.client = qdrant_client.QdrantClient(
-            url=options.url,
-            port=options.port,
-            grpc_port=options.grpc_port,
-            api_key=options.api_key,
-            prefer_grpc=True,
-            timeout=10,
-        )
+        options = options or QdrantOptions()
+        self.client = _get_client(options)
         self.collection_name = options.collection
+        self.distance = rest.Distance[options.distance.upper()]
+        self._executor = BlockingExecutor(options.max_workers, options.max_in_flight)
+        # hnsw_ef chosen by tune_search_params, the server default otherwise
+        tuned = load_tuning("qdrant", self.collection_name)
+        self.search_params = rest.SearchParams(hnsw_ef=tuned.value) if tuned is not None else None
 
         # Set up the collection so the points might be inserted or queried
-        self._set_up_collection(vector_size, distance, recreate_collection)
+        self._set_up_collection(options.vector_size, self.distance, recreate_collection)
+
+    async def close(self):
+        """Stop the executor, the client stays pooled for other stores."""
+        self._executor.shutdown(wait=False)
 
-    async def upsert(self, chunks: Dict[str, List[DocumentChunk]]) -> List[str]:
+    async def add(self, datas: VectorStoreBatch) -> List[str]:
+        batch = datas if isinstance(datas, VectorBatch) else VectorBatch.from_datas(datas)
+        return await self.upsert_batch(batch)
+
+    async def upsert_batch(self, batch: VectorBatch) -> List[str]:
         """
-        Takes in a list of document chunks and inserts them into the database.
-        Return a list of document ids.
+        Insert a columnar batch as a single Qdrant Batch, no per row point objects.
+        Return the batch ids.
         """
-        points = [
-            self._convert_document_chunk_to_point(chunk)
-            for _, chunks in chunks.items()
-            for chunk in chunks
-        ]
-        self.client.upsert(
-            collection_name=self.collection_name,
-            points=points,  # type: ignore
-            wait=True,
+        with metrics.operation("qdrant", "add", batch_size=len(batch)) as op:
+            with op.phase("serialize"):
+                payloads = batch.datas()
+                for id, payload in zip(batch.ids, payloads):
+                    payload["id"] = id
+                    # Records without a document are their own document for delete
+                    payload.setdefault("document_id", id)
+                    # Indexed as an integer for the date range filters
+                    if "created_at" in payload:
+                        payload["created_at"] = to_unix_timestamp(payload["created_at"])
+                points = rest.Batch(
+                    ids=[self._create_document_chunk_id(id) for id in batch.ids],
+                    vectors=batch.embeddings.tolist(),
+                    payloads=payloads,
+                )
+            if op:
+                op.bytes_sent = 4 * batch.embeddings.size
+            with op.phase("network"):
+                await self._executor.run(
+                    self.client.upsert,
+                    collection_name=self.collection_name,
+                    points=points,
+                    wait=True,
+                )
+        return list(batch.ids)
+
+    async def query(self, query: VectorStoreQuery) -> QueryResult:
+        return (await self.query_batch([query]))[0]
+
+    async def query_batch(self, queries: List[VectorStoreQuery]) -> List[QueryResult]:
+        """
+        Queries are sent as one search_batch per consistency level.
+        """
+        groups: Dict[Optional[str], List[int]] = {}
+        for i, query in enumerate(queries):
+            groups.setdefault(query.consistency_level, []).append(i)
+
+        results: List[Optional[QueryResult]] = [None] * len(queries)
+        group_results = await asyncio.gather(
+            *[
+                self._search_group([queries[i] for i in positions], consistency_level)
+                for consistency_level, positions in groups.items()
+            ]
         )
-        return list(chunks.keys())
+        for positions, group_result in zip(groups.values(), group_results):
+            for i, result in zip(positions, group_result):
+                results[i] = result
+        return results
 
-    async def query(
-        self,
-        queries: List[QueryWithEmbedding],
+    async def _search_group(
+        self, queries: List[VectorStoreQuery], consistency_level: Optional[str]
     ) -> List[QueryResult]:
         """
-        Takes in a list of queries with embeddings and filters and returns a list of query results with matching document chunks and scores.
+        One search_batch call. The tightest latency budget of the queries is
+        sent as the request timeout, rounded up to whole seconds, and bounds the
+        wait on the executor. When it runs out the queries get empty results
+        flagged partial.
+        """
+        deadline = Deadline.earliest(queries)
+        options = {} if deadline.unlimited else {"timeout": max(math.ceil(deadline.remaining()), 1)}
+        if consistency_level is not None:
+            options["consistency"] = QDRANT_READ_CONSISTENCY.get(consistency_level, consistency_level)
+        with metrics.operation("qdrant", "query_batch", batch_size=len(queries)) as op:
+            with op.phase("serialize"):
+                search_requests = [
+                    self._convert_query_to_search_request(query) for query in queries
+                ]
+            if op:
+                op.bytes_sent = sum(4 * len(request.vector) for request in search_requests)
+            try:
+                with op.phase("network"):
+                    results = await asyncio.wait_for(
+                        self._executor.run(
+                            self.client.search_batch,
+                            collection_name=self.collection_name,
+                            requests=search_requests,
+                            **options,
+                        ),
+                        deadline.remaining(),
+                    )
+            except Exception as e:
+                # The timeout surfaces as a transport specific error, REST or gRPC
+                if not deadline.expired():
+                    raise
+                op.error = e
+                return [mark_partial(QueryResult(data=[], similarities=[], ids=[])) for _ in queries]
+            with op.phase("parse"):
+                return [self._convert_scored_points_to_result(points) for points in results]
+
+    def _search_params(self, query: VectorStoreQuery) -> Optional[rest.SearchParams]:
+        """A per query ef overrides the tuned hnsw_ef."""
+        return rest.SearchParams(hnsw_ef=query.ef) if query.ef is not None else self.search_params
+
+    def _iter_vectors(self, page_size: int = 1000):
+        """Page (ids, vectors) through the whole collection with scroll."""
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                limit=page_size,
+                offset=offset,
+                with_payload=False,
+                with_vectors=True,
+            )
+            if points:
+                yield [str(point.id) for point in points], np.asarray([point.vector for point in points])
+            if offset is None:
+                return
+
+    def _iter_ids(self, page_size: int = 1000):
+        """Every point id of the collection, scrolled without payloads or vectors."""
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                limit=page_size,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False,
+            )
+            yield from (point.id for point in points)
+            if offset is None:
+                return
+
+    async def tune_search_params(
+        self,
+        k: int = 10,
+        target_recall: float = VECTORDBS_TARGET_RECALL,
+        sample: int = 100,
+        values: Optional[Sequence[int]] = None,
+    ) -> TuningResult:
+        """
+        Pick the smallest hnsw_ef that reaches target_recall at top k, measured
+        with sample stored vectors drawn at random as queries against exact
+        neighbours computed locally. The choice is applied to this store and
+        saved for the collection.
         """
-        search_requests = [
-            self._convert_query_to_search_request(query) for query in queries
-        ]
-        results = self.client.search_batch(
+        info = await self._executor.run(self.client.get_collection, self.collection_name)
+        distance = info.config.params.vectors.distance.value  # type: ignore
+        # The first scroll page is in id order, not a sample, draw ids from all of them
+        ids = await self._executor.run(sample_ids, self._iter_ids(), sample)
+        points = await self._executor.run(
+            self.client.retrieve,
             collection_name=self.collection_name,
-            requests=search_requests,
+            ids=ids,
+            with_payload=False,
+            with_vectors=True,
         )
-        return [
-            QueryResult(
-                query=query.query,
-                results=[
-                    self._convert_scored_point_to_document_chunk_with_score(point)
-                    for point in result
+        queries = np.asarray([point.vector for point in points], dtype=np.float32)
+        # Scrolls the whole collection, one blocking call on the executor
+        truth = await self._executor.run(exact_neighbors, self._iter_vectors(), queries, k, distance)
+
+        async def search(value: int) -> List[List[str]]:
+            params = rest.SearchParams(hnsw_ef=value)
+            results = await self._executor.run(
+                self.client.search_batch,
+                collection_name=self.collection_name,
+                requests=[
+                    rest.SearchRequest(vector=query.tolist(), limit=k, params=params, with_payload=False)
+                    for query in queries
                 ],
             )
-            for query, result in zip(queries, results)
-        ]
-
-async def delete(
-    self,
-    ids: Optional[List[str]] = None,
-    filter: Optional[DocumentMetadataFilter] = None,
-) -> bool:
-    """
-    Removes vectors by ids, filter, or everything in the datastore.
-    Returns whether the operation was successful.
-    """
-    if ids is None and filter is None:
-        raise ValueError("Please provide one of the parameters: ids or filter.")
+            return [[str(point.id) for point in result] for result in results]
 
-    points_selector = self._convert_metadata_filter_to_qdrant_filter(filter, ids)
+        result = await atune(search, values or ef_values(k), truth, "hnsw_ef", self.collection_name, target_recall)
+        self.search_params = rest.SearchParams(hnsw_ef=result.value)
+        save_tuning("qdrant", result)
+        return result
 
-    response = self.client.delete(
-        collection_name=self.collection_name,
-        points_selector=points_selector,  # type: ignore
-    )
-    return "COMPLETED" == response.status
+    async def delete(
+        self,
+        ids: Optional[List[str]] = None,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """
+        Removes the vectors of the document ids, or the ones whose payload
+        matches every field -> value of filter, start_date and end_date
+        bounding created_at. Returns whether the operation was successful.
+        """
+        if ids is None and filter is None:
+            raise ValueError("Please provide one of the parameters: ids or filter.")
 
+        points_selector = self._convert_filter_to_qdrant_filter(filter, document_ids=ids)
 
-    def _convert_document_chunk_to_point(
-        self, document_chunk: DocumentChunk
-    ) -> rest.PointStruct:
-        created_at = (
-            to_unix_timestamp(document_chunk.metadata.created_at)
-            if document_chunk.metadata.created_at is not None
-            else None
-        )
-        return rest.PointStruct(
-            id=self._create_document_chunk_id(document_chunk.id),
-            vector=document_chunk.embedding,  # type: ignore
-            payload={
-                "id": document_chunk.id,
-                "text": document_chunk.text,
-                "metadata": document_chunk.metadata.dict(),
-                "created_at": created_at,
-            },
-        )
+        with metrics.operation("qdrant", "delete", batch_size=len(ids or [])) as op, op.phase("network"):
+            response = await self._executor.run(
+                self.client.delete,
+                collection_name=self.collection_name,
+                points_selector=points_selector,  # type: ignore
+            )
+        return response.status == rest.UpdateStatus.COMPLETED
 
     def _create_document_chunk_id(self, external_id: Optional[str]) -> str:
         if external_id is None:
@@ -148,141 +325,123 @@ async def delete(
         return uuid.uuid5(self.UUID_NAMESPACE, external_id).hex
 
     def _convert_query_to_search_request(
-        self, query: QueryWithEmbedding
+        self, query: VectorStoreQuery
     ) -> rest.SearchRequest:
+        if query.query_embedding is None:
+            raise ValueError("query_embedding is required for dense queries")
         return rest.SearchRequest(
-            vector=query.embedding,
-            filter=self._convert_metadata_filter_to_qdrant_filter(query.filter),
-            limit=query.top_k,  # type: ignore
+            vector=as_list(query.query_embedding),
+            filter=self._convert_filter_to_qdrant_filter(ids=query.ids),
+            limit=query.similarity_top_k,
+            params=self._search_params(query),
             with_payload=True,
             with_vector=False,
         )
 
-    def _convert_metadata_filter_to_qdrant_filter(
+    def _convert_filter_to_qdrant_filter(
         self,
-        metadata_filter: Optional[DocumentMetadataFilter] = None,
+        filter: Optional[Dict[str, Any]] = None,
         ids: Optional[List[str]] = None,
+        document_ids: Optional[List[str]] = None,
     ) -> Optional[rest.Filter]:
-        if metadata_filter is None and ids is None:
+        if filter is None and ids is None and document_ids is None:
             return None
 
-        must_conditions, should_conditions = [], []
+        must_conditions = []
+
+        # Restrict to the points of the given ids
+        if ids is not None:
+            must_conditions.append(
+                rest.HasIdCondition(has_id=[self._create_document_chunk_id(id) for id in ids])
+            )
 
         # Filtering by document ids
-        if ids and len(ids) > 0:
-            for document_id in ids:
-                should_conditions.append(
-                    rest.FieldCondition(
-                        key="metadata.document_id",
-                        match=rest.MatchValue(value=document_id),
-                    )
-                )
+        if document_ids is not None:
+            must_conditions.append(
+                rest.FieldCondition(key="document_id", match=rest.MatchAny(any=document_ids))
+            )
 
         # Equality filters for the payload attributes
-        if metadata_filter:
-            meta_attributes_keys = {
-                "document_id": "metadata.document_id",
-                "source": "metadata.source",
-                "source_id": "metadata.source_id",
-                "author": "metadata.author",
-            }
-
-            for meta_attr_name, payload_key in meta_attributes_keys.items():
-                attr_value = getattr(metadata_filter, meta_attr_name)
-                if attr_value is None:
-                    continue
-
-                must_conditions.append(
-                    rest.FieldCondition(
-                        key=payload_key, match=rest.MatchValue(value=attr_value)
-                    )
-                )
+        filter = dict(filter or {})
+        start_date = filter.pop("start_date", None)
+        end_date = filter.pop("end_date", None)
+        for key, value in filter.items():
+            must_conditions.append(
+                rest.FieldCondition(key=key, match=rest.MatchValue(value=value))
+            )
 
-            # Date filters use range filtering
-            start_date = metadata_filter.start_date
-            end_date = metadata_filter.end_date
-            if start_date or end_date:
-                gte_filter = (
-                    to_unix_timestamp(start_date) if start_date is not None else None
-                )
-                lte_filter = (
-                    to_unix_timestamp(end_date) if end_date is not None else None
-                )
-                must_conditions.append(
-                    rest.FieldCondition(
-                        key="created_at",
-                        range=rest.Range(
-                            gte=gte_filter,
-                            lte=lte_filter,
-                        ),
+        # Date filters use range filtering
+        if start_date is not None or end_date is not None:
+            must_conditions.append(
+                rest.FieldCondition(
+                    key="created_at",
+                    range=rest.Range(
+                        gte=to_unix_timestamp(start_date) if start_date is not None else None,
+                        lte=to_unix_timestamp(end_date) if end_date is not None else None,
+                    ),
                 )
             )
-        if 0 == len(must_conditions) and 0 == len(should_conditions):
+        if 0 == len(must_conditions):
             return None
-        return rest.Filter(must=must_conditions, should=should_conditions)
-
-def _convert_scored_point_to_document_chunk_with_score(
-    self, scored_point: rest.ScoredPoint
-) -> DocumentChunkWithScore:
-    payload = scored_point.payload or {}
-    return DocumentChunkWithScore(
-        id=payload.get("id"),
-        text=scored_point.payload.get("text"),  # type: ignore
-        metadata=scored_point.payload.get("metadata"),  # type: ignore
-        embedding=scored_point.vector,  # type: ignore
-        score=scored_point.score,
-    )
-
-def _set_up_collection(
-    self, vector_size: int, distance: str, recreate_collection: bool
-):
-    distance = rest.Distance[distance.upper()]
-
-    if recreate_collection:
-        self._recreate_collection(distance, vector_size)
-
-    try:
-        collection_info = self.client.get_collection(self.collection_name)
-        current_distance = collection_info.config.params.vectors.distance  # type: ignore
-        current_vector_size = collection_info.config.params.vectors.size  # type: ignore
-
-        if current_distance != distance:
-            raise ValueError(
-                f"Collection '{self.collection_name}' already exists in Qdrant, "
-                f"but it is configured with a similarity '{current_distance.name}'. "
-                f"If you want to use that collection, but with a different "
-                f"similarity, please set `recreate_collection=True` argument."
-            )
+        return rest.Filter(must=must_conditions)
+
+    def _convert_scored_points_to_result(self, scored_points: List[rest.ScoredPoint]) -> QueryResult:
+        ids, datas, similarities = [], [], []
+        for scored_point in scored_points:
+            payload = dict(scored_point.payload or {})
+            ids.append(payload.pop("id", str(scored_point.id)))
+            datas.append(payload)
+            # Euclid scores are distances, flip them so higher is more similar
+            similarities.append(-scored_point.score if self.distance == rest.Distance.EUCLID else scored_point.score)
+        return QueryResult(data=datas, similarities=similarities, ids=ids)
+
+    def _set_up_collection(
+        self, vector_size: int, distance: rest.Distance, recreate_collection: bool
+    ):
+        if recreate_collection:
+            self._recreate_collection(distance, vector_size)
+
+        try:
+            collection_info = self.client.get_collection(self.collection_name)
+            current_distance = collection_info.config.params.vectors.distance  # type: ignore
+            current_vector_size = collection_info.config.params.vectors.size  # type: ignore
+
+            if current_distance != distance:
+                raise ValueError(
+                    f"Collection '{self.collection_name}' already exists in Qdrant, "
+                    f"but it is configured with a similarity '{current_distance.name}'. "
+                    f"If you want to use that collection, but with a different "
+                    f"similarity, please set `recreate_collection=True` argument."
+                )
 
-        if current_vector_size != vector_size:
-            raise ValueError(
-                f"Collection '{self.collection_name}' already exists in Qdrant, "
-                f"but it is configured with a vector size '{current_vector_size}'. "
-                f"If you want to use that collection, but with a different "
-                f"vector size, please set `recreate_collection=True` argument."
-            )
-    except (UnexpectedResponse, _InactiveRpcError):
-        self._recreate_collection(distance, vector_size)
-
-def _recreate_collection(self, distance: rest.Distance, vector_size: int):
-    self.client.recreate_collection(
-        self.collection_name,
-        vectors_config=rest.VectorParams(
-            size=vector_size,
-            distance=distance,
-        ),
-    )
-
-    # Create the payload index for the document_id metadata attribute, as it is
-    # used to delete the document related entries
-    self.client.create_payload_index(
-        self.collection_name,
-        field_name="metadata.document_id",
-        field_type=PayloadSchemaType.KEYWORD,
-    )
-    self.client.create_payload_index(
-        self.collection_name,
-        field_name="created_at",
-        field_schema=PayloadSchemaType.INTEGER,
-    )
+            if current_vector_size != vector_size:
+                raise ValueError(
+                    f"Collection '{self.collection_name}' already exists in Qdrant, "
+                    f"but it is configured with a vector size '{current_vector_size}'. "
+                    f"If you want to use that collection, but with a different "
+                    f"vector size, please set `recreate_collection=True` argument."
+                )
+        except (UnexpectedResponse, _InactiveRpcError):
+            self._recreate_collection(distance, vector_size)
+
+    def _recreate_collection(self, distance: rest.Distance, vector_size: int):
+        self.client.recreate_collection(
+            self.collection_name,
+            vectors_config=rest.VectorParams(
+                size=vector_size,
+                distance=distance,
+            ),
+        )
 
+        # Create the payload index for the document_id attribute, as it is
+        # used to delete the document related entries
+        self.client.create_payload_index(
+            self.collection_name,
+            field_name="document_id",
+            field_schema=PayloadSchemaType.KEYWORD,
+        )
+        self.client.create_payload_index(
+            self.collection_name,
+            field_name="created_at",
+            field_schema=PayloadSchemaType.INTEGER,
+        )
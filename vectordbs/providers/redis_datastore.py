@@ -7,6 +7,7 @@ import redis.asyncio as redis
 import numpy as np
 
 from redis.commands.search.query import Query as RediSearchQuery
+from redis.commands.search.result import Result as RediSearchResult
 from redis.commands.search.indexDefinition import IndexDefinition, IndexType
 from redis.commands.search.field import (
     TagField,
@@ -14,27 +15,46 @@ from redis.commands.search.field import (
     NumericField,
     VectorField,
 )
-from typing import Dict, List, Optional
-from datastore.datastore import DataStore
-from models.models import (
-    DocumentChunk,
-    DocumentMetadataFilter,
-    DocumentChunkWithScore,
-    DocumentMetadataFilter,
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from vectordbs import metrics
+from vectordbs.dates import to_unix_timestamp
+from vectordbs.deadline import Deadline, mark_partial
+from vectordbs.embeddings import as_bytes, as_list, from_bytes
+from vectordbs.tuning import VECTORDBS_TARGET_RECALL, ExactNeighbors, TuningResult, atune, ef_values, load_tuning, save_tuning
+from vectordbs.types import (
+    AsyncVectorStore,
     QueryResult,
-    QueryWithEmbedding,
+    VectorBatch,
+    VectorStoreBatch,
+    VectorStoreData,
+    VectorStoreQuery,
 )
-from services.date import to_unix_timestamp
 
 # Read environment variables for Redis
 REDIS_HOST = os.environ.get("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.environ.get("REDIS_PORT", 6379))
 REDIS_PASSWORD = os.environ.get("REDIS_PASSWORD")
+REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", 32))
+# Searches in flight at once while tuning, keep it below REDIS_MAX_CONNECTIONS
+REDIS_QUERY_CONCURRENCY = int(os.environ.get("REDIS_QUERY_CONCURRENCY", 8))
+# Keys found per search page and unlinked per UNLINK command when deleting
+REDIS_DELETE_BATCH_SIZE = int(os.environ.get("REDIS_DELETE_BATCH_SIZE", 1000))
+# Document ids or-ed into one tag filter when deleting by id
+REDIS_DELETE_IDS_PER_QUERY = 100
 REDIS_INDEX_NAME = os.environ.get("REDIS_INDEX_NAME", "index")
 REDIS_DOC_PREFIX = os.environ.get("REDIS_DOC_PREFIX", "doc")
 REDIS_DISTANCE_METRIC = os.environ.get("REDIS_DISTANCE_METRIC", "COSINE")
 REDIS_INDEX_TYPE = os.environ.get("REDIS_INDEX_TYPE", "FLAT")
 assert REDIS_INDEX_TYPE in ("FLAT", "HNSW")
+# JSON documents, or HASH keys holding the vector as a packed binary blob
+REDIS_STORAGE_TYPE = os.environ.get("REDIS_STORAGE_TYPE", "JSON").upper()
+assert REDIS_STORAGE_TYPE in ("JSON", "HASH")
+# Element type of indexed vectors, FLOAT16 needs RediSearch >= 2.10
+REDIS_VECTOR_TYPE = os.environ.get(
+    "REDIS_VECTOR_TYPE", "FLOAT64" if REDIS_STORAGE_TYPE == "JSON" else "FLOAT32"
+).upper()
+VECTOR_DTYPES = {"FLOAT16": np.float16, "FLOAT32": np.float32, "FLOAT64": np.float64}
+assert REDIS_VECTOR_TYPE in VECTOR_DTYPES
 
 # OpenAI Ada Embeddings Dimension
 VECTOR_DIMENSION = 1536
@@ -45,25 +65,44 @@ REDIS_REQUIRED_MODULES = [
     {"name": "ReJSON", "ver": 20404}
 ]
 REDIS_DEFAULT_ESCAPED_CHARS = re.compile(r"[,.<>{}\[\]\\\"\':;!@#$%^&*()\-+=~\/ ]")
-REDIS_SEARCH_SCHEMA = {
-    "document_id": TagField("$.document_id", as_name="document_id"),
-    "metadata": {
-        # "source_id": TagField("$.metadata.source_id", as_name="source_id"),
-        "source": TagField("$.metadata.source", as_name="source"),
-        # "author": TextField("$.metadata.author", as_name="author"),
-        # "created_at": NumericField("$.metadata.created_at", as_name="created_at"),
-    },
-    "embedding": VectorField(
-        "$.embedding",
-        REDIS_INDEX_TYPE,
-        {
-            "TYPE": "FLOAT64",
-            "DIM": VECTOR_DIMENSION,
-            "DISTANCE_METRIC": REDIS_DISTANCE_METRIC,
+# Chunk metadata, flattened into top level fields of a HASH
+REDIS_METADATA_FIELDS = ("document_id", "source", "source_id", "url", "created_at", "author")
+# Properties read from the attributes of FT.INFO
+REDIS_ATTRIBUTE_PROPERTIES = ("identifier", "attribute", "type", "data_type", "distance_metric")
+# Characters with a meaning in SCAN MATCH patterns
+REDIS_GLOB_CHARS = re.compile(r"([*?\[\]\\])")
+# Similarity used for the exact neighbours when tuning EF_RUNTIME
+REDIS_DISTANCES = {"COSINE": "Cosine", "IP": "Dot", "L2": "Euclid"}
+
+
+def search_schema(storage_type: str, vector_type: str, distance_metric: str = REDIS_DISTANCE_METRIC) -> dict:
+    """
+    RediSearch fields for the given storage layout. JSON fields are JSONPaths
+    into the chunk document, HASH fields are the flattened field names.
+    """
+    is_json = storage_type == "JSON"
+    return {
+        "document_id": TagField("$.metadata.document_id" if is_json else "document_id", as_name="document_id"),
+        "metadata": {
+            # "source_id": TagField("$.metadata.source_id", as_name="source_id"),
+            "source": TagField("$.metadata.source" if is_json else "source", as_name="source"),
+            # "author": TextField("$.metadata.author", as_name="author"),
+            # "created_at": NumericField("$.metadata.created_at", as_name="created_at"),
         },
-        as_name="embedding",
-    ),
-}
+        "embedding": VectorField(
+            "$.embedding" if is_json else "embedding",
+            REDIS_INDEX_TYPE,
+            {
+                "TYPE": vector_type,
+                "DIM": VECTOR_DIMENSION,
+                "DISTANCE_METRIC": distance_metric,
+            },
+            as_name="embedding",
+        ),
+    }
+
+
+REDIS_SEARCH_SCHEMA = search_schema(REDIS_STORAGE_TYPE, REDIS_VECTOR_TYPE)
 
 # Helper functions
 def unpack_schema(d: dict):
@@ -73,6 +112,79 @@ def unpack_schema(d: dict):
         else:
             yield v
 
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+def index_attributes(info: dict) -> Dict[str, dict]:
+    """
+    The attributes of FT.INFO by name, each as a dict of its lower cased
+    properties (identifier, type, data_type, ...). Flags without a value are
+    left out.
+    """
+    attributes = {}
+    for attribute in info.get("attributes", []):
+        values = [_decode(value) for value in attribute]
+        properties = {}
+        for i, key in enumerate(values[:-1]):
+            if isinstance(key, str) and key.lower() in REDIS_ATTRIBUTE_PROPERTIES:
+                properties[key.lower()] = values[i + 1]
+        if "attribute" in properties:
+            attributes[properties["attribute"]] = properties
+    return attributes
+
+def index_layout(info: dict) -> Tuple[str, str, str]:
+    """
+    Storage type, vector type and distance metric of an existing index from
+    its FT.INFO. Servers that do not report the vector's data type fall back
+    on the "-json-float32" suffix migrate() gives index names, then on
+    REDIS_VECTOR_TYPE.
+    """
+    definition = info.get("index_definition", [])
+    options = dict(zip(map(_decode, definition[::2]), definition[1::2]))
+    storage_type = _decode(options.get("key_type", "JSON")).upper()
+    embedding = index_attributes(info).get("embedding", {})
+    vector_type = embedding.get("data_type")
+    if vector_type is None:
+        suffix = _decode(info.get("index_name", "")).rsplit("-", 1)[-1].upper()
+        vector_type = suffix if suffix in VECTOR_DTYPES else REDIS_VECTOR_TYPE
+    distance_metric = embedding.get("distance_metric", REDIS_DISTANCE_METRIC)
+    return storage_type, vector_type.upper(), distance_metric.upper()
+
+def to_hash(document: dict, vector_type: str) -> dict:
+    """
+    Flatten a chunk document into HASH fields, the embedding packed as vector_type.
+    None values are left out, HSET cannot store them.
+    """
+    fields = {
+        "chunk_id": document.get("chunk_id"),
+        "text": document.get("text"),
+        **document.get("metadata", {}),
+        "embedding": as_bytes(document["embedding"], VECTOR_DTYPES[vector_type]),
+    }
+    return {field: value for field, value in fields.items() if value is not None}
+
+def from_hash(fields: dict, vector_type: str) -> dict:
+    """
+    Rebuild the chunk document from HGETALL output, inverse of to_hash.
+    """
+    fields = {_decode(key): value for key, value in fields.items()}
+    embedding = from_bytes(fields.pop("embedding"), VECTOR_DTYPES[vector_type])
+    metadata = {key: _decode(value) for key, value in fields.items()}
+    values = {field: metadata.pop(field) for field in ("chunk_id", "text") if field in metadata}
+    if "created_at" in metadata:
+        metadata["created_at"] = int(metadata["created_at"])
+    return {**values, "metadata": metadata, "embedding": embedding}
+
+async def _create_index(
+    client: redis.Redis, name: str, storage_type: str, vector_type: str, distance_metric: str = REDIS_DISTANCE_METRIC
+):
+    definition = IndexDefinition(
+        prefix=[REDIS_DOC_PREFIX],
+        index_type=IndexType.JSON if storage_type == "JSON" else IndexType.HASH,
+    )
+    fields = list(unpack_schema(search_schema(storage_type, vector_type, distance_metric)))
+    await client.ft(name).create_index(fields=fields, definition=definition)
+
 async def _check_redis_module_exist(client: redis.Redis, modules: List[dict]):
 
     installed_modules = (await client.info()).get("modules", [])
@@ -86,9 +198,31 @@ async def _check_redis_module_exist(client: redis.Redis, modules: List[dict]):
 
 
 
-class RedisDataStore(DataStore):
-    def __init__(self, client: redis.Redis):
+class RedisDataStore(AsyncVectorStore):
+    """
+    Chunk documents under REDIS_DOC_PREFIX searched through a RediSearch index.
+
+    The data of a row is stored as the chunk's text and metadata, queries
+    return the text and the metadata fields the chunk schema knows about.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        storage_type: str = REDIS_STORAGE_TYPE,
+        vector_type: str = REDIS_VECTOR_TYPE,
+        distance_metric: str = REDIS_DISTANCE_METRIC,
+    ):
         self.client = client
+        self.storage_type = storage_type
+        self.vector_type = vector_type
+        self.distance_metric = distance_metric
+        # False for indexes built before document_id moved into the metadata,
+        # their document_id tag matches nothing and deletes scan the keys instead
+        self.document_id_indexed = True
+        # HNSW beam width chosen by tune_search_params, the index default otherwise
+        tuned = load_tuning("redis", REDIS_INDEX_NAME) if REDIS_INDEX_TYPE == "HNSW" else None
+        self.ef_runtime: Optional[int] = tuned.value if tuned is not None else None
         # Init default metadata with sentinel values in case the document written has no metadata
         self._default_metadata = {
             field: "_null_" for field in REDIS_SEARCH_SCHEMA["metadata"]
@@ -96,16 +230,27 @@ class RedisDataStore(DataStore):
 
     ### Redis Helper Methods ###
 
+    async def close(self):
+        """
+        Release the connection pool.
+        """
+        await self.client.close()
+
     @classmethod
     async def init(cls):
         """
-        Setup the index if it does not exist.
+        Setup the index if it does not exist. An existing index keeps the
+        storage type, vector type and distance metric it was created with,
+        the REDIS_* settings only apply to a new one.
         """
         try:
             # Connect to the Redis Client
             logging.info("Connecting to Redis")
             client = redis.Redis(
-                host=REDIS_HOST, port=REDIS_PORT, password=REDIS_PASSWORD
+                host=REDIS_HOST,
+                port=REDIS_PORT,
+                password=REDIS_PASSWORD,
+                max_connections=REDIS_MAX_CONNECTIONS,
             )
         except Exception as e:
             logging.error(f"Error setting up Redis: {e}")
@@ -115,19 +260,24 @@ class RedisDataStore(DataStore):
 
         try:
             # Check for existence of RediSearch Index
-            await client.ft(REDIS_INDEX_NAME).info()
+            info = await client.ft(REDIS_INDEX_NAME).info()
             logging.info(f"RediSearch index {REDIS_INDEX_NAME} already exists")
         except:
             # Create the RediSearch Index
             logging.info(f"Creating new RediSearch index {REDIS_INDEX_NAME}")
-            definition = IndexDefinition(
-                prefix=[REDIS_DOC_PREFIX], index_type=IndexType.JSON
+            await _create_index(client, REDIS_INDEX_NAME, REDIS_STORAGE_TYPE, REDIS_VECTOR_TYPE)
+            return cls(client)
+
+        store = cls(client, *index_layout(info))
+        document_id = index_attributes(info).get("document_id", {}).get("identifier")
+        expected = search_schema(store.storage_type, store.vector_type)["document_id"].name
+        if document_id != expected:
+            logging.warning(
+                f"RediSearch index {REDIS_INDEX_NAME} has document_id at {document_id}, not {expected}, "
+                f"deletes by id scan the keys of each document, run migrate() to rebuild the index"
             )
-            fields = list(unpack_schema(REDIS_SEARCH_SCHEMA))
-            await client.ft(REDIS_INDEX_NAME).create_index(
-                fields=fields, definition=definition
-            )
-        return cls(client)
+            store.document_id_indexed = False
+        return store
 
     @staticmethod
     def _redis_key(document_id: str, chunk_id: str) -> str:
@@ -161,43 +311,43 @@ class RedisDataStore(DataStore):
 
         return REDIS_DEFAULT_ESCAPED_CHARS.sub(escape_symbol, value)
 
-    def _get_redis_chunk(self, chunk: DocumentChunk) -> dict:
+    def _get_redis_chunk(self, data: VectorStoreData) -> dict:
         """
-        Convert DocumentChunk into a JSON object for storage
-        in Redis.
+        Convert a row into a JSON object for storage in Redis, its text at the
+        top and every other data field in the metadata.
 
         Args:
-            chunk (DocumentChunk): Chunk of a Document.
+            data (VectorStoreData): Row to store.
 
         Returns:
             dict: JSON object for storage in Redis.
         """
-        # Convert chunk -> dict
-        data = chunk.__dict__
-        metadata = chunk.metadata.__dict__
-        data["chunk_id"] = data.pop("id")
-
-        # Prep Redis Metadata
-        redis_metadata = dict(self._default_metadata)
-        if metadata:
-            for field, value in metadata.items():
-                if value:
-                    if field == "created_at":
-                        redis_metadata[field] = to_unix_timestamp(value)  # type: ignore
-                    else:
-                        redis_metadata[field] = value
-        data["metadata"] = redis_metadata
-        return data
+        # Prep Redis Metadata, rows without a document are their own document
+        redis_metadata = {**self._default_metadata, "document_id": data.id}
+        for field, value in data.data.items():
+            if field == "text" or value is None:
+                continue
+            if field == "created_at":
+                redis_metadata[field] = to_unix_timestamp(value)  # type: ignore
+            else:
+                redis_metadata[field] = value
+        return {
+            "chunk_id": data.id,
+            "text": data.data.get("text"),
+            "metadata": redis_metadata,
+            "embedding": data.embedding,
+        }
 
-    def _get_redis_query(self, query: QueryWithEmbedding) -> RediSearchQuery:
+    def _get_filter_str(self, filter: Optional[Dict[str, Any]], strict: bool = False) -> str:
         """
-        Convert a QueryWithEmbedding into a RediSearchQuery.
+        Convert a metadata filter into a RediSearch filter expression.
 
         Args:
-            query (QueryWithEmbedding): Search query.
+            filter (Optional[Dict[str, Any]]): Field -> value, start_date and end_date bound created_at.
+            strict (bool): Raise on fields the index cannot filter on instead of ignoring them.
 
         Returns:
-            RediSearchQuery: Query for RediSearch.
+            str: Filter expression, "*" when nothing is filtered.
         """
         filter_str: str = ""
 
@@ -211,135 +361,342 @@ class RedisDataStore(DataStore):
                 num = to_unix_timestamp(value)
                 match field:
                     case "start_date":
-                        return f"@{field}:[{num} +inf] "
+                        return f"@created_at:[{num} +inf] "
                     case "end_date":
-                        return f"@{field}:[-inf {num}] "
+                        return f"@created_at:[-inf {num}] "
 
         # Build filter
-        if query.filter:
-            for field, value in query.filter.__dict__.items():
+        if filter:
+            for field, value in filter.items():
                 if not value:
                     continue
                 if field in REDIS_SEARCH_SCHEMA:
                     filter_str += _typ_to_str(REDIS_SEARCH_SCHEMA[field], field, value)
                 elif field in REDIS_SEARCH_SCHEMA["metadata"]:
-                    if field == "source":  # handle the enum
-                        value = value.value
                     filter_str += _typ_to_str(
                         REDIS_SEARCH_SCHEMA["metadata"][field], field, value
                     )
-                elif field in ["start_date", "end_date"]:
+                elif field in ["start_date", "end_date"] and "created_at" in REDIS_SEARCH_SCHEMA["metadata"]:
                     filter_str += _typ_to_str(
                         REDIS_SEARCH_SCHEMA["metadata"]["created_at"], field, value
                     )
+                elif strict:
+                    raise ValueError(f"Cannot filter on {field}, it is not in the RediSearch index")
 
         # Postprocess filter string
         filter_str = filter_str.strip()
-        filter_str = filter_str if filter_str else "*"
+        return filter_str if filter_str else "*"
 
-        # Prepare query string
-        query_str = (
-            f"({filter_str})=>[KNN {query.top_k} @embedding $embedding as score]"
-        )
-        return (
+    @staticmethod
+    def _knn(top_k: int, ef_runtime: Optional[int]) -> str:
+        """
+        KNN clause of a vector query, EF_RUNTIME is only sent when tuned and
+        never below top_k.
+        """
+        if ef_runtime is None:
+            return f"KNN {top_k} @embedding $embedding as score"
+        return f"KNN {top_k} @embedding $embedding EF_RUNTIME {max(ef_runtime, top_k)} as score"
+
+    def _get_redis_query(self, query: VectorStoreQuery) -> RediSearchQuery:
+        """
+        Convert a VectorStoreQuery into a RediSearchQuery.
+
+        Args:
+            query (VectorStoreQuery): Search query.
+
+        Returns:
+            RediSearchQuery: Query for RediSearch.
+        """
+        if query.query_embedding is None:
+            raise ValueError("query_embedding is required for dense queries")
+        if query.ids is not None:
+            # Keys are named after the document, a chunk id alone cannot be looked up
+            raise ValueError("Redis queries cannot be restricted to ids")
+
+        # Prepare query string, a per query ef only applies to HNSW indexes
+        ef = query.ef if REDIS_INDEX_TYPE == "HNSW" else None
+        query_str = f"(*)=>[{self._knn(query.similarity_top_k, ef or self.ef_runtime)}]"
+        redis_query = (
             RediSearchQuery(query_str)
             .sort_by("score")
-            .paging(0, query.top_k)
+            .paging(0, query.similarity_top_k)
             .dialect(2)
         )
+        # Only the fields the results are built from, never the vector
+        if self.storage_type == "HASH":
+            redis_query = redis_query.return_fields("chunk_id", "text", *REDIS_METADATA_FIELDS, "score")
+        else:
+            redis_query = redis_query.return_field("$.chunk_id", as_field="chunk_id")
+            redis_query = redis_query.return_field("$.text", as_field="text")
+            for field in REDIS_METADATA_FIELDS:
+                redis_query = redis_query.return_field(f"$.metadata.{field}", as_field=field)
+            redis_query = redis_query.return_field("score")
+        return redis_query
 
     async def _redis_delete(self, keys: List[str]):
         """
-        Delete a list of keys from Redis.
+        Delete a list of keys from Redis, REDIS_DELETE_BATCH_SIZE keys per
+        UNLINK and all of them in one pipeline.
 
         Args:
             keys (List[str]): List of keys to delete.
         """
-        # Delete the keys
-        await asyncio.gather(*[self.client.delete(key) for key in keys])
-
-    #######
+        with metrics.operation("redis", "delete", batch_size=len(keys)) as op, op.phase("network"):
+            async with self.client.pipeline(transaction=False) as pipe:
+                for start in range(0, len(keys), REDIS_DELETE_BATCH_SIZE):
+                    await pipe.unlink(*keys[start : start + REDIS_DELETE_BATCH_SIZE])
+                await pipe.execute()
 
-    async def _upsert(self, chunks: Dict[str, List[DocumentChunk]]) -> List[str]:
-        """
-        Takes in a list of list of document chunks and inserts them into the database.
-        Return a list of document ids.
+    async def _delete_keys(self, pattern: str) -> int:
         """
-        # Initialize a list of ids to return
-        doc_ids: List[str] = []
+        Delete every key matching a SCAN pattern, REDIS_DELETE_BATCH_SIZE
+        keys at a time.
 
-        # Loop through the dict items
-        for doc_id, chunk_list in chunks.items():
+        Args:
+            pattern (str): SCAN MATCH pattern.
 
-            # Append the id to the ids list
-            doc_ids.append(doc_id)
+        Returns:
+            int: Number of keys deleted.
+        """
+        deleted = 0
+        keys: List[str] = []
+        async for key in self.client.scan_iter(pattern, count=REDIS_DELETE_BATCH_SIZE):
+            keys.append(_decode(key))
+            if len(keys) == REDIS_DELETE_BATCH_SIZE:
+                await self._redis_delete(keys)
+                deleted += len(keys)
+                keys = []
+        if keys:
+            await self._redis_delete(keys)
+            deleted += len(keys)
+        return deleted
 
-            # Write chunks in a pipelines
-            async with self.client.pipeline(transaction=False) as pipe:
-                for chunk in chunk_list:
-                    key = self._redis_key(doc_id, chunk.id)
-                    data = self._get_redis_chunk(chunk)
-                    await pipe.json().set(key, "$", data)
-                await pipe.execute()
+    async def _delete_matching(self, filter_str: str) -> int:
+        """
+        Delete every chunk matching a filter expression, found through the
+        index one page at a time.
 
-        return doc_ids
+        Args:
+            filter_str (str): RediSearch filter expression.
 
-    async def _query(
-        self,
-        queries: List[QueryWithEmbedding],
-    ) -> List[QueryResult]:
+        Returns:
+            int: Number of keys deleted.
         """
-        Takes in a list of queries with embeddings and filters and
-        returns a list of query results with matching document chunks and scores.
+        deleted = 0
+        previous: List[str] = []
+        while True:
+            # Deleted keys leave the index, so the next page is always at offset 0
+            query = (
+                RediSearchQuery(filter_str)
+                .no_content()
+                .paging(0, REDIS_DELETE_BATCH_SIZE)
+                .dialect(2)
+            )
+            with metrics.operation("redis", "find_keys") as op, op.phase("network"):
+                response = await self.client.ft(REDIS_INDEX_NAME).search(query)
+            keys = [doc.id for doc in response.docs]
+            if not keys:
+                return deleted
+            if keys == previous:
+                raise RuntimeError(f"Keys matching {filter_str} are still indexed after UNLINK")
+            await self._redis_delete(keys)
+            deleted += len(keys)
+            previous = keys
+
+    @staticmethod
+    def _doc_result(doc) -> dict:
+        """
+        Shape the returned fields of a search result like the chunk document.
         """
-        # Prepare query responses and results object
-        results: List[QueryResult] = []
+        metadata = {
+            field: getattr(doc, field) for field in REDIS_METADATA_FIELDS if hasattr(doc, field)
+        }
+        if "created_at" in metadata:
+            metadata["created_at"] = int(metadata["created_at"])
+        return {"chunk_id": getattr(doc, "chunk_id", None), "text": getattr(doc, "text", None), "metadata": metadata}
 
-        # Gather query results in a pipeline
-        logging.info(f"Gathering {len(queries)} query results", flush=True)
-        for query in queries:
+    def _query_result(self, response: RediSearchResult) -> QueryResult:
+        """
+        Rows of a search reply, the text and set metadata as data. Distances are
+        turned into similarities, higher is closer.
+        """
+        ids, datas, similarities = [], [], []
+        for doc in response.docs:
+            doc_json = self._doc_result(doc)
+            data = {
+                field: value for field, value in doc_json["metadata"].items() if value != "_null_"
+            }
+            if doc_json["text"] is not None:
+                data["text"] = doc_json["text"]
+            distance = float(doc.score)
+            ids.append(doc_json["chunk_id"])
+            datas.append(data)
+            similarities.append(1 - distance if self.distance_metric in ("COSINE", "IP") else -distance)
+        return QueryResult(data=datas, similarities=similarities, ids=ids)
+
+    async def _write(self, pipe, key: str, data: dict, op):
+        """
+        Queue the write of one chunk document on pipe, in the store's layout.
 
-            logging.info(f"Query: {query.query}")
-            query_results: List[DocumentChunkWithScore] = []
+        Args:
+            pipe: Redis pipeline.
+            key (str): Redis key of the chunk.
+            data (dict): Chunk document as built by _get_redis_chunk.
+            op: Metrics operation the bytes sent are added to.
+        """
+        if self.storage_type == "HASH":
+            fields = to_hash(data, self.vector_type)
+            if op:
+                op.bytes_sent += sum(
+                    len(value) if isinstance(value, bytes) else len(str(value)) for value in fields.values()
+                )
+            await pipe.hset(key, mapping=fields)
+        else:
+            # RedisJSON stores vectors as arrays of numbers, the only place a list is built
+            data = {**data, "embedding": as_list(data["embedding"])}
+            if op:
+                op.bytes_sent += len(json.dumps(data, default=str))
+            await pipe.json().set(key, "$", data)
 
-            # Extract Redis query
-            redis_query: RediSearchQuery = self._get_redis_query(query)
-            embedding = np.array(query.embedding, dtype=np.float64).tobytes()
+    #######
 
-            # Perform vector search
-            query_response = await self.client.ft(REDIS_INDEX_NAME).search(
-                redis_query, {"embedding": embedding}
-            )
+    async def add(self, datas: VectorStoreBatch) -> List[str]:
+        """
+        Write every row in one pipeline, under doc:{document_id}:chunk:{id}.
+        Return the row ids.
+        """
+        rows = datas.rows() if isinstance(datas, VectorBatch) else datas
+        with metrics.operation("redis", "add", batch_size=len(rows)) as op:
+            async with self.client.pipeline(transaction=False) as pipe:
+                with op.phase("serialize"):
+                    for data in rows:
+                        chunk = self._get_redis_chunk(data)
+                        key = self._redis_key(chunk["metadata"]["document_id"], data.id)
+                        await self._write(pipe, key, chunk, op)
+                with op.phase("network"):
+                    await pipe.execute()
+        return [data.id for data in rows]
+
+    async def query(self, query: VectorStoreQuery) -> QueryResult:
+        return (await self.query_batch([query]))[0]
+
+    async def query_batch(self, queries: List[VectorStoreQuery]) -> List[QueryResult]:
+        """
+        Send every query as an FT.SEARCH command of one pipeline, a single
+        round trip for the batch.
 
-            # Iterate through the most similar documents
-            for doc in query_response.docs:
-                # Load JSON data
-                doc_json = json.loads(doc.json)
-                # Create document chunk object with score
-                result = DocumentChunkWithScore(
-                    id=doc_json["metadata"]["document_id"],
-                    score=doc.score,
-                    text=doc_json["text"],
-                    metadata=doc_json["metadata"]
+        The tightest latency budget becomes the RediSearch TIMEOUT of every
+        search, which returns the hits found so far, and bounds the wait on the
+        client side. When the budget runs out before the reply the queries get
+        empty results flagged partial.
+        """
+        deadline = Deadline.earliest(queries)
+        with metrics.operation("redis", "query_batch", batch_size=len(queries)) as op:
+            async with self.client.pipeline(transaction=False) as pipe:
+                with op.phase("serialize"):
+                    for query in queries:
+                        redis_query = self._get_redis_query(query)
+                        if not deadline.unlimited:
+                            redis_query = redis_query.timeout(max(int(1000 * deadline.remaining()), 1))
+                        embedding = as_bytes(query.query_embedding, VECTOR_DTYPES[self.vector_type])
+                        if op:
+                            op.bytes_sent += len(embedding)
+                        # The pipeline has no ft(), send the command FT.SEARCH builds
+                        await pipe.execute_command(
+                            "FT.SEARCH", REDIS_INDEX_NAME, *redis_query.get_args(), "PARAMS", 2, "embedding", embedding
+                        )
+                with op.phase("network"):
+                    try:
+                        replies = await asyncio.wait_for(pipe.execute(), deadline.remaining())
+                    except asyncio.TimeoutError as e:
+                        op.error = e
+                        logging.warning(f"{len(queries)} queries ran out of their latency budget")
+                        return [mark_partial(QueryResult(data=[], similarities=[], ids=[])) for _ in queries]
+            with op.phase("parse"):
+                return [
+                    self._query_result(RediSearchResult(reply, True, duration=0, has_payload=False, with_scores=False))
+                    for reply in replies
+                ]
+
+    async def _iter_vectors(self, batch_size: int = 500):
+        """
+        Page (keys, embeddings) through every chunk under REDIS_DOC_PREFIX.
+        """
+        keys: List[str] = []
+        async for key in self.client.scan_iter(f"{REDIS_DOC_PREFIX}:*", count=batch_size):
+            keys.append(_decode(key))
+            if len(keys) == batch_size:
+                yield keys, await self._get_embeddings(keys)
+                keys = []
+        if keys:
+            yield keys, await self._get_embeddings(keys)
+
+    async def _get_embeddings(self, keys: List[str]) -> np.ndarray:
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                if self.storage_type == "HASH":
+                    await pipe.hget(key, "embedding")
+                else:
+                    await pipe.json().get(key, "$.embedding")
+            values = await pipe.execute()
+        if self.storage_type == "HASH":
+            return np.stack([from_bytes(value, VECTOR_DTYPES[self.vector_type]) for value in values])
+        return np.asarray([value[0] for value in values], dtype=np.float32)
+
+    async def tune_search_params(
+        self,
+        k: int = 10,
+        target_recall: float = VECTORDBS_TARGET_RECALL,
+        sample: int = 100,
+        values: Optional[Sequence[int]] = None,
+    ) -> Optional[TuningResult]:
+        """
+        Pick the smallest EF_RUNTIME that reaches target_recall at top k,
+        measured with sample stored vectors as queries against exact neighbours
+        computed locally. The choice is applied to this store and saved for the
+        index. FLAT indexes are exact already, None is returned for them.
+        """
+        if REDIS_INDEX_TYPE != "HNSW":
+            logging.info(f"Index type {REDIS_INDEX_TYPE} has no search effort to tune")
+            return None
+
+        queries = []
+        async for _, embeddings in self._iter_vectors():
+            queries.extend(embeddings[: sample - len(queries)])
+            if len(queries) >= sample:
+                break
+        queries = np.asarray(queries, dtype=np.float32)
+        neighbors = ExactNeighbors(queries, k, REDIS_DISTANCES[self.distance_metric])
+        async for keys, embeddings in self._iter_vectors():
+            neighbors.add(keys, embeddings)
+        semaphore = asyncio.Semaphore(REDIS_QUERY_CONCURRENCY)
+
+        async def _search_one(query: np.ndarray, ef_runtime: int) -> List[str]:
+            redis_query = RediSearchQuery(f"(*)=>[{self._knn(k, ef_runtime)}]").sort_by("score").paging(0, k).dialect(2)
+            async with semaphore:
+                response = await self.client.ft(REDIS_INDEX_NAME).search(
+                    redis_query.return_fields("score"),
+                    {"embedding": as_bytes(query, VECTOR_DTYPES[self.vector_type])},
                 )
-                query_results.append(result)
-
-            # Add to overall results
-            results.append(QueryResult(query=query.query, results=query_results))
+            return [_decode(doc.id) for doc in response.docs]
 
-        return results
+        async def search(value: int) -> List[List[str]]:
+            return list(await asyncio.gather(*[_search_one(query, value) for query in queries]))
 
-    async def _find_keys(self, pattern: str) -> List[str]:
-        return [key async for key in self.client.scan_iter(pattern)]
+        result = await atune(search, values or ef_values(k), neighbors.ids(), "EF_RUNTIME", REDIS_INDEX_NAME, target_recall)
+        self.ef_runtime = result.value
+        save_tuning("redis", result)
+        return result
 
     async def delete(
         self,
         ids: Optional[List[str]] = None,
-        filter: Optional[DocumentMetadataFilter] = None,
+        filter: Optional[Dict[str, Any]] = None,
         delete_all: Optional[bool] = None,
     ) -> bool:
         """
-        Removes vectors by ids, filter, or everything in the datastore.
+        Removes the vectors of document ids, the ones matching a filter, or
+        everything in the datastore.
         Returns whether the operation was successful.
         """
         # Delete all vectors from the index if delete_all is True
@@ -353,36 +710,131 @@ class RedisDataStore(DataStore):
                 logging.info(f"Error deleting all documents: {e}")
                 raise e
 
-        # Delete by filter
+        # Delete by filter, any combination of indexed metadata fields
         if filter:
-            # TODO - extend this to work with other metadata filters?
-            if filter.document_id:
+            filter_str = self._get_filter_str(filter, strict=True)
+            if filter_str != "*":
                 try:
-                    keys = await self._find_keys(
-                        f"{REDIS_DOC_PREFIX}:{filter.document_id}:*"
-                    )
-                    await self._redis_delete(keys)
-                    logging.info(f"Deleted document {filter.document_id} successfully")
+                    deleted = await self._delete_matching(filter_str)
+                    logging.info(f"Deleted {deleted} chunks matching {filter_str}")
                 except Exception as e:
-                    logging.info(f"Error deleting document {filter.document_id}: {e}")
+                    logging.info(f"Error deleting by filter {filter_str}: {e}")
                     raise e
 
-        # Delete by explicit ids (Redis keys)
+        # Delete by document ids, many ids per search through the document_id tag
         if ids:
             try:
-                logging.info(f"Deleting document ids {ids}")
-                keys = []
-                # find all keys associated with the document ids
-                for document_id in ids:
-                    doc_keys = await self._find_keys(
-                        pattern=f"{REDIS_DOC_PREFIX}:{document_id}:*"
-                    )
-                    keys.extend(doc_keys)
-                # delete all keys
-                logging.info(f"Deleting {len(keys)} keys from Redis")
-                await self._redis_delete(keys)
+                logging.info(f"Deleting {len(ids)} document ids")
+                deleted = 0
+                if self.document_id_indexed:
+                    for start in range(0, len(ids), REDIS_DELETE_IDS_PER_QUERY):
+                        tags = "|".join(self._escape(id) for id in ids[start : start + REDIS_DELETE_IDS_PER_QUERY])
+                        deleted += await self._delete_matching(f"@document_id:{{{tags}}}")
+                else:
+                    # Keys are named after their document, find them without the index
+                    for id in ids:
+                        deleted += await self._delete_keys(self._redis_key(REDIS_GLOB_CHARS.sub(r"\\\1", id), "*"))
+                logging.info(f"Deleted {deleted} keys from Redis")
             except Exception as e:
                 logging.info(f"Error deleting ids: {e}")
                 raise e
 
         return True
+
+    ### Migration ###
+
+    async def migrate(
+        self,
+        storage_type: str = REDIS_STORAGE_TYPE,
+        vector_type: str = REDIS_VECTOR_TYPE,
+        source_vector_type: str = "FLOAT64",
+        batch_size: int = 500,
+    ) -> str:
+        """
+        Move every chunk under REDIS_DOC_PREFIX to another storage layout and
+        point REDIS_INDEX_NAME at an index over it.
+
+        The new index is built next to the old one and REDIS_INDEX_NAME becomes
+        an alias of it. Keys are rewritten in batches, one MULTI/EXEC each, so
+        a chunk is never missing or stored twice. Writers should be paused
+        while this runs.
+
+        Args:
+            storage_type (str): Target layout, "JSON" or "HASH".
+            vector_type (str): Target vector type, "FLOAT16", "FLOAT32" or "FLOAT64".
+            source_vector_type (str): Vector type of existing HASH blobs, unused for JSON.
+            batch_size (int): Keys read and rewritten per round trip.
+
+        Returns:
+            str: Name of the index REDIS_INDEX_NAME now points at.
+        """
+        storage_type, vector_type = storage_type.upper(), vector_type.upper()
+        assert storage_type in ("JSON", "HASH") and vector_type in VECTOR_DTYPES
+
+        info = await self.client.ft(REDIS_INDEX_NAME).info()
+        source_index = _decode(info["index_name"])
+        source_type = index_layout(info)[0]
+
+        target_index = f"{REDIS_INDEX_NAME}-{storage_type.lower()}-{vector_type.lower()}"
+        if target_index == source_index:
+            return target_index
+        logging.info(f"Migrating {source_index} ({source_type}) to {target_index}")
+        await _create_index(self.client, target_index, storage_type, vector_type, self.distance_metric)
+
+        # JSON keeps vectors as numbers, only the index has to change for a new vector type
+        target = RedisDataStore(self.client, storage_type, vector_type, self.distance_metric)
+        if storage_type != source_type or (storage_type == "HASH" and vector_type != source_vector_type):
+            keys = []
+            async for key in self.client.scan_iter(f"{REDIS_DOC_PREFIX}:*", count=batch_size):
+                keys.append(key)
+                if len(keys) == batch_size:
+                    await target._migrate_keys(keys, source_type, source_vector_type)
+                    keys = []
+            if keys:
+                await target._migrate_keys(keys, source_type, source_vector_type)
+
+        if source_index == REDIS_INDEX_NAME:
+            # The old index holds the name itself, drop it before the alias can take it
+            await self.client.ft(source_index).dropindex(delete_documents=False)
+            await self.client.ft(target_index).aliasadd(REDIS_INDEX_NAME)
+        else:
+            await self.client.ft(target_index).aliasupdate(REDIS_INDEX_NAME)
+            await self.client.ft(source_index).dropindex(delete_documents=False)
+
+        self.storage_type, self.vector_type = storage_type, vector_type
+        logging.info(f"Migrated {source_index} to {target_index}")
+        return target_index
+
+    async def _migrate_keys(self, keys: List[str], source_type: str, source_vector_type: str):
+        """
+        Rewrite keys stored as source_type into this store's layout, keys
+        already converted (SCAN may return a key twice) are skipped.
+        """
+        source_redis_type = "ReJSON-RL" if source_type == "JSON" else "hash"
+        with metrics.operation("redis", "migrate", batch_size=len(keys)) as op:
+            with op.phase("network"):
+                async with self.client.pipeline(transaction=False) as pipe:
+                    for key in keys:
+                        await pipe.type(key)
+                    types = await pipe.execute()
+                keys = [key for key, typ in zip(keys, types) if _decode(typ) == source_redis_type]
+
+                async with self.client.pipeline(transaction=False) as pipe:
+                    for key in keys:
+                        if source_type == "JSON":
+                            await pipe.json().get(key)
+                        else:
+                            await pipe.hgetall(key)
+                    documents = await pipe.execute()
+
+            async with self.client.pipeline(transaction=True) as pipe:
+                with op.phase("serialize"):
+                    for key, document in zip(keys, documents):
+                        if not document:
+                            continue
+                        if source_type == "HASH":
+                            document = from_hash(document, source_vector_type)
+                        await pipe.unlink(key)
+                        await self._write(pipe, key, document, op)
+                with op.phase("network"):
+                    await pipe.execute()
@@ -1,5 +1,6 @@
 # TODO
 import asyncio
+import threading
 from typing import Dict, List, Optional
 from loguru import logger
 from weaviate import Client
@@ -9,6 +10,10 @@ import uuid
 
 from weaviate.util import generate_uuid5
 
+from vectordbs import metrics
+from vectordbs.embeddings import as_list, embedding_nbytes
+from vectordbs.executor import BlockingExecutor
+
 from datastore.datastore import DataStore
 from models.models import (
     DocumentChunk,
@@ -32,6 +37,9 @@ WEAVIATE_BATCH_SIZE = int(os.environ.get("WEAVIATE_BATCH_SIZE", 20))
 WEAVIATE_BATCH_DYNAMIC = os.environ.get("WEAVIATE_BATCH_DYNAMIC", False)
 WEAVIATE_BATCH_TIMEOUT_RETRIES = int(os.environ.get("WEAVIATE_TIMEOUT_RETRIES", 3))
 WEAVIATE_BATCH_NUM_WORKERS = int(os.environ.get("WEAVIATE_BATCH_NUM_WORKERS", 1))
+# Blocking GraphQL queries run on a thread pool, bounded per store
+WEAVIATE_MAX_WORKERS = int(os.environ.get("WEAVIATE_MAX_WORKERS", 8))
+WEAVIATE_MAX_IN_FLIGHT = int(os.environ.get("WEAVIATE_MAX_IN_FLIGHT", WEAVIATE_MAX_WORKERS))
 
 SCHEMA = {
     "class": WEAVIATE_INDEX,
@@ -115,6 +123,9 @@ class WeaviateDataStore(DataStore):
             f"Connecting to weaviate instance at {url} with credential type {type(auth_credentials).__name__}"
         )
         self.client = Client(url, auth_client_secret=auth_credentials)
+        self._executor = BlockingExecutor(WEAVIATE_MAX_WORKERS, WEAVIATE_MAX_IN_FLIGHT)
+        # client.batch is one buffer per client, upserts on executor threads take turns
+        self._batch_lock = threading.Lock()
         self.client.batch.configure(
             batch_size=WEAVIATE_BATCH_SIZE,
             dynamic=WEAVIATE_BATCH_DYNAMIC,  # type: ignore
@@ -147,43 +158,62 @@ class WeaviateDataStore(DataStore):
         else:
             return None
 
+    async def close(self):
+        """
+        Stop the executor the client calls run on.
+        """
+        self._executor.shutdown(wait=False)
+
     async def _upsert(self, chunks: Dict[str, List[DocumentChunk]]) -> List[str]:
         """
         Takes in a list of list of document chunks and inserts them into the database.
         Return a list of document ids.
         """
-        doc_ids = []
+        with metrics.operation("weaviate", "add") as op:
+            # The batch sends full batches while objects are added, keep it all off the event loop
+            return await self._executor.run(self._write_batch, chunks, op)
 
-        with self.client.batch as batch:
-            for doc_id, doc_chunks in chunks.items():
-                logger.debug(f"Upserting {doc_id} with {len(doc_chunks)} chunks")
-                for doc_chunk in doc_chunks:
-                    # we generate a uuid regardless of the format of the document_id because
-                    # weaviate needs a uuid to store each document chunk and
-                    # a document chunk cannot share the same uuid
-                    doc_uuid = generate_uuid5(doc_chunk, WEAVIATE_INDEX)
-                    metadata = doc_chunk.metadata
-                    doc_chunk_dict = doc_chunk.dict()
-                    doc_chunk_dict.pop("metadata")
-                    for key, value in metadata.dict().items():
-                        doc_chunk_dict[key] = value
-                    doc_chunk_dict["chunk_id"] = doc_chunk_dict.pop("id")
-                    doc_chunk_dict["source"] = (
-                        doc_chunk_dict.pop("source").value
-                        if doc_chunk_dict["source"]
-                        else None
-                    )
-                    embedding = doc_chunk_dict.pop("embedding")
-
-                    batch.add_data_object(
-                        uuid=doc_uuid,
-                        data_object=doc_chunk_dict,
-                        class_name=WEAVIATE_INDEX,
-                        vector=embedding,
-                    )
-
-                doc_ids.append(doc_id)
-            batch.flush()
+    def _write_batch(self, chunks: Dict[str, List[DocumentChunk]], op) -> List[str]:
+        """
+        Add every chunk to the client batch and flush it, blocking.
+        """
+        doc_ids = []
+        with self._batch_lock, self.client.batch as batch:
+            # Full batches are sent while adding, that time counts as serialize
+            with op.phase("serialize"):
+                for doc_id, doc_chunks in chunks.items():
+                    logger.debug(f"Upserting {doc_id} with {len(doc_chunks)} chunks")
+                    for doc_chunk in doc_chunks:
+                        # we generate a uuid regardless of the format of the document_id because
+                        # weaviate needs a uuid to store each document chunk and
+                        # a document chunk cannot share the same uuid
+                        doc_uuid = generate_uuid5(doc_chunk, WEAVIATE_INDEX)
+                        metadata = doc_chunk.metadata
+                        doc_chunk_dict = doc_chunk.dict()
+                        doc_chunk_dict.pop("metadata")
+                        for key, value in metadata.dict().items():
+                            doc_chunk_dict[key] = value
+                        doc_chunk_dict["chunk_id"] = doc_chunk_dict.pop("id")
+                        doc_chunk_dict["source"] = (
+                            doc_chunk_dict.pop("source").value
+                            if doc_chunk_dict["source"]
+                            else None
+                        )
+                        embedding = doc_chunk_dict.pop("embedding")
+                        if op:
+                            op.batch_size += 1
+                            op.bytes_sent += embedding_nbytes(embedding)
+
+                        batch.add_data_object(
+                            uuid=doc_uuid,
+                            data_object=doc_chunk_dict,
+                            class_name=WEAVIATE_INDEX,
+                            vector=as_list(embedding),
+                        )
+
+                    doc_ids.append(doc_id)
+            with op.phase("network"):
+                batch.flush()
         return doc_ids
 
     async def _query(
@@ -196,69 +226,73 @@ class WeaviateDataStore(DataStore):
 
         async def _single_query(query: QueryWithEmbedding) -> QueryResult:
             logger.debug(f"Query: {query.query}")
-            if not hasattr(query, "filter") or not query.filter:
-                result = (
-                    self.client.query.get(
-                        WEAVIATE_INDEX,
-                        [
-                            "chunk_id",
-                            "document_id",
-                            "text",
-                            "source",
-                            "source_id",
-                            "url",
-                            "created_at",
-                            "author",
-                        ],
-                    )
-                    .with_hybrid(query=query.query, alpha=0.5, vector=query.embedding)
-                    .with_limit(query.top_k)  # type: ignore
-                    .with_additional(["score", "vector"])
-                    .do()
-                )
-            else:
-                filters_ = self.build_filters(query.filter)
-                result = (
-                    self.client.query.get(
-                        WEAVIATE_INDEX,
-                        [
-                            "chunk_id",
-                            "document_id",
-                            "text",
-                            "source",
-                            "source_id",
-                            "url",
-                            "created_at",
-                            "author",
-                        ],
-                    )
-                    .with_hybrid(query=query.query, alpha=0.5, vector=query.embedding)
-                    .with_where(filters_)
-                    .with_limit(query.top_k)  # type: ignore
-                    .with_additional(["score", "vector"])
-                    .do()
-                )
-
-            query_results: List[DocumentChunkWithScore] = []
-            response = result["data"]["Get"][WEAVIATE_INDEX]
-
-            for resp in response:
-                result = DocumentChunkWithScore(
-                    id=resp["chunk_id"],
-                    text=resp["text"],
-                    embedding=resp["_additional"]["vector"],
-                    score=resp["_additional"]["score"],
-                    metadata=DocumentChunkMetadata(
-                        document_id=resp["document_id"] if resp["document_id"] else "",
-                        source=Source(resp["source"]),
-                        source_id=resp["source_id"],
-                        url=resp["url"],
-                        created_at=resp["created_at"],
-                        author=resp["author"],
-                    ),
-                )
-                query_results.append(result)
-            return QueryResult(query=query.query, results=query_results)
+            with metrics.operation("weaviate", "query", batch_size=1) as op:
+                with op.phase("serialize"):
+                    if not hasattr(query, "filter") or not query.filter:
+                        result = (
+                            self.client.query.get(
+                                WEAVIATE_INDEX,
+                                [
+                                    "chunk_id",
+                                    "document_id",
+                                    "text",
+                                    "source",
+                                    "source_id",
+                                    "url",
+                                    "created_at",
+                                    "author",
+                                ],
+                            )
+                            .with_hybrid(query=query.query, alpha=0.5, vector=as_list(query.embedding))
+                            .with_limit(query.top_k)  # type: ignore
+                            .with_additional(["score", "vector"])
+                        )
+                    else:
+                        filters_ = self.build_filters(query.filter)
+                        result = (
+                            self.client.query.get(
+                                WEAVIATE_INDEX,
+                                [
+                                    "chunk_id",
+                                    "document_id",
+                                    "text",
+                                    "source",
+                                    "source_id",
+                                    "url",
+                                    "created_at",
+                                    "author",
+                                ],
+                            )
+                            .with_hybrid(query=query.query, alpha=0.5, vector=as_list(query.embedding))
+                            .with_where(filters_)
+                            .with_limit(query.top_k)  # type: ignore
+                            .with_additional(["score", "vector"])
+                        )
+                # The weaviate client is blocking, run the request on the executor
+                with op.phase("network"):
+                    result = await self._executor.run(result.do)
+
+                query_results: List[DocumentChunkWithScore] = []
+                response = result["data"]["Get"][WEAVIATE_INDEX]
+
+                with op.phase("parse"):
+                    for resp in response:
+                        result = DocumentChunkWithScore(
+                            id=resp["chunk_id"],
+                            text=resp["text"],
+                            embedding=resp["_additional"]["vector"],
+                            score=resp["_additional"]["score"],
+                            metadata=DocumentChunkMetadata(
+                                document_id=resp["document_id"] if resp["document_id"] else "",
+                                source=Source(resp["source"]),
+                                source_id=resp["source_id"],
+                                url=resp["url"],
+                                created_at=resp["created_at"],
+                                author=resp["author"],
+                            ),
+                        )
+                        query_results.append(result)
+                return QueryResult(query=query.query, results=query_results)
 
         return await asyncio.gather(*[_single_query(query) for query in queries])
 
@@ -275,7 +309,7 @@ class WeaviateDataStore(DataStore):
         """
         if delete_all:
             logger.debug(f"Deleting all vectors in index {WEAVIATE_INDEX}")
-            self.client.schema.delete_all()
+            await self._executor.run(self.client.schema.delete_all)
             return True
 
         if ids:
@@ -287,9 +321,13 @@ class WeaviateDataStore(DataStore):
             where_clause = {"operator": "Or", "operands": operands}
 
             logger.debug(f"Deleting vectors from index {WEAVIATE_INDEX} with ids {ids}")
-            result = self.client.batch.delete_objects(
-                class_name=WEAVIATE_INDEX, where=where_clause, output="verbose"
-            )
+            with metrics.operation("weaviate", "delete", batch_size=len(ids)) as op, op.phase("network"):
+                result = await self._executor.run(
+                    self.client.batch.delete_objects,
+                    class_name=WEAVIATE_INDEX,
+                    where=where_clause,
+                    output="verbose",
+                )
 
             if not bool(result["results"]["successful"]):
                 logger.debug(
@@ -302,9 +340,10 @@ class WeaviateDataStore(DataStore):
             logger.debug(
                 f"Deleting vectors from index {WEAVIATE_INDEX} with filter {where_clause}"
             )
-            result = self.client.batch.delete_objects(
-                class_name=WEAVIATE_INDEX, where=where_clause
-            )
+            with metrics.operation("weaviate", "delete") as op, op.phase("network"):
+                result = await self._executor.run(
+                    self.client.batch.delete_objects, class_name=WEAVIATE_INDEX, where=where_clause
+                )
 
             if not bool(result["results"]["successful"]):
                 logger.debug(
@@ -6,7 +6,7 @@ from pymilvus import (
 )
 from uuid import uuid4
 
-from datastore.providers.milvus_datastore import (
+from vectordbs.providers.milvus_datastore import (
     MilvusDataStore,
 )
 
@@ -28,8 +28,8 @@ class ZillizDataStore(MilvusDataStore):
         Args:
             create_new (Optional[bool], optional): Whether to overwrite if collection already exists. Defaults to True.
         """
-        # Overwrite the default consistency level by MILVUS_CONSISTENCY_LEVEL
-        self._consistency_level = ZILLIZ_CONSISTENCY_LEVEL or "Bounded"
+        # Overwrite the default consistency level by ZILLIZ_CONSISTENCY_LEVEL
+        self._init_state(ZILLIZ_CONSISTENCY_LEVEL or "Bounded")
         self._create_connection()
 
         self._create_collection(ZILLIZ_COLLECTION, create_new)  # type: ignore
@@ -0,0 +1,285 @@
+"""
+Recall targeted tuning of ANN search parameters.
+
+Sweeps one search effort parameter (HNSW ef, IVF nprobe, Qdrant hnsw_ef, Redis
+EF_RUNTIME) over candidate values, measures recall@k against exact neighbours
+computed locally and keeps the smallest value that meets the target recall:
+
+    truth = exact_neighbors(pages, queries, k=10)
+    result = tune(search, [16, 32, 64, 128], truth, parameter="ef", collection="docs")
+    save_tuning("milvus", result)
+
+Choices are persisted per store and collection in VECTORDBS_TUNING_PATH, the
+providers read them back when they open a collection.
+"""
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Awaitable, Callable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from vectordbs.distances import normalize, score_matrix, top_k
+from vectordbs.types import VectorStore, VectorStoreQuery
+
+VECTORDBS_TUNING_PATH = os.environ.get("VECTORDBS_TUNING_PATH") or os.path.join(
+    os.path.expanduser("~"), ".cache", "vectordbs", "tuning.json"
+)
+VECTORDBS_TARGET_RECALL = float(os.environ.get("VECTORDBS_TARGET_RECALL", 0.95))
+# Beam widths tried for HNSW style parameters, values below top k are skipped
+EF_VALUES = (8, 16, 32, 64, 128, 256, 512)
+
+_TUNING_LOCK = threading.Lock()
+
+
+@dataclass
+class Candidate:
+    value: int
+    recall: float
+    # Mean per query, best of the timed repeats
+    latency_ms: float
+
+
+@dataclass
+class TuningResult:
+    collection: str
+    parameter: str
+    value: int
+    k: int
+    target_recall: float
+    recall: float
+    latency_ms: float
+    candidates: List[Candidate] = field(default_factory=list)
+
+    @property
+    def met_target(self) -> bool:
+        return self.recall >= self.target_recall
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TuningResult":
+        candidates = [Candidate(**candidate) for candidate in data.get("candidates", [])]
+        return cls(**{**data, "candidates": candidates})
+
+
+def ef_values(k: int, values: Sequence[int] = EF_VALUES) -> List[int]:
+    """Candidate beam widths for top k, a beam narrower than k cannot return k hits."""
+    return sorted({k, *(value for value in values if value >= k)})
+
+
+def nprobe_values(nlist: int) -> List[int]:
+    """Powers of two up to nlist, probing every list is an exact search."""
+    values = [1]
+    while values[-1] * 2 < nlist:
+        values.append(values[-1] * 2)
+    return values + [nlist] if nlist > 1 else values
+
+
+class ExactNeighbors:
+    """
+    Running exact top k of a set of queries, fed the corpus one (ids, vectors)
+    page at a time so memory stays at one page plus k candidates per query.
+    """
+
+    def __init__(self, queries: np.ndarray, k: int, distance: str = "Cosine"):
+        queries = np.asarray(queries, dtype=np.float32)
+        self.queries = normalize(queries) if distance == "Cosine" else queries
+        self.k = k
+        self.distance = distance
+        self._scores = np.empty((len(queries), 0), dtype=np.float32)
+        self._ids = np.empty((len(queries), 0), dtype=object)
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(vectors) == 0:
+            return
+        if self.distance == "Cosine":
+            vectors = normalize(vectors)
+        scores = np.concatenate([self._scores, score_matrix(vectors, self.queries, self.distance)], axis=1)
+        page_ids = np.empty(len(ids), dtype=object)
+        page_ids[:] = list(ids)
+        candidates = np.concatenate(
+            [self._ids, np.broadcast_to(page_ids, (len(self.queries), len(page_ids)))], axis=1
+        )
+        keep = np.stack([top_k(row, self.k) for row in scores])
+        self._scores = np.take_along_axis(scores, keep, axis=1)
+        self._ids = np.take_along_axis(candidates, keep, axis=1)
+
+    def ids(self) -> List[List[str]]:
+        """Exact top k ids of every query, best first."""
+        return [row.tolist() for row in self._ids]
+
+
+def exact_neighbors(
+    pages: Iterable[Tuple[Sequence[str], np.ndarray]],
+    queries: np.ndarray,
+    k: int,
+    distance: str = "Cosine",
+) -> List[List[str]]:
+    """
+    Exact top k ids of every query over a corpus given as (ids, vectors) pages.
+    """
+    neighbors = ExactNeighbors(queries, k, distance)
+    for ids, vectors in pages:
+        neighbors.add(ids, vectors)
+    return neighbors.ids()
+
+
+def sample_ids(ids: Iterable, n: int, seed: Optional[int] = None) -> list:
+    """
+    n ids drawn uniformly from a stream of unknown length, for stores that can
+    page through their ids but have no random access.
+    """
+    rng = random.Random(seed)
+    reservoir = []
+    for i, id in enumerate(ids):
+        if i < n:
+            reservoir.append(id)
+        else:
+            j = rng.randrange(i + 1)
+            if j < n:
+                reservoir[j] = id
+    return reservoir
+
+
+def recall(found: Sequence[Sequence[str]], truth: Sequence[Sequence[str]]) -> float:
+    """Mean fraction of the exact neighbours found by each query."""
+    if not truth:
+        return 0.0
+    hits = [
+        len(set(ids[: len(expected)]) & set(expected)) / len(expected)
+        for ids, expected in zip(found, truth)
+        if expected
+    ]
+    return float(np.mean(hits)) if hits else 0.0
+
+
+def choose(candidates: Sequence[Candidate], target_recall: float) -> Candidate:
+    """
+    The smallest value meeting target_recall, or the most accurate one when
+    none does. Effort grows with the value, so this is the cheapest choice
+    without trusting timings a few runs apart, which only break ties.
+    """
+    meeting = [candidate for candidate in candidates if candidate.recall >= target_recall]
+    if meeting:
+        return min(meeting, key=lambda candidate: (candidate.value, candidate.latency_ms))
+    return max(candidates, key=lambda candidate: (candidate.recall, -candidate.latency_ms))
+
+
+def _result(
+    candidates: List[Candidate], collection: str, parameter: str, k: int, target_recall: float
+) -> TuningResult:
+    if not candidates:
+        raise ValueError("No candidate values to tune")
+    best = choose(candidates, target_recall)
+    return TuningResult(collection, parameter, best.value, k, target_recall, best.recall, best.latency_ms, candidates)
+
+
+def tune(
+    search: Callable[[int], Sequence[Sequence[str]]],
+    values: Sequence[int],
+    truth: Sequence[Sequence[str]],
+    parameter: str,
+    collection: str = "",
+    target_recall: float = VECTORDBS_TARGET_RECALL,
+    repeats: int = 3,
+) -> TuningResult:
+    """
+    Run search(value) for every candidate value, it returns the ids found for
+    each query in truth. Latency is the best of repeats runs, recall is taken
+    from the first.
+    """
+    k = max((len(expected) for expected in truth), default=0)
+    candidates = []
+    for value in values:
+        found, seconds = None, float("inf")
+        for _ in range(max(repeats, 1)):
+            start = time.perf_counter()
+            ids = search(value)
+            seconds = min(seconds, time.perf_counter() - start)
+            found = found if found is not None else ids
+        candidates.append(Candidate(value, recall(found, truth), 1000 * seconds / max(len(truth), 1)))
+    return _result(candidates, collection, parameter, k, target_recall)
+
+
+async def atune(
+    search: Callable[[int], Awaitable[Sequence[Sequence[str]]]],
+    values: Sequence[int],
+    truth: Sequence[Sequence[str]],
+    parameter: str,
+    collection: str = "",
+    target_recall: float = VECTORDBS_TARGET_RECALL,
+    repeats: int = 3,
+) -> TuningResult:
+    """
+    tune for providers whose search is a coroutine.
+    """
+    k = max((len(expected) for expected in truth), default=0)
+    candidates = []
+    for value in values:
+        found, seconds = None, float("inf")
+        for _ in range(max(repeats, 1)):
+            start = time.perf_counter()
+            ids = await search(value)
+            seconds = min(seconds, time.perf_counter() - start)
+            found = found if found is not None else ids
+        candidates.append(Candidate(value, recall(found, truth), 1000 * seconds / max(len(truth), 1)))
+    return _result(candidates, collection, parameter, k, target_recall)
+
+
+def tune_store(
+    store: VectorStore,
+    parameter: str,
+    values: Sequence[int],
+    queries: np.ndarray,
+    truth: Sequence[Sequence[str]],
+    target_recall: float = VECTORDBS_TARGET_RECALL,
+    repeats: int = 3,
+) -> TuningResult:
+    """
+    Tune an in-process store whose effort is an attribute, ef_search for
+    HnswDataStore or nprobe for IvfPqDataStore, and leave the chosen value set.
+    """
+    k = max((len(expected) for expected in truth), default=0)
+    batch = [VectorStoreQuery(query_embedding=query, similarity_top_k=k) for query in queries]
+
+    def search(value: int) -> List[List[str]]:
+        setattr(store, parameter, value)
+        return [result.ids or [] for result in store.query_batch(batch)]
+
+    result = tune(search, values, truth, parameter, target_recall=target_recall, repeats=repeats)
+    setattr(store, parameter, result.value)
+    return result
+
+
+### Persistence ###
+
+
+def _read(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def load_tuning(store: str, collection: str, path: Optional[str] = None) -> Optional[TuningResult]:
+    """The last choice saved for the collection of a store, None when it was never tuned."""
+    with _TUNING_LOCK:
+        data = _read(path or VECTORDBS_TUNING_PATH).get(f"{store}/{collection}")
+    return TuningResult.from_dict(data) if data else None
+
+
+def save_tuning(store: str, result: TuningResult, path: Optional[str] = None):
+    """Record the choice for the collection, replacing the file atomically."""
+    path = path or VECTORDBS_TUNING_PATH
+    with _TUNING_LOCK:
+        data = _read(path)
+        data[f"{store}/{result.collection}"] = asdict(result)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        partial = f"{path}.tmp"
+        with open(partial, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(partial, path)
@@ -1,14 +1,20 @@
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Protocol, runtime_checkable
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, AsyncIterable, Callable, Dict, Iterable, List, Optional, Protocol, Sequence, Tuple, Union, runtime_checkable
 from enum import Enum
 from abc import ABC, abstractmethod
-from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    import numpy
+
+# A dense vector: float list, float32 ndarray, or a buffer of packed float32.
+# Stores convert it only at the client boundary, see vectordbs.embeddings.
+Embedding = Union[List[float], "numpy.ndarray", memoryview, bytes, bytearray]
 
 @dataclass
 class DocumentChunk:
     document_id: str
     text: str
-    vector: List[float]
+    vector: Embedding
 
 @dataclass
 class DocumentMetadataFilter:
@@ -25,17 +31,102 @@ class QueryResult:
     data: Optional[List[Any]] = None
     similarities: Optional[List[float]] = None
     ids: Optional[List[str]] = None
+    # Set when the latency budget ran out and the search stopped early
+    partial: bool = False
+
+@dataclass(eq=False)
+class ColumnarQueryResult(QueryResult):
+    """Query result kept as columns: similarities is an ndarray and rows are
+    only built when rows() is called."""
+
+    @classmethod
+    def empty(cls) -> "ColumnarQueryResult":
+        import numpy as np
+
+        return cls(data=[], similarities=np.zeros(0, dtype=np.float32), ids=[])
+
+    def __len__(self) -> int:
+        return len(self.ids or ())
+
+    def rows(self) -> List[Tuple[str, float, Any]]:
+        """(id, similarity, data) per hit, best first."""
+        data = self.data if self.data is not None else [None] * len(self)
+        return list(zip(self.ids or (), self.similarities.tolist(), data))
+
+    def to_result(self) -> QueryResult:
+        """Plain QueryResult with list columns."""
+        return QueryResult(
+            data=self.data,
+            similarities=self.similarities.tolist(),
+            ids=self.ids if isinstance(self.ids, list) else list(self.ids),
+            partial=self.partial,
+        )
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ColumnarQueryResult):
+            other = other.to_result()
+        return isinstance(other, QueryResult) and self.to_result() == other
 
 @dataclass
 class QueryWithEmbedding:
     text: str
-    vector: List[float]
+    vector: Embedding
 
 @dataclass
 class VectorStoreData:
     id: str
     data: dict
-    embedding: List[float]
+    embedding: Embedding
+
+@dataclass
+class VectorBatch:
+    """Columnar alternative to a list of VectorStoreData.
+
+    ids and the rows of the (n, dimension) float32 embeddings matrix line up,
+    columns maps each data key to one value per row, None where a row has no
+    value for that key.
+    """
+
+    ids: Sequence[str]
+    embeddings: "numpy.ndarray"
+    columns: Dict[str, Sequence[Any]] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_datas(cls, datas: Sequence[VectorStoreData]) -> "VectorBatch":
+        from vectordbs.embeddings import as_matrix
+
+        columns: Dict[str, List[Any]] = {}
+        for i, data in enumerate(datas):
+            for key, value in data.data.items():
+                if key not in columns:
+                    columns[key] = [None] * len(datas)
+                columns[key][i] = value
+        return cls(
+            ids=[data.id for data in datas],
+            embeddings=as_matrix(data.embedding for data in datas),
+            columns=columns,
+        )
+
+    def datas(self) -> List[dict]:
+        """The data dict of every row, keys with a None value are left out."""
+        rows: List[dict] = [{} for _ in range(len(self.ids))]
+        for key, values in self.columns.items():
+            for row, value in zip(rows, values):
+                if value is not None:
+                    row[key] = value
+        return rows
+
+    def rows(self) -> List[VectorStoreData]:
+        return [
+            VectorStoreData(id=id, data=data, embedding=embedding)
+            for id, data, embedding in zip(self.ids, self.datas(), self.embeddings)
+        ]
+
+# What VectorStore.add accepts
+VectorStoreBatch = Union[List[VectorStoreData], VectorBatch]
 
 class VectorStoreQueryMode(str, Enum):
     """Vector store query mode."""
@@ -49,7 +140,7 @@ class VectorStoreQuery:
     """Vector store query."""
 
     # dense embedding
-    query_embedding: Optional[List[float]] = None
+    query_embedding: Optional[Embedding] = None
     similarity_top_k: int = 1
     ids: Optional[List[str]] = None
     query_str: Optional[str] = None
@@ -60,15 +151,35 @@ class VectorStoreQuery:
     # NOTE: only for hybrid search (0 for bm25, 1 for vector search)
     alpha: Optional[float] = None
 
+    # NOTE: per query search effort, overriding the store defaults where supported
+    ef: Optional[int] = None
+    nprobe: Optional[int] = None
+    consistency_level: Optional[str] = None
+    # Seconds the caller will wait, see vectordbs.deadline
+    latency_budget: Optional[float] = None
+
 class VectorStore(ABC):
     """Abstract vector store class."""
-    
+
+    # Batches add_stream keeps in flight, 1 for stores that are not thread safe
+    stream_concurrency: int = 4
+
+    def close(self) -> None:
+        """Release clients and threads held by the store."""
+        ...
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
     @abstractmethod
     def add(
         self,
-        datas: List[VectorStoreData],
+        datas: VectorStoreBatch,
     ) -> List[str]:
-        """Add embedding results to vector store."""
+        """Add embedding results to vector store, as rows or a VectorBatch."""
         ...
 
     @abstractmethod
@@ -83,3 +194,120 @@ class VectorStore(ABC):
     ) -> QueryResult:
         """Query vector store."""
         ...
+
+    def query_columnar(
+        self,
+        query: VectorStoreQuery,
+    ) -> ColumnarQueryResult:
+        """Query vector store, similarities returned as an ndarray.
+
+        Providers that score with NumPy override this to skip the list conversion.
+        """
+        import numpy as np
+
+        result = self.query(query)
+        return ColumnarQueryResult(
+            data=result.data,
+            similarities=np.asarray(result.similarities or [], dtype=np.float32),
+            ids=result.ids or [],
+            partial=result.partial,
+        )
+
+    def query_batch(
+        self,
+        queries: List[VectorStoreQuery],
+    ) -> List[QueryResult]:
+        """Query vector store with many queries, one result per query.
+
+        Providers override this with their native multi-query call.
+        """
+        return [self.query(query) for query in queries]
+
+    def add_stream(
+        self,
+        datas: Iterable[VectorStoreData],
+        batch_size: int = 100,
+        max_batch_bytes: int = 4 * 1024 * 1024,
+        max_in_flight: Optional[int] = None,
+        progress: Optional[Callable] = None,
+    ) -> "StreamReport":
+        """Add a lazily consumed stream of embeddings in bounded batches.
+
+        See vectordbs.ingest.add_stream.
+        """
+        from vectordbs.ingest import add_stream
+
+        return add_stream(
+            self.add,
+            datas,
+            batch_size=batch_size,
+            max_batch_bytes=max_batch_bytes,
+            max_in_flight=max_in_flight or self.stream_concurrency,
+            progress=progress,
+        )
+
+class AsyncVectorStore(ABC):
+    """Abstract async vector store class."""
+
+    async def close(self) -> None:
+        """Release clients and threads held by the store."""
+        ...
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @abstractmethod
+    async def add(
+        self,
+        datas: VectorStoreBatch,
+    ) -> List[str]:
+        """Add embedding results to vector store, as rows or a VectorBatch."""
+        ...
+
+    @abstractmethod
+    async def delete(self, ids: List[str]) -> None:
+        """Delete doc."""
+        ...
+
+    @abstractmethod
+    async def query(
+        self,
+        query: VectorStoreQuery,
+    ) -> QueryResult:
+        """Query vector store."""
+        ...
+
+    async def query_batch(
+        self,
+        queries: List[VectorStoreQuery],
+    ) -> List[QueryResult]:
+        """Query vector store with many queries, one result per query."""
+        import asyncio
+
+        return list(await asyncio.gather(*[self.query(query) for query in queries]))
+
+    async def add_stream(
+        self,
+        datas: Union[Iterable[VectorStoreData], AsyncIterable[VectorStoreData]],
+        batch_size: int = 100,
+        max_batch_bytes: int = 4 * 1024 * 1024,
+        max_in_flight: int = 4,
+        progress: Optional[Callable] = None,
+    ) -> "StreamReport":
+        """Add a lazily consumed stream of embeddings in bounded batches.
+
+        See vectordbs.ingest.aadd_stream.
+        """
+        from vectordbs.ingest import aadd_stream
+
+        return await aadd_stream(
+            self.add,
+            datas,
+            batch_size=batch_size,
+            max_batch_bytes=max_batch_bytes,
+            max_in_flight=max_in_flight,
+            progress=progress,
+        )